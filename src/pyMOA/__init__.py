@@ -1 +1,9 @@
-from pyMOA.main import search
+from pyMOA.main import search, search_async, iter_search, aiter_search, search_many, reload
+from pyMOA.core.client import MOAClient
+from pyMOA.core.cache import MemoryCache, SQLiteCache
+from pyMOA.core.index import LocalIndex
+from pyMOA.core.health import HealthRegistry
+from pyMOA.core.results import SearchResult, SearchResponse, ResultTable
+from pyMOA.core.metrics import MetricsSink, PrometheusSink, OpenTelemetrySink
+from pyMOA.core.singleflight import FileLockFlight
+from pyMOA.core.proxy import ProxyPool
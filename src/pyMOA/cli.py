@@ -0,0 +1,31 @@
+import argparse
+import logging
+
+
+def main(argv=None):
+    """
+    The pyMOA command. `pyMOA serve` runs the HTTP/JSON search server, see pyMOA.core.server.
+    """
+    parser = argparse.ArgumentParser(prog="pyMOA", description="pyMOA metasearch.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the HTTP/JSON search server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8888)
+    serve.add_argument("--workers", type=int, default=1, help="Worker processes sharing the port and the cache")
+    serve.add_argument("--cache", help="SQLite cache file, or 'memory'. Several workers share one in the temp dir by default")
+    serve.add_argument("--local-index", help="SQLite file of the local result index")
+    serve.add_argument("--parse-processes", type=int, help="Parse in this many worker processes per worker (0 = one per CPU)")
+    serve.add_argument("--log-level", default="INFO")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(processName)s %(name)s %(levelname)s %(message)s")
+    if args.command == "serve":
+        # Imported here, so the command answers --help without loading the engines.
+        from pyMOA.core.server import serve as run
+        run(args.host, args.port, args.workers, cache=args.cache, local_index=args.local_index,
+            parse_processes=args.parse_processes)
+
+
+if __name__ == "__main__":
+    main()
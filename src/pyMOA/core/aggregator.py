@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the click and never change the page.
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "ref_src"}
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def unwrap_redirect(url: str) -> str:
+    """
+    Returns the target of a search engine redirect link, or the url itself.
+
+    Handles Google's "/url?q=...&sa=U&..." links and DuckDuckGo's "//duckduckgo.com/l/?uddg=..." links.
+    """
+    if not url:
+        return url
+
+    try:
+        parts = urlsplit(url)
+    except ValueError:  # e.g. an unclosed IPv6 bracket
+        return url
+    host = parts.netloc.lower()
+
+    if parts.path == "/url" and (not host or "google." in host):
+        target = dict(parse_qsl(parts.query)).get("q") or dict(parse_qsl(parts.query)).get("url")
+        if target:
+            return target
+    elif host.endswith("duckduckgo.com"):
+        query = dict(parse_qsl(parts.query))
+        if parts.path.startswith("/l/") and query.get("uddg"):
+            return query["uddg"]
+        if "//duckduckgo.com/?q=" in url:
+            return url.split("//duckduckgo.com/?q=")[-1]
+
+    return url.split("&sa=U&")[0]
+
+
+def normalize_url(url: str) -> str:
+    """
+    Builds the key used to detect duplicate results.
+
+    Redirects are unwrapped, the scheme, "www." prefix, default port, fragment, trailing slash and
+    tracking parameters are dropped, and the remaining query parameters are sorted.
+    A malformed url, e.g. with a port that is no number, is its own key.
+    """
+    url = unwrap_redirect(url).strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    if port and str(port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = parts.path.rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith("utm_") and key not in TRACKING_PARAMS
+    )
+    return urlunsplit(("", host, path, urlencode(query), ""))
+
+
+def _rrf(positions: Dict[str, int], k: int) -> float:
+    # Reciprocal rank fusion
+    return sum(1.0 / (k + position) for position in positions.values())
+
+
+def _borda(positions: Dict[str, int], k: int) -> float:
+    return sum(max(k - position + 1, 0) for position in positions.values())
+
+
+def _count(positions: Dict[str, int], k: int) -> float:
+    # Number of engines, ties broken by the best position
+    return len(positions) + 1.0 / (1 + min(positions.values()))
+
+
+SCORERS = {
+    "rrf": _rrf,
+    "borda": _borda,
+    "count": _count,
+}
+
+
+def merge_results(engine_results: dict, method: str = "rrf", k: int = 60, limit: Optional[int] = None) -> List[dict]:
+    """
+    Merges the results of several engines into one ranked list.
+
+    Results with the same normalized url become one record, which lists the contributing engines
+    and the 1-based position of the result in each of them. Duplicates are found through a dict
+    keyed by the normalized url, so merging stays linear in the number of results.
+
+    Args:
+        engine_results (dict): Engine name to engine output, as in search()["results"]. Outputs
+            with an error or without a results list are skipped.
+        method (str): Scoring method, one of SCORERS ("rrf", "borda", "count").
+        k (int): Rank constant of the scoring method.
+        limit (int or None): Maximum number of merged results.
+
+    Returns:
+        list[dict]: Merged results, best score first.
+    """
+    scorer = SCORERS.get(method)
+    if scorer is None:
+        raise ValueError(f"Invalid merge method. Choose from {list(SCORERS)}")
+
+    merged: Dict[str, dict] = {}
+    for engine_name, output in engine_results.items():
+        if not isinstance(output, dict) or not isinstance(output.get("results"), list):
+            continue
+
+        for position, result in enumerate(output["results"], start=1):
+            url = result.get("url")
+            if not url:
+                continue
+            key = normalize_url(url)
+
+            record = merged.get(key)
+            if record is None:
+                record = merged[key] = {
+                    "url": unwrap_redirect(url),
+                    "title": result.get("title", ""),
+                    "content": result.get("content", ""),
+                    "engines": [],
+                    "positions": {},
+                }
+                if result.get("thumbnail"):
+                    record["thumbnail"] = result["thumbnail"]
+            elif engine_name in record["positions"]:
+                # The same engine returned the url twice, keep its best position.
+                continue
+            else:
+                # Keep the most descriptive title and snippet.
+                if len(result.get("title", "")) > len(record["title"]):
+                    record["title"] = result["title"]
+                if len(result.get("content", "")) > len(record["content"]):
+                    record["content"] = result["content"]
+
+            record["engines"].append(engine_name)
+            record["positions"][engine_name] = position
+
+    ranked = list(merged.values())
+    for record in ranked:
+        record["score"] = scorer(record["positions"], k)
+    ranked.sort(key=lambda record: record["score"], reverse=True)
+
+    return ranked[:limit] if limit else ranked
@@ -1,27 +1,207 @@
-import json
-from pathlib import Path
+import time
+import logging
 from abc import ABC, abstractmethod
+from pyMOA.core.config import engine_config
+from pyMOA.core.executor import run_in_shared_executor
+from pyMOA.core.http import AsyncSessionPool, SessionPool
+from pyMOA.core.metrics import add_timing, current_timings
+from pyMOA.core.parsing import StreamParser, header_charset
+from pyMOA.core.ratelimit import current_rate_limiter
+
+logger = logging.getLogger(__name__)
+
 
 class BaseEngine(ABC):
     # The base engine class. All engines also inherit from this class.
+    ENCODING = None
+    STOP_MARKER = None    # Bytes that only appear after the last result
+    RESULT_MARKER = None  # Bytes that start each result, to stop reading once the result limit is reached
+    SELECTED_BY_DEFAULT = True  # False for engines that only run when named in search(engines=...)
+
+    # Defaults of the "stream" config: the largest body read, the size of the chunks read, and how
+    # much of the rest of a body is still read after an early stop to keep the connection alive.
+    MAX_BYTES = 4 * 1024 * 1024
+    CHUNK_SIZE = 16 * 1024
+    DRAIN_BYTES = 64 * 1024
+
     def __init__(self):
         self.config = self.load_config()
+        self.http = SessionPool(**self.get_http_config())
+        self.async_http = AsyncSessionPool(**self.get_http_config())
+        self.parse_pool = None  # Set by MOAClient to parse in worker processes
     
     @classmethod
     def load_config(cls):
-        config_path = Path(__file__).parent.parent / "configs" / "engine_params.json"
-        try:
-            with open(config_path, "r") as f:
-                return json.load(f).get(cls.__name__, {})
-        except FileNotFoundError:
-            return {}
+        # Live view of the engine's block in engine_params.json, which is parsed once for all engines.
+        return engine_config().view(cls.__name__)
     
     @abstractmethod
     def search(self, query: str, **kwargs) -> dict:
         pass
+
+    async def asearch(self, query: str, **kwargs) -> dict:
+        # Engines without a native async implementation run their blocking search on the shared executor.
+        return await run_in_shared_executor(self.search, query, **kwargs)
+
+    def request(self, method: str, url: str, proxy=None, **kwargs):
+        # Sends a request over the engine's pooled keep-alive connections, after the host's rate limit
+        # when the search is rate limited.
+        limiter = current_rate_limiter()
+        if limiter is not None:
+            limiter.acquire(self, url)
+        return self.http.request(method, url, proxy=proxy, **kwargs)
+
+    async def arequest(self, method: str, url: str, proxy=None, **kwargs):
+        # Async version of request(). Falls back to the blocking client on the shared executor when httpx is missing.
+        if not self.async_http.available:
+            return await run_in_shared_executor(self.request, method, url, proxy=proxy, **kwargs)
+        limiter = current_rate_limiter()
+        if limiter is not None:
+            await limiter.aacquire(self, url)
+        return await self.async_http.request(method, url, proxy=proxy, **kwargs)
+
+    def _stream_parser(self, response, limit=None, result_marker=None, parse_kwargs=None) -> StreamParser:
+        # The body is decoded with the charset of the Content-Type header, or else the engine's ENCODING,
+        # so lxml doesn't have to sniff it. Marked blocks that parse_dom() drops don't count towards limit.
+        # With a parse pool the results are only parsed in the workers, so limit doesn't stop reading.
+        config = self.get_stream_config()
+        encoding = header_charset(response.headers.get("Content-Type")) or self.ENCODING
+        parse = self.parse_pool is None
+        return StreamParser(
+            encoding, self.STOP_MARKER, result_marker or self.RESULT_MARKER, limit if parse else None,
+            config.get("max_bytes", self.MAX_BYTES), parse=parse,
+            count=lambda root: len(self.parse_dom(root, **(parse_kwargs or {}))),
+        )
+
+    def _read_done(self, stream: StreamParser, received: int, started: float, parse: float):
+        # parse is the time spent feeding the parser, the rest of the time since started was spent waiting for data.
+        read = time.perf_counter()
+        if self.parse_pool is None:
+            stream.close()  # In this thread, see StreamParser.close()
+        if stream.truncated:
+            logger.warning("%s response cut at %s bytes", self.__class__.__name__, stream.max_bytes)
+        timings = current_timings()
+        if timings is not None:
+            add_timing(timings, "bytes", received)
+            add_timing(timings, "download", read - started - parse)
+            add_timing(timings, "parse", parse + time.perf_counter() - read)
+
+    def read(self, response, limit=None, result_marker=None, **parse_kwargs):
+        """
+        Reads the body of a response requested with stream=True, feeding it to the parser as it arrives.
+
+        Reading stops early at the engine's STOP_MARKER, once `limit` results arrived (counted with
+        RESULT_MARKER, then checked with parse_dom() called with parse_kwargs) or at the max_bytes of
+        the "stream" config. The unread rest of the body is drained if it is short, so the connection
+        can be reused, and the connection closed otherwise.
+
+        Returns the StreamParser, which parse() takes. It holds the bytes read instead when a parse pool is set.
+        """
+        config = self.get_stream_config()
+        stream = self._stream_parser(response, limit, result_marker, parse_kwargs)
+        chunks = response.iter_content(config.get("chunk_size", self.CHUNK_SIZE))
+        started, parse, received, done = time.perf_counter(), 0.0, 0, False
+        try:
+            for chunk in chunks:
+                received += len(chunk)
+                fed = time.perf_counter()
+                more = stream.feed(chunk)
+                parse += time.perf_counter() - fed
+                if not more:
+                    break
+            else:
+                done = True
+            if not done and not stream.truncated:
+                drained = 0
+                for chunk in chunks:
+                    drained += len(chunk)
+                    if drained > config.get("drain_bytes", self.DRAIN_BYTES):
+                        break
+                else:
+                    done = True
+        finally:
+            if not done:
+                response.close()
+        self._read_done(stream, received, started, parse)
+        return stream
+
+    async def aread(self, response, limit=None, result_marker=None, **parse_kwargs):
+        # Async version of read(), for httpx responses requested with stream=True.
+        if not hasattr(response, "aiter_bytes"):
+            # A blocking response of the fallback client
+            return await run_in_shared_executor(self.read, response, limit, result_marker, **parse_kwargs)
+        config = self.get_stream_config()
+        stream = self._stream_parser(response, limit, result_marker, parse_kwargs)
+        chunks = response.aiter_bytes(config.get("chunk_size", self.CHUNK_SIZE))
+        started, parse, received = time.perf_counter(), 0.0, 0
+        try:
+            async for chunk in chunks:
+                received += len(chunk)
+                fed = time.perf_counter()
+                more = stream.feed(chunk)
+                parse += time.perf_counter() - fed
+                if not more:
+                    break
+            else:
+                chunks = None
+            if chunks is not None and not stream.truncated:
+                drained = 0
+                async for chunk in chunks:
+                    drained += len(chunk)
+                    if drained > config.get("drain_bytes", self.DRAIN_BYTES):
+                        break
+        finally:
+            # Returns the connection to the pool if the body was read to the end, closes it otherwise.
+            await response.aclose()
+        self._read_done(stream, received, started, parse)
+        return stream
+
+    def parse(self, content, **kwargs) -> list:
+        # Runs the engine's parse_results(), in the parse pool's worker processes if one is set.
+        # content is the body, or the StreamParser returned by read().
+        timings = current_timings()
+        if timings is None:
+            return self._parse(content, **kwargs)
+        started = time.perf_counter()
+        try:
+            return self._parse(content, **kwargs)
+        finally:
+            add_timing(timings, "parse", time.perf_counter() - started)
+
+    def _parse(self, content, **kwargs) -> list:
+        if isinstance(content, StreamParser) and self.parse_pool is not None:
+            return self.parse_pool.parse(type(self), content.content, encoding=content.encoding, **kwargs)
+        if isinstance(content, StreamParser):
+            return self.parse_dom(content.close(), **kwargs)
+        if self.parse_pool is not None:
+            return self.parse_pool.parse(type(self), content, **kwargs)
+        return self.parse_results(content, **kwargs)
+
+    async def aparse_response(self, response, *args):
+        # Runs _parse_response() from async code. With a parse pool the wait for the worker happens
+        # on the shared executor instead of blocking the event loop.
+        if self.parse_pool is None:
+            return self._parse_response(response, *args)
+        return await run_in_shared_executor(self._parse_response, response, *args)
+
+    def close(self):
+        self.http.close()
+        self.async_http.close()
+
+    async def aclose(self):
+        await self.async_http.aclose()
+        self.close()
     
     def get_params(self) -> dict:
         return self.config.get("params", {})
 
+    def get_stream_config(self) -> dict:
+        # max_bytes, chunk_size and drain_bytes of read()
+        return self.config.get("stream", {})
+
+    def get_http_config(self) -> dict:
+        # pool_connections, pool_maxsize and idle_timeout of the engine's connection pools
+        return self.config.get("http", {})
+
     def get_type(self) -> str:
         return self.config.get("type", "general")
@@ -1,20 +1,28 @@
 from abc import ABC, abstractmethod
-import json
-from pathlib import Path
+from pyMOA.core.config import plugin_config
+
+# Seconds a plugin may take per call unless its config sets "budget".
+DEFAULT_BUDGET = 0.5
+
 
 class BasePlugin(ABC):
+    """
+    Base class of the plugins.
+
+    Pre plugins run before the engines, all at the same time, and get the search parameters as
+    results. Their output may hold "query" to rewrite the query the engines search, or "results",
+    a dict of engine outputs keyed by engine name, to answer the search without the engines.
+
+    Post plugins run on the output of each engine as soon as it arrives and return the new output.
+    """
 
     def __init__(self):
         self.config = self.load_config()
 
     @classmethod
     def load_config(cls):
-        config_path = Path(__file__).parent.parent / "configs" / "plugin_params.json"
-        try:
-            with open(config_path, "r") as f:
-                return json.load(f).get(cls.__name__, {})
-        except FileNotFoundError:
-            return {}
+        # Live view of the plugin's block in plugin_params.json, which is parsed once for all plugins.
+        return plugin_config().view(cls.__name__)
 
     @abstractmethod
     def run(self, query: str, results: dict) -> dict:
@@ -23,6 +31,14 @@ class BasePlugin(ABC):
     def get_params(self) -> dict:
         return self.config.get("params", {})
 
+    def get_budget(self):
+        # None disables the budget.
+        return self.config.get("budget", DEFAULT_BUDGET)
+
+    def is_enabled(self) -> bool:
+        # Disabled plugins only run when a search names them in enabled_plugins.
+        return self.config.get("enabled", True)
+
     def get_type(self) -> str:
 
         return self.config.get("type", "post")
@@ -0,0 +1,73 @@
+import json
+import random
+import threading
+from pathlib import Path
+from typing import Union
+from pyMOA.core.health import CAPTCHA, SUCCESS, TIMEOUT, classify_output
+
+# HTTP statuses and exception classes (requests, httpx and builtins) of failures that are worth retrying.
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_EXCEPTIONS = {
+    "ConnectionError", "ConnectionResetError", "ConnectionAbortedError", "ConnectionRefusedError", "BrokenPipeError",
+    "TimeoutError", "Timeout", "ConnectTimeout", "ReadTimeout", "WriteTimeout", "PoolTimeout",
+    "ChunkedEncodingError", "ProxyError", "ConnectError", "ReadError", "WriteError", "RemoteProtocolError",
+}
+
+
+def is_transient(output) -> bool:
+    """
+    Whether a failed engine output is likely to succeed when retried, judged by its timeout flag,
+    HTTP status or exception class (see error_output()), never by the error message. CAPTCHA pages
+    and errors without a status or exception class, such as rejected queries, are not retried.
+    """
+    outcome = classify_output(output)
+    if outcome in (SUCCESS, CAPTCHA) or output.get("degraded"):
+        return False
+    if outcome == TIMEOUT:
+        return True
+    if "status" in output:
+        return output["status"] in TRANSIENT_STATUSES
+    return output.get("exc_type") in TRANSIENT_EXCEPTIONS
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def query_key(query: Union[str, dict]) -> str:
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+class Checkpoint:
+    """
+    Progress file of a batch search. Every finished query is appended as one JSON line, so an
+    interrupted batch started again with the same file skips the queries already done.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.done = set()
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with open(self.path, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.done.add(line)
+        self._file = open(self.path, "a")
+
+    def __contains__(self, query) -> bool:
+        return query_key(query) in self.done
+
+    def mark(self, query):
+        key = query_key(query)
+        with self._lock:
+            if key in self.done:
+                return
+            self.done.add(key)
+            self._file.write(key + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Union
+
+# Search parameters that don't change the results of an engine.
+UNCACHED_PARAMS = {"proxy"}
+
+
+def make_cache_key(engine_name: str, search_params: dict) -> str:
+    """
+    Builds the cache key of one engine request from the search parameters built by search().
+    The query is lower cased and its whitespace collapsed.
+    """
+    params = {k: v for k, v in search_params.items() if k not in UNCACHED_PARAMS}
+    if isinstance(params.get("query"), str):
+        params["query"] = " ".join(params["query"].lower().split())
+    return engine_name + ":" + json.dumps(params, sort_keys=True, default=str)
+
+
+class BaseCache(ABC):
+    """
+    Result cache of engine outputs. Values are stored serialized, so callers always get their own copy.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[dict]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: dict):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _count(self, hit: bool = False, miss: bool = False, evictions: int = 0):
+        with self._stats_lock:
+            self.hits += hit
+            self.misses += miss
+            self.evictions += evictions
+
+    def _expires(self) -> float:
+        return time.time() + self.ttl if self.ttl is not None else float("inf")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class MemoryCache(BaseCache):
+    """
+    In-process LRU cache with a TTL, limited by number of entries and total size of the serialized values.
+    """
+
+    def __init__(self, ttl: Optional[float] = 3600, max_entries: int = 10000, max_bytes: Optional[int] = 64 * 1024 * 1024):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, data)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self._count(hit=entry is not None, miss=entry is None)
+        return json.loads(entry[1]) if entry is not None else None
+
+    def set(self, key: str, value: dict):
+        data = json.dumps(value)
+        if self.max_bytes is not None and len(data) > self.max_bytes:
+            return
+
+        evicted = 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._expires(), data)
+            self.size += len(data)
+            while len(self._entries) > self.max_entries or (self.max_bytes is not None and self.size > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        if evicted:
+            self._count(evictions=evicted)
+
+    def _remove(self, key: str):
+        _, data = self._entries.pop(key)
+        self.size -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        return {**super().stats(), "entries": len(self._entries), "bytes": self.size}
+
+
+class SQLiteCache(BaseCache):
+    """
+    On-disk cache in an SQLite database, which can be shared by several worker processes.
+    Hit, miss and eviction counters are kept per process.
+    """
+
+    def __init__(self, path: Union[str, Path], ttl: Optional[float] = 3600, max_entries: int = 100000):
+        super().__init__(ttl)
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, each thread opens its own.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def get(self, key: str) -> Optional[dict]:
+        db = self._connection()
+        now = time.time()
+        row = db.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is not None and row[1] < now:
+            with db:
+                db.execute("DELETE FROM cache WHERE key = ? AND expires < ?", (key, now))
+            row = None
+        elif row is not None:
+            with db:
+                db.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        self._count(hit=row is not None, miss=row is None)
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: dict):
+        db = self._connection()
+        expires = self._expires()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires if expires != float("inf") else 1e18, time.time()),
+            )
+            # Least recently used entries above the limit are evicted.
+            evicted = db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        if evicted > 0:
+            self._count(evictions=evicted)
+
+    def clear(self):
+        db = self._connection()
+        with db:
+            db.execute("DELETE FROM cache")
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        entries = self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {**super().stats(), "entries": entries}
@@ -0,0 +1,1293 @@
+import asyncio
+import dataclasses
+import functools
+import threading
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, AsyncIterator, Optional, Annotated, Union
+from pyMOA.core.aggregator import SCORERS, merge_results
+from pyMOA.core.batch import Checkpoint, backoff_delay, is_transient
+from pyMOA.core.cache import BaseCache, make_cache_key
+from pyMOA.core.config import check_configs
+from pyMOA.core.engine_loader import EngineLoader
+from pyMOA.core.executor import get_shared_executor
+from pyMOA.core.health import TIMEOUT, HealthRegistry, classify_output, error_output
+from pyMOA.core.index import LocalIndex
+from pyMOA.core.metrics import MetricsSink, ameasure, emit, measure
+from pyMOA.core.pages import MAX_PAGES, PageCollector, merge_pages, merge_timings
+from pyMOA.core.parse_pool import ParsePool
+from pyMOA.core.pipeline import PLUGIN_TIMED_OUT, PluginTimings, call_plugin, plugin_name, run_post_plugins
+from pyMOA.core.plugin_loader import PluginLoader
+from pyMOA.core.proxy import ProxyPool, get_proxy_config
+from pyMOA.core.ratelimit import RateLimiter, rate_limited
+from pyMOA.core.results import SearchResponse
+from pyMOA.core.singleflight import FileLockFlight, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+TIMED_OUT = "Engine timed out"
+DEGRADED = "Engine temporarily skipped after repeated failures"
+LOCAL_ENGINE = "local"
+
+# A hedged engine call is duplicated once it takes longer than this quantile of the engine's latencies.
+HEDGE_QUANTILE = 0.95
+
+
+# search() arguments search_many() doesn't take, they fetch several pages per query.
+BATCH_UNSUPPORTED = ("pages", "max_results", "prefetch")
+
+
+def _check_batch_arguments(kwargs: dict):
+    unsupported = [name for name in BATCH_UNSUPPORTED if name in kwargs]
+    if unsupported:
+        raise TypeError(
+            f"search_many() does not take {', '.join(unsupported)}, pass each page as its own query with pageno instead"
+        )
+
+
+class _CutOff(TimeoutError):
+    # The search's deadline or the engine's timeout passed before the engine answered. The client gave up
+    # on the engine, so unlike a timeout of the engine's own request this says nothing about its health.
+    pass
+
+
+@dataclass
+class SearchPlan:
+    # Everything a search needs once its arguments are validated.
+    results: dict
+    engines: dict  # Engines left to query
+    pre_plugins: list
+    post_plugins: list
+    params: dict
+    limit: Optional[int] = None
+    cache_keys: dict = field(default_factory=dict)
+    timeouts: dict = field(default_factory=dict)
+    deadline: Optional[float] = None  # time.monotonic() value
+    rate_limited: bool = False
+    proxy_pool: Optional[ProxyPool] = None  # Set when each engine request picks its own proxy
+    ready: list = field(default_factory=list)  # Engines answered from the cache or by a pre plugin
+    pre_outputs: dict = field(default_factory=dict)
+    timings: PluginTimings = field(default_factory=PluginTimings)
+    slow_plugins: set = field(default_factory=set)  # Post plugins skipped for being over budget
+    engine_timings: Optional[dict] = None  # Per engine stage timings, when metrics are enabled
+    selected: dict = field(default_factory=dict)  # Engines of the search, before the cache and health checks
+    hedge: bool = False
+    quorum: Optional[int] = None  # Engines that have to answer before the search returns
+    quorum_results: int = 1  # Results an engine needs to count towards the quorum
+
+
+class MOAClient:
+    """
+    Long-lived search client.
+
+    Engines and plugins are discovered and instantiated once, when the client is created,
+    and reused by every search. A client can be shared between threads. Call reload() to
+    pick up new engines or changed configs.
+
+    Args:
+        max_workers (int or None): Size of the thread pool the engines run on.
+        cache (BaseCache or None): Cache of engine outputs, e.g. MemoryCache() or SQLiteCache(path).
+            Each engine is cached separately, so a partly cached search only sends requests to
+            the engines that missed.
+        health (HealthRegistry or None): Engine health tracking and circuit breakers. A registry
+            with the default settings is created if not given.
+        parse_processes (int or None): If set, HTML parsing runs in a pool of this many worker
+            processes while requests stay on threads or asyncio. 0 uses one process per CPU.
+        parse_offload_bytes (int): Responses smaller than this are still parsed in the calling thread.
+        metrics (bool, MetricsSink, list or None): Records the stage timings of every engine call
+            (queue wait, connect, time to first byte, download, parse) and returns them under "timings".
+            Sinks, e.g. PrometheusSink() or OpenTelemetrySink(), also receive them. Disabled by default.
+        coalesce (bool): Identical engine requests made at the same time, by threads or tasks sharing
+            this client, are sent once and every caller gets the result.
+        process_lock (FileLockFlight or None): Also coalesces with the other processes of the host
+            using the same lock directory. Needs a cache shared by those processes, e.g. SQLiteCache.
+        local_index (LocalIndex or None): Records every result the engines return, in the background,
+            and lets the "local" engine answer searches from them.
+        local_fallback (bool): With a local index, the "local" engine also runs whenever engines
+            of a search are skipped as degraded.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, cache: Optional[BaseCache] = None,
+                 health: Optional[HealthRegistry] = None, parse_processes: Optional[int] = None,
+                 parse_offload_bytes: int = 64 * 1024,
+                 metrics: Union[bool, MetricsSink, list, None] = None, coalesce: bool = True,
+                 process_lock: Optional[FileLockFlight] = None, local_index: Optional[LocalIndex] = None,
+                 local_fallback: bool = True):
+        self.cache = cache
+        self.local_index = local_index
+        self.local_fallback = local_fallback and local_index is not None
+        self.flights = SingleFlight() if coalesce else None
+        self.process_lock = process_lock if cache is not None else None
+        self.metrics_sinks = None  # None while metrics are disabled
+        if isinstance(metrics, MetricsSink):
+            self.metrics_sinks = [metrics]
+        elif metrics:
+            self.metrics_sinks = [] if metrics is True else list(metrics)
+        self.health = health if health is not None else HealthRegistry()
+        self.rate_limiter = RateLimiter()
+        self.parse_pool = None
+        if parse_processes is not None:
+            self.parse_pool = ParsePool(parse_processes or None, parse_offload_bytes)
+        self._lock = threading.Lock()
+        self._background = set()  # Prefetch tasks
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pyMOA")
+        self.loader: EngineLoader = None
+        self.ploader: PluginLoader = None
+        self.reload()
+
+    def reload(self):
+        # Build the new loaders first and swap them in one step, so searches that are
+        # already running keep using the previous engines until they finish.
+        # Config changes are picked up by the running engines on their own, this only applies them now.
+        check_configs()
+        loader = EngineLoader(setup=self._setup_engine)
+        ploader = PluginLoader()
+        with self._lock:
+            previous = self.loader
+            self.loader, self.ploader = loader, ploader
+        if previous is not None:
+            # Pools of the old engines reopen on demand if a running search still uses them.
+            previous.close()
+
+    def _setup_engine(self, engine):
+        # Engines are loaded on first use, this runs for each of them.
+        engine.parse_pool = self.parse_pool
+        if hasattr(engine, "local_index"):
+            engine.local_index = self.local_index
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.loader.close()
+        if self.parse_pool is not None:
+            self.parse_pool.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.local_index is not None:
+            self.local_index.close()
+        for sink in self.metrics_sinks or ():
+            sink.close()
+
+    async def aclose(self):
+        # Also closes the async connection pools opened in the running event loop. The rest waits
+        # for running engine calls and worker processes, off the event loop.
+        for engine in list(self.loader.engines.values()):
+            await engine.async_http.aclose()
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    def _snapshot(self):
+        with self._lock:
+            return self.loader, self.ploader
+
+    def _prepare(self, q=None, engines=None, enabled_plugins=None, time_range=None, language="",
+                 limit=None, pageno=1, safesearch=0, country="", categories="general", proxy=None,
+                 merge=None, deadline=None, timeout=None, hedge=False, quorum=None, quorum_results=1) -> SearchPlan:
+        """
+        Validates the search arguments and selects engines and plugins.
+        Shared by the sync, async and streaming search paths.
+        """
+
+        # Validate safesearch
+        if safesearch not in [0, 1, 2]:
+            raise ValueError("Invalid safesearch level. Choose from 0 (off), 1 (moderate), 2 (strict).")
+
+        # Validate time_range
+        allowed_ranges = ["day", "week", "month", "year"]
+        if time_range is not None and time_range not in allowed_ranges:
+            raise ValueError(f"Invalid time_range. Choose from {allowed_ranges}")
+
+        if quorum is not None and quorum < 1:
+            raise ValueError("quorum must be at least 1.")
+
+        started = time.monotonic()
+        loader, ploader = self._snapshot()
+        if merge and merge not in SCORERS and not self._shaper(loader, merge):
+            raise ValueError(f"Invalid merge method. Choose from {list(SCORERS) + loader.list_engines()['shaping']}")
+        engine_status = loader.list_engines()
+        plugin_status = ploader.list_plugins()
+
+        categories = categories.lower() if categories else "general"
+        if categories not in engine_status:
+            categories = "general"
+
+        if engines:
+            if categories in engine_status:
+                invalid_engines = [e for e in engines if e not in engine_status[categories]]
+                if invalid_engines:
+                    raise ValueError(f"Engine(s) {invalid_engines} not found in category '{categories}'")
+
+            selected_engines = engines
+        else:
+            selected_engines = engine_status[categories]
+
+
+        selected_pre_plugins = []
+        selected_post_plugins = []
+
+        if enabled_plugins:
+            for plugin_name in enabled_plugins:
+                plugin_instance = ploader.get_plugin(plugin_name)
+                if not plugin_instance:
+                    raise ValueError(f"Plugin '{plugin_name}' not found or failed to load.")
+
+                plugin_type = plugin_instance.get_type().lower()
+                if plugin_type == "pre":
+                    selected_pre_plugins.append(plugin_instance)
+                elif plugin_type == "post":
+                    selected_post_plugins.append(plugin_instance)
+                else:
+                    raise ValueError(f"Plugin '{plugin_name}' has unknown type '{plugin_type}'")
+
+
+        else:
+            selected_pre_plugins = ploader.pre_plugins
+            selected_post_plugins = ploader.post_plugins
+
+
+        results = {}
+        # Adding active or inactive motors to the results
+        results["active_engines"] = engine_status["active"]
+        results["failed_engines"] = engine_status["failed"]
+        results["degraded_engines"] = []
+        results["active_plugins"] = plugin_status["active"]
+        results["failed_plugins"] = plugin_status["failed"]
+
+        selected = {}
+        for engine_name in selected_engines:
+            # Checked before get_engine(), opt-in engines are not even created for a default search.
+            if not engines and not loader.selected_by_default(engine_name):
+                continue
+            engine = loader.get_engine(engine_name)
+            if not engine:
+                results[engine_name] = {"error": f"Engine {engine_name} not found!"}
+                continue
+            selected[engine_name] = engine
+
+        # Creating search parameters
+        search_params = {
+            "query": q,
+            "page": pageno,
+            "safesearch": safesearch,
+            "time_range": time_range,
+            "locale": language,
+            "num_results": limit, # For engines that can return a certain number of results by default
+            "country": country,
+            "proxy": None if isinstance(proxy, ProxyPool) else get_proxy_config(proxy)
+        }
+
+        plan = SearchPlan(results, selected, selected_pre_plugins, selected_post_plugins, search_params, limit)
+        plan.hedge, plan.quorum, plan.quorum_results = hedge, quorum, quorum_results
+        if isinstance(proxy, ProxyPool):
+            plan.proxy_pool = proxy
+        if self.metrics_sinks is not None:
+            plan.engine_timings = {}
+        if deadline is not None:
+            plan.deadline = started + deadline
+        if timeout is not None:
+            for engine_name in selected:
+                engine_timeout = timeout.get(engine_name) if isinstance(timeout, dict) else timeout
+                if engine_timeout is not None:
+                    plan.timeouts[engine_name] = engine_timeout
+        return plan
+
+    def _route(self, plan: SearchPlan):
+        # Cache and health checks, done once the pre plugins had their chance to rewrite the query.
+        plan.selected = plan.engines
+        selected, plan.cache_keys = self._from_cache(plan.engines, plan.params, plan.results, plan.limit)
+        plan.ready.extend(plan.results.get("cached_engines", []))
+        plan.engines = self._healthy(selected, plan.results)
+        if self.local_fallback and plan.results["degraded_engines"] and LOCAL_ENGINE not in plan.selected:
+            self._local_fallback(plan)
+
+    def _plan(self, *args, **kwargs) -> SearchPlan:
+        plan = self._prepare(*args, **kwargs)
+        if plan.pre_plugins:
+            self._apply_pre(plan, self._run_pre(plan))
+        self._route(plan)
+        return plan
+
+    async def _aplan(self, *args, **kwargs) -> SearchPlan:
+        plan = self._prepare(*args, **kwargs)
+        if plan.pre_plugins:
+            self._apply_pre(plan, await self._arun_pre(plan))
+        self._route(plan)
+        return plan
+
+    def _page_plan(self, plan: SearchPlan, page: int, engines: dict) -> SearchPlan:
+        # Copy of a routed plan for another page of the same search. The pre plugins are not run again.
+        page_plan = dataclasses.replace(
+            plan, results={"degraded_engines": []}, engines=engines, params={**plan.params, "page": page},
+            cache_keys={}, ready=[], pre_outputs={}, engine_timings={} if plan.engine_timings is not None else None,
+        )
+        self._route(page_plan)
+        return page_plan
+
+    def _prefetch(self, plan: SearchPlan, page: int):
+        """
+        Starts fetching a page of every engine of a search into the cache and returns without waiting for it.
+        """
+        if self.cache is None:
+            return
+        page_plan = self._page_plan(plan, page, plan.selected)
+        for engine_name, engine in page_plan.engines.items():
+            future = self._submit(page_plan, engine_name, engine)
+            future.add_done_callback(functools.partial(self._prefetched, page_plan.cache_keys.get(engine_name)))
+
+    def _prefetched(self, key, future):
+        if not future.cancelled() and future.exception() is None:
+            self._store(key, future.result())
+
+    def _aprefetch(self, plan: SearchPlan, page: int):
+        # Async version of _prefetch(), the requests run as tasks of the running event loop.
+        if self.cache is None:
+            return
+        page_plan = self._page_plan(plan, page, plan.selected)
+        for engine_name, engine in page_plan.engines.items():
+            task = asyncio.ensure_future(self._engine_awaitable(page_plan, engine_name, engine))
+            task.add_done_callback(functools.partial(self._prefetched, page_plan.cache_keys.get(engine_name)))
+            # The event loop only keeps weak references to tasks.
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    @staticmethod
+    def _pre_wait(plan: SearchPlan, plugin, started: float) -> Optional[float]:
+        # Seconds left of the plugin's budget, capped by the search deadline.
+        budget = plugin.get_budget()
+        due = started + budget if budget is not None else None
+        if plan.deadline is not None:
+            due = plan.deadline if due is None else min(due, plan.deadline)
+        return max(due - time.monotonic(), 0) if due is not None else None
+
+    def _run_pre(self, plan: SearchPlan) -> dict:
+        """
+        Runs the pre plugins of a plan at the same time and waits for each one up to its budget.
+        Plugins that go over it are reported as timed out and the search goes on without them.
+        """
+        started = time.monotonic()
+        futures = [
+            (plugin, self._executor.submit(call_plugin, plugin, plan.timings, "pre", plan.params["query"], dict(plan.params)))
+            for plugin in plan.pre_plugins
+        ]
+        outputs = {}
+        for plugin, future in futures:
+            try:
+                outputs[plugin_name(plugin)] = future.result(timeout=self._pre_wait(plan, plugin, started))
+            except FutureTimeoutError:
+                future.cancel()
+                plan.timings.timed_out(plugin, "pre")
+                outputs[plugin_name(plugin)] = {"error": PLUGIN_TIMED_OUT, "timed_out": True}
+            except Exception as e:
+                outputs[plugin_name(plugin)] = {"error": str(e)}
+        return outputs
+
+    async def _arun_pre(self, plan: SearchPlan) -> dict:
+        # Async version of _run_pre(), the blocking plugins run on the shared executor.
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        async def bounded(plugin):
+            awaitable = loop.run_in_executor(
+                get_shared_executor(), call_plugin, plugin, plan.timings, "pre", plan.params["query"], dict(plan.params)
+            )
+            try:
+                return await asyncio.wait_for(awaitable, self._pre_wait(plan, plugin, started))
+            except asyncio.TimeoutError:
+                plan.timings.timed_out(plugin, "pre")
+                return {"error": PLUGIN_TIMED_OUT, "timed_out": True}
+            except Exception as e:
+                return {"error": str(e)}
+
+        outputs = await asyncio.gather(*(bounded(plugin) for plugin in plan.pre_plugins))
+        return {plugin_name(plugin): output for plugin, output in zip(plan.pre_plugins, outputs)}
+
+    def _apply_pre(self, plan: SearchPlan, outputs: dict):
+        # Outputs are applied in plugin order, so the last plugin wins if several rewrite the query.
+        plan.pre_outputs = outputs
+        for name, output in outputs.items():
+            if not isinstance(output, dict) or "error" in output:
+                continue
+            if isinstance(output.get("query"), str) and output["query"]:
+                plan.params = {**plan.params, "query": output["query"]}
+                plan.results["rewritten_query"] = output["query"]
+            answered = output.get("results")
+            if isinstance(answered, dict) and answered:
+                # The plugin answered the search, the engines are not queried.
+                for engine_name, engine_output in answered.items():
+                    plan.results[engine_name] = self._engine_output(engine_output, plan.limit)
+                    plan.ready.append(engine_name)
+                plan.results["answered_by"] = name
+                plan.engines = {}
+                return
+
+    def _healthy(self, selected, results):
+        # Engines whose circuit breaker is open are skipped and reported as degraded.
+        healthy = {}
+        for engine_name, engine in selected.items():
+            if self.health.allow(engine_name):
+                healthy[engine_name] = engine
+            else:
+                results[engine_name] = {"error": DEGRADED, "degraded": True}
+                results["degraded_engines"].append(engine_name)
+        return healthy
+
+    def _local_fallback(self, plan: SearchPlan):
+        # The local engine answers in place of the degraded engines.
+        engine = self._snapshot()[0].get_engine(LOCAL_ENGINE)
+        if engine is not None:
+            plan.engines = {**plan.engines, LOCAL_ENGINE: engine}
+            plan.results["fallback_engines"] = [LOCAL_ENGINE]
+
+    def _from_cache(self, selected, search_params, results, limit):
+        """
+        Fills results with the cached outputs of the selected engines.
+        Returns the engines that missed the cache and the cache key of each of them.
+        """
+        if self.cache is None:
+            return selected, {}
+
+        missed, keys = {}, {}
+        results["cached_engines"] = []
+        for engine_name, engine in selected.items():
+            key = make_cache_key(engine_name, search_params)
+            output = self.cache.get(key)
+            if output is None:
+                missed[engine_name] = engine
+                keys[engine_name] = key
+            else:
+                results[engine_name] = self._engine_output(output, limit)
+                results["cached_engines"].append(engine_name)
+        return missed, keys
+
+    def _store(self, key, output):
+        # Failed engine outputs are never cached.
+        if key is not None and isinstance(output, dict) and "error" not in output:
+            self.cache.set(key, output)
+
+    def _record(self, plan: SearchPlan, name: str, output):
+        # Queues the results for the local index, the search doesn't wait for them to be written.
+        if self.local_index is not None and name != LOCAL_ENGINE and isinstance(output, dict) and "error" not in output:
+            results = output.get("results")
+            if isinstance(results, list) and results:
+                self.local_index.add(name, plan.params["query"], results)
+
+    @staticmethod
+    def _engine_output(output, limit):
+        if limit and isinstance(output, dict) and "results" in output and isinstance(output["results"], list):
+            output["results"] = output["results"][:limit]
+        return output
+
+    def _engine_params(self, plan: SearchPlan, engine_name: str) -> dict:
+        if engine_name in plan.timeouts:
+            # The engine's own request timeout follows the per engine timeout.
+            return {**plan.params, "timeout": plan.timeouts[engine_name]}
+        return plan.params
+
+    def _due(self, plan: SearchPlan, started: float, engine_name: Optional[str] = None) -> Optional[float]:
+        # The earliest of the global deadline and the engine's own timeout.
+        due = plan.deadline
+        if engine_name in plan.timeouts:
+            engine_due = started + plan.timeouts[engine_name]
+            due = engine_due if due is None else min(due, engine_due)
+        return due
+
+    def _finish(self, plan: SearchPlan, ftype: str, name: str, output, latency: Optional[float] = None) -> dict:
+        # Post processing of one finished engine or plugin output.
+        timings = plan.engine_timings.get(name) if plan.engine_timings is not None and ftype == "engine" else None
+        if timings is not None and isinstance(output, BaseException):
+            timings.setdefault("error", type(output).__name__)
+        cut_off = isinstance(output, _CutOff)
+        if isinstance(output, BaseException):
+            output = {"error": TIMED_OUT, "timed_out": True} if isinstance(output, TimeoutError) else error_output(output)
+        if ftype == "engine" and name in plan.timeouts and classify_output(output) == TIMEOUT:
+            # The engine's request ran out of the timeout the search gave it, see _engine_params().
+            output, cut_off = {"error": TIMED_OUT, "timed_out": True}, True
+        if timings is not None:
+            self._record_timings(name, output, timings)
+        if ftype == "engine":
+            # Counted in the engine's stats, but only failures of the engine itself move its breaker.
+            self.health.record_output(name, output, latency, trip=not cut_off)
+            self._store(plan.cache_keys.get(name), output)
+            self._record(plan, name, output)
+            output = self._engine_output(output, plan.limit)
+        if ftype == "engine" and isinstance(output, dict) and output.get("timed_out"):
+            plan.results.setdefault("timed_out_engines", []).append(name)
+        return output
+
+    def _record_timings(self, name: str, output, timings: dict):
+        if isinstance(output, dict) and isinstance(output.get("results"), list):
+            timings["results"] = len(output["results"])
+        if isinstance(output, dict) and "error" in output:
+            timings.setdefault("error", classify_output(output))
+        emit(self.metrics_sinks, name, timings)
+
+    def _engine_call(self, plan: SearchPlan, engine_name: str, engine, hedge: bool = False):
+        # The blocking call of one engine: rate limited, coordinated with other processes and measured, as configured.
+        # A hedge races a call already holding the process lock and its timings, so it goes without both.
+        params = self._engine_params(plan, engine_name)
+        search = engine.search
+        if plan.proxy_pool is not None:
+            search = functools.partial(plan.proxy_pool.call, engine_name, search)
+        if plan.rate_limited:
+            call = functools.partial(self._limited_search, search, params)
+        else:
+            call = functools.partial(search, **params)
+        if hedge:
+            return call
+        if self.process_lock is not None and engine_name in plan.cache_keys:
+            call = functools.partial(self._locked_call, plan.cache_keys[engine_name], call)
+        if plan.engine_timings is not None:
+            call = functools.partial(measure, plan.engine_timings.setdefault(engine_name, {}), time.perf_counter(), call)
+        return call
+
+    def _submit(self, plan: SearchPlan, engine_name: str, engine):
+        # Runs an engine on the executor, sharing the call with identical requests already in flight.
+        call = self._engine_call(plan, engine_name, engine)
+        if self.flights is None:
+            return self._executor.submit(call)
+        key = make_cache_key(engine_name, self._engine_params(plan, engine_name))
+        return self.flights.submit(key, self._executor, call)
+
+    def _engine_awaitable(self, plan: SearchPlan, engine_name: str, engine, hedge: bool = False):
+        # Async version of _submit(), returns the awaitable of the engine call. See _engine_call() for hedges.
+        params = self._engine_params(plan, engine_name)
+        asearch = engine.asearch
+        if plan.proxy_pool is not None:
+            asearch = functools.partial(plan.proxy_pool.acall, engine_name, asearch)
+        if plan.rate_limited:
+            make = functools.partial(self._limited_asearch, asearch, params)
+        else:
+            make = functools.partial(asearch, **params)
+        if hedge:
+            return make()
+        if self.process_lock is not None and engine_name in plan.cache_keys:
+            make = functools.partial(self._alocked_call, plan.cache_keys[engine_name], make)
+        if self.flights is not None:
+            awaitable = self.flights.ado(make_cache_key(engine_name, params), make)
+        else:
+            awaitable = make()
+        if plan.engine_timings is not None:
+            awaitable = ameasure(plan.engine_timings.setdefault(engine_name, {}), time.perf_counter(), awaitable)
+        return awaitable
+
+    def _hedge_delay(self, plan: SearchPlan, engine_name: str) -> Optional[float]:
+        # Seconds after which a call of the engine is hedged, None if it isn't.
+        if not plan.hedge:
+            return None
+        return self.health.quantile(engine_name, HEDGE_QUANTILE)
+
+    def _hedge(self, plan: SearchPlan, engine_name: str):
+        # Sends the duplicate request of a hedged engine call. It doesn't join the call in flight,
+        # so it gets a connection of its own, and its own proxy when the search uses a ProxyPool.
+        plan.results.setdefault("hedged_engines", []).append(engine_name)
+        return self._executor.submit(self._engine_call(plan, engine_name, plan.engines[engine_name], hedge=True))
+
+    @staticmethod
+    def _failed(output) -> bool:
+        return isinstance(output, BaseException) or (isinstance(output, dict) and "error" in output)
+
+    def _locked_call(self, key: str, call):
+        # Another process holding the lock is fetching the same output, it is in the cache once the lock is free.
+        with self.process_lock.hold(key):
+            output = self.cache.get(key)
+            if output is None:
+                output = call()
+                self._store(key, output)
+            return output
+
+    async def _alocked_call(self, key: str, make):
+        async with self.process_lock.ahold(key):
+            output = self.cache.get(key)
+            if output is None:
+                output = await make()
+                self._store(key, output)
+            return output
+
+    def _limited_search(self, search, params):
+        # Searches with every request of the engine waiting for its host's rate limit.
+        with rate_limited(self.rate_limiter):
+            return search(**params)
+
+    async def _limited_asearch(self, asearch, params):
+        with rate_limited(self.rate_limiter):
+            return await asearch(**params)
+
+    def _run(self, plan: SearchPlan) -> Iterator[tuple]:
+        """
+        Runs the engines of a plan on the executor and the post plugins on each engine output.
+        Yields (type, name, output) tuples in completion order, after the pre plugin outputs and
+        the engines that were already answered. Engines that miss their deadline are yielded
+        with a timed out error and their futures are cancelled.
+        """
+        runner = self._run_plans([plan])
+        try:
+            for _, ftype, name, output in runner:
+                yield ftype, name, output
+        finally:
+            runner.close()
+
+    def _run_plans(self, plans: list) -> Iterator[tuple]:
+        # _run() of several plans at once, e.g. one per page. Yields (plan, type, name, output) tuples.
+        started = time.monotonic()
+        pending = {}
+        raw = {}  # Engine outputs the post plugins are running on
+        hedge_at = {}  # Engine call -> time.monotonic() value at which it is hedged
+        hedges = {}  # Hedged call -> its hedge, and the other way around
+
+        def post(plan, name, output):
+            # Starts the post plugins on an engine output, returns False if there is nothing to run.
+            if not plan.post_plugins or not isinstance(output, dict) or "error" in output:
+                return False
+            future = self._executor.submit(
+                run_post_plugins, plan.post_plugins, plan.params["query"], output, plan.timings, plan.slow_plugins
+            )
+            pending[future] = (plan, "post", name, self._due(plan, started))
+            raw[future] = output
+            return True
+
+        for plan in plans:
+            for name, output in plan.pre_outputs.items():
+                yield plan, "pre_plugin", name, output
+            for engine_name in plan.ready:
+                if not post(plan, engine_name, plan.results[engine_name]):
+                    yield plan, "engine", engine_name, plan.results[engine_name]
+
+        def drop_race(future):
+            # The call of a hedged pair that lost is cancelled.
+            other = hedges.pop(future, None)
+            if other is not None:
+                del hedges[other]
+                if pending.pop(other, None) is not None:
+                    other.cancel()
+
+        for plan in plans:
+            for engine_name, engine in plan.engines.items():
+                future = self._submit(plan, engine_name, engine)
+                pending[future] = (plan, "engine", engine_name, self._due(plan, started, engine_name))
+                delay = self._hedge_delay(plan, engine_name)
+                if delay is not None:
+                    hedge_at[future] = started + delay
+
+        try:
+            while pending:
+                now = time.monotonic()
+                for future, (plan, ftype, name, due) in list(pending.items()):
+                    if future in pending and due is not None and due <= now and not future.done():
+                        future.cancel()
+                        del pending[future]
+                        drop_race(future)
+                        if ftype == "post":
+                            # Out of time, the output is returned as the engine gave it.
+                            yield plan, "engine", name, raw.pop(future)
+                        else:
+                            yield plan, ftype, name, self._finish(plan, ftype, name, _CutOff(), now - started)
+                for future, at in list(hedge_at.items()):
+                    if at <= now:
+                        del hedge_at[future]
+                        if future in pending and not future.done():
+                            hedge = self._hedge(pending[future][0], pending[future][2])
+                            pending[hedge] = pending[future]
+                            hedges[future], hedges[hedge] = hedge, future
+                if not pending:
+                    break
+
+                dues = [due for _, _, _, due in pending.values() if due is not None] + list(hedge_at.values())
+                wait_for = max(min(dues) - now, 0) if dues else None
+                done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future not in pending:
+                        continue  # Lost the race to its hedged pair
+                    plan, ftype, name, _ = pending.pop(future)
+                    hedge_at.pop(future, None)
+                    if ftype == "post":
+                        output = raw.pop(future)
+                        if not future.cancelled() and future.exception() is None:
+                            output = future.result()
+                        yield plan, "engine", name, output
+                        continue
+                    try:
+                        output = future.result()
+                    except Exception as e:
+                        output = e
+                    if future in hedges and self._failed(output):
+                        # The other call of the pair may still succeed.
+                        del hedges[hedges.pop(future)]
+                        continue
+                    drop_race(future)
+                    output = self._finish(plan, ftype, name, output, time.monotonic() - started)
+                    if not post(plan, name, output):
+                        yield plan, ftype, name, output
+        finally:
+            # The caller stopped early, the remaining engines are not needed anymore.
+            for future, (plan, ftype, name, _) in pending.items():
+                self._abandon(plan, ftype, name, future)
+
+    def _abandon(self, plan: SearchPlan, ftype: str, name: str, future):
+        # Engines still running when a quorum search returns fill the cache, if there is one.
+        # Everything else the caller stopped waiting for is cancelled.
+        key = plan.cache_keys.get(name) if ftype == "engine" and plan.quorum is not None else None
+        if key is None:
+            future.cancel()
+        else:
+            future.add_done_callback(functools.partial(self._prefetched, key))
+
+    async def _arun(self, plan: SearchPlan) -> AsyncIterator[tuple]:
+        """
+        Async version of _run(). Engines run through asearch() and the blocking post plugins on the shared executor.
+        """
+        async for _, ftype, name, output in self._arun_plans([plan]):
+            yield ftype, name, output
+
+    async def _arun_plans(self, plans: list) -> AsyncIterator[tuple]:
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        async def bounded(plan, ftype, name, awaitable, due):
+            try:
+                if due is None:
+                    output = await awaitable
+                else:
+                    output = await asyncio.wait_for(awaitable, max(due - time.monotonic(), 0))
+            except asyncio.TimeoutError as e:
+                # Raised by wait_for once due passed, or by the awaitable itself.
+                output = _CutOff() if due is not None and time.monotonic() >= due - 0.001 else e
+            except Exception as e:
+                output = e
+            return plan, ftype, name, output
+
+        async def post_plugins(plan, name, output):
+            processed = await bounded(plan, "post", name, loop.run_in_executor(
+                get_shared_executor(), run_post_plugins, plan.post_plugins, plan.params["query"], output,
+                plan.timings, plan.slow_plugins,
+            ), self._due(plan, started))
+            # Out of time or failed, the output is returned as the engine gave it.
+            return plan, "post", name, output if isinstance(processed[3], BaseException) else processed[3]
+
+        def post(plan, name, output):
+            if not plan.post_plugins or not isinstance(output, dict) or "error" in output:
+                return False
+            pending.add(asyncio.ensure_future(post_plugins(plan, name, output)))
+            return True
+
+        async def hedged(plan, name, engine, delay):
+            # The engine call, raced by a duplicate request if it takes longer than delay. First success wins.
+            calls = {asyncio.ensure_future(self._engine_awaitable(plan, name, engine))}
+            try:
+                done, _ = await asyncio.wait(calls, timeout=delay)
+                if not done:
+                    plan.results.setdefault("hedged_engines", []).append(name)
+                    calls.add(asyncio.ensure_future(self._engine_awaitable(plan, name, engine, hedge=True)))
+                failure = None
+                while calls:
+                    done, calls = await asyncio.wait(calls, return_when=asyncio.FIRST_COMPLETED)
+                    for call in done:
+                        output = call.exception() or call.result()
+                        if not self._failed(output):
+                            return output
+                        failure = output
+                if isinstance(failure, BaseException):
+                    raise failure
+                return failure
+            finally:
+                for call in calls:
+                    call.cancel()
+
+        def fill_cache(key, task):
+            # Output of an engine the search stopped waiting for, see _abandon().
+            if not task.cancelled() and not self._failed(task.result()[3]):
+                self._store(key, task.result()[3])
+
+        pending = set()
+        engine_tasks = {}  # Engine task -> its plan and engine name
+        for plan in plans:
+            for name, output in plan.pre_outputs.items():
+                yield plan, "pre_plugin", name, output
+            for engine_name in plan.ready:
+                if not post(plan, engine_name, plan.results[engine_name]):
+                    yield plan, "engine", engine_name, plan.results[engine_name]
+
+        for plan in plans:
+            for engine_name, engine in plan.engines.items():
+                delay = self._hedge_delay(plan, engine_name)
+                if delay is None:
+                    awaitable = self._engine_awaitable(plan, engine_name, engine)
+                else:
+                    awaitable = hedged(plan, engine_name, engine, delay)
+                due = self._due(plan, started, engine_name)
+                task = asyncio.ensure_future(bounded(plan, "engine", engine_name, awaitable, due))
+                pending.add(task)
+                engine_tasks[task] = (plan, engine_name)
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    plan, ftype, name, output = task.result()
+                    if ftype == "post":
+                        yield plan, "engine", name, output
+                        continue
+                    output = self._finish(plan, ftype, name, output, time.monotonic() - started)
+                    if not post(plan, name, output):
+                        yield plan, ftype, name, output
+        finally:
+            for task in pending:
+                plan, name = engine_tasks.get(task, (None, None))
+                key = plan.cache_keys.get(name) if plan is not None and plan.quorum is not None else None
+                if key is None:
+                    task.cancel()
+                    continue
+                task.add_done_callback(functools.partial(fill_cache, key))
+                # The event loop only keeps weak references to tasks.
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+
+    @staticmethod
+    def _shaper(loader: EngineLoader, name: str):
+        # The shaping engine called name, if it loads.
+        if name.lower() not in loader.list_engines()["shaping"]:
+            return None
+        return loader.get_engine(name)
+
+    def _merge(self, results: dict, merge: str, query: Optional[str]) -> list:
+        if merge in SCORERS:
+            return merge_results(results, method=merge)
+        # A shaping engine re-orders the merged results.
+        merged = merge_results(results)
+        shaper = self._shaper(self._snapshot()[0], merge)
+        if shaper is None:
+            return merged
+        try:
+            return shaper.shape(query, merged)
+        except Exception as e:
+            logger.error("shaping engine %s failed: %s", merge, str(e))
+            return merged
+
+    def _response(self, results, pre_plugin_outputs, merge, typed=False, plugin_timings=None, timings=None, query=None):
+        response = {
+            "results": results,
+            "pre_plugins": pre_plugin_outputs
+        }
+        if plugin_timings:
+            response["plugin_timings"] = plugin_timings
+        if timings is not None:
+            response["timings"] = timings
+        if merge:
+            response["merged"] = self._merge(results, merge, query)
+        if typed:
+            for name, output in results.items():
+                if isinstance(output, dict):
+                    results[name] = SearchResponse.from_dict(name, output)
+        return response
+
+    def search(
+        self,
+        q: Annotated[Optional[str], "Search query"] = None,
+        engines: Annotated[Optional[list[str]], "List of search engines"] = None,
+        enabled_plugins: Annotated[Optional[list[str]], "List of plugins"] = None,
+        time_range: Annotated[str, "Time range filter"] = None,
+        language: Annotated[str, "Search language"] = "",
+        limit: Annotated[Optional[int], "Number of results per engine"] = None,
+        pageno: Annotated[int, "Page number"] = 1,
+        safesearch: Annotated[int, "Safe search level"] = 0,
+        country: Annotated[str, "Country to search"] = "",
+        categories: Annotated[str, "Search category"] = "general",
+        proxy: Annotated[Union[str, dict[str, str], ProxyPool], "HTTP or HTTPS proxy string or dict, or a ProxyPool"] = None,
+        merge: Annotated[Optional[str], "Merge method of the results, e.g. 'rrf'"] = None,
+        deadline: Annotated[Optional[float], "Seconds until the search returns what it has"] = None,
+        timeout: Annotated[Union[float, dict[str, float], None], "Seconds per engine, or per engine name"] = None,
+        typed: Annotated[bool, "Return engine outputs as SearchResponse objects"] = False,
+        pages: Annotated[Optional[Iterable[int]], "Pages to fetch, e.g. range(1, 6)"] = None,
+        max_results: Annotated[Optional[int], "Unique results to collect over the pages"] = None,
+        prefetch: Annotated[bool, "Fetch the next page into the cache in the background"] = False,
+        hedge: Annotated[bool, "Duplicate engine requests slower than the engine's p95"] = False,
+        quorum: Annotated[Optional[int], "Engines that have to answer before returning"] = None,
+        quorum_results: Annotated[int, "Results an engine needs to count towards the quorum"] = 1,
+        ):
+        """
+        Multi-engine search using the engines and plugins loaded by this client.
+
+        Args:
+            q (str): Search query.
+            engines (list[str] or None): List of engine names, or None to use all active.
+            pageno (int): Page number.
+            safesearch (int): 0 (off), 1 (moderate), 2 (strict).
+            time_range (str or None): One of ["day", "week", "month", "year"].
+            merge (str or None): If set, the results of all engines are also merged into one
+                deduplicated list under "merged", scored with this method ("rrf", "borda" or "count"),
+                or ranked by a shaping engine such as "rerank".
+            deadline (float or None): Overall time limit in seconds. When it passes, the results that
+                arrived are returned and the remaining engines are listed in "timed_out_engines".
+            timeout (float, dict or None): Time limit of each engine in seconds, either one value
+                for all engines or a dict keyed by engine name. Engines cut off by the deadline or their
+                timeout are still counted in client.health, but don't count towards skipping them as degraded.
+            typed (bool): Return each engine's output as a SearchResponse holding slotted SearchResult
+                records instead of dicts. SearchResponse.to_dict() gives back the usual dict.
+            pages (iterable of int or None): Pages to fetch, all at the same time. Each engine's results
+                are concatenated in page order without duplicates, and "pages" lists the pages it returned.
+            max_results (int or None): Fetch pages (`pages`, or up to 10 pages from pageno) until this
+                many unique results were collected over all engines. The first page is fetched alone, then
+                as many pages at the same time as its results say are still needed. A wave of pages is
+                always finished. Engines stop as soon as a page brings nothing new.
+            prefetch (bool): After returning, fetch the page after the last one into the cache, so
+                asking for it next is answered from the cache. Needs a cache, ignored without one.
+            hedge (bool): When an engine takes longer than its p95 latency so far, send the same request
+                again, over another connection or proxy, and keep whichever answers first. Engines
+                with fewer than 20 successful calls are not hedged. Hedged engines are listed in
+                "hedged_engines".
+            quorum (int or None): Return as soon as this many engines answered with at least
+                `quorum_results` results each. The engines still running are listed in
+                "unfinished_engines"; with a cache they keep running and fill it, otherwise they
+                are cancelled. Can't be combined with pages or max_results.
+
+        Returns:
+            dict: Search results of each engine after the post plugins, the pre plugins outputs and,
+                when plugins ran, the time spent in each of them under "plugin_timings".
+        """
+        pages = self._pages(pages, max_results, pageno, quorum)
+        plan = self._plan(
+            q, engines, enabled_plugins, time_range, language, limit,
+            pages[0] if pages else pageno, safesearch, country, categories, proxy, merge, deadline, timeout,
+            hedge, quorum, quorum_results,
+        )
+        if pages is None:
+            response, last_page = self._collect(plan, merge, typed), pageno
+        else:
+            response, last_page = self._collect_pages(plan, pages, max_results, merge, typed)
+        if prefetch:
+            self._prefetch(plan, last_page + 1)
+        return response
+
+    @staticmethod
+    def _pages(pages, max_results, pageno, quorum=None) -> Optional[list]:
+        if quorum is not None and (pages is not None or max_results is not None):
+            raise ValueError("quorum can't be combined with pages or max_results.")
+        if pages is not None:
+            pages = list(pages)
+            if not pages:
+                raise ValueError("pages must contain at least one page number.")
+            return pages
+        if max_results is not None:
+            return list(range(pageno, pageno + MAX_PAGES))
+        return None
+
+    def _collect_pages(self, plan: SearchPlan, pages: list, max_results=None, merge=None, typed=False) -> tuple:
+        """
+        Runs a search over several pages, see search(). The first page uses the plan itself.
+        Returns the response and the last page fetched.
+        """
+        collector = PageCollector(max_results)
+        plans, pre_plugin_outputs = [], {}
+        while not collector.done:
+            wave = collector.next_wave(pages)
+            engines = {name: engine for name, engine in plan.selected.items() if name not in collector.exhausted}
+            if not wave or (plans and not engines):
+                break
+            wave_plans = [plan if not plans and page == wave[0] else self._page_plan(plan, page, engines) for page in wave]
+            plans.extend(wave_plans)
+            # The wave is finished even once max_results is reached, so no engine is dropped from it.
+            for page_plan, ftype, name, output in self._run_plans(wave_plans):
+                if ftype == "pre_plugin":
+                    pre_plugin_outputs[name] = output
+                    continue
+                page_plan.results[name] = output
+                collector.add(name, output)
+        return self._pages_response(plans, pre_plugin_outputs, max_results, merge, typed)
+
+    def _pages_response(self, plans, pre_plugin_outputs, max_results, merge, typed) -> tuple:
+        plan = plans[0]
+        # limit applies to each page, the engines keep the results of all their pages up to max_results.
+        results = merge_pages(plans, max_results)
+        response = self._response(
+            results, pre_plugin_outputs, merge, typed, plan.timings.to_dict(), merge_timings(plans), plan.params["query"],
+        )
+        if max_results is not None and "merged" in response:
+            response["merged"] = response["merged"][:max_results]
+        return response, max(page_plan.params["page"] for page_plan in plans)
+
+    @staticmethod
+    def _answered(plan: SearchPlan, output) -> bool:
+        # Whether an engine output counts towards the quorum of the search.
+        return isinstance(output, dict) and isinstance(output.get("results"), list) and len(output["results"]) >= plan.quorum_results
+
+    @staticmethod
+    def _quorum_reached(plan: SearchPlan):
+        plan.results["unfinished_engines"] = [name for name in plan.engines if name not in plan.results]
+
+    def _collect(self, plan: SearchPlan, merge=None, typed=False) -> dict:
+        pre_plugin_outputs = {}
+        answered = 0
+
+        runner = self._run(plan)
+        try:
+            for ftype, name, output in runner:
+                if ftype == "engine":
+                    plan.results[name] = output
+                    answered += plan.quorum is not None and self._answered(plan, output)
+                    if plan.quorum is not None and answered >= plan.quorum:
+                        self._quorum_reached(plan)
+                        break
+                elif ftype == "pre_plugin":
+                    pre_plugin_outputs[name] = output
+        finally:
+            # The engines still running are left to fill the cache or cancelled, see _abandon().
+            runner.close()
+
+        return self._response(
+            plan.results, pre_plugin_outputs, merge, typed, plan.timings.to_dict(), plan.engine_timings, plan.params["query"],
+        )
+
+    def iter_search(
+        self,
+        q: Annotated[Optional[str], "Search query"] = None,
+        engines: Annotated[Optional[list[str]], "List of search engines"] = None,
+        enabled_plugins: Annotated[Optional[list[str]], "List of plugins"] = None,
+        time_range: Annotated[str, "Time range filter"] = None,
+        language: Annotated[str, "Search language"] = "",
+        limit: Annotated[Optional[int], "Number of results per engine"] = None,
+        pageno: Annotated[int, "Page number"] = 1,
+        safesearch: Annotated[int, "Safe search level"] = 0,
+        country: Annotated[str, "Country to search"] = "",
+        categories: Annotated[str, "Search category"] = "general",
+        proxy: Annotated[Union[str, dict[str, str], ProxyPool], "HTTP or HTTPS proxy string or dict, or a ProxyPool"] = None,
+        deadline: Annotated[Optional[float], "Seconds until the search returns what it has"] = None,
+        timeout: Annotated[Union[float, dict[str, float], None], "Seconds per engine, or per engine name"] = None,
+        hedge: Annotated[bool, "Duplicate engine requests slower than the engine's p95"] = False,
+        ) -> Iterator[tuple]:
+        """
+        Streaming version of search(). Takes the same arguments.
+
+        Yields (type, name, output) tuples, where type is "engine" or "pre_plugin". The pre plugin
+        outputs come first, then the engines answered from the cache, then each engine as soon as
+        it finishes and its post plugins ran. Engines that miss the deadline or
+        their timeout are yielded last with {"error": "Engine timed out", "timed_out": True}.
+        """
+        plan = self._plan(
+            q, engines, enabled_plugins, time_range, language, limit,
+            pageno, safesearch, country, categories, proxy, None, deadline, timeout, hedge,
+        )
+        yield from self._run(plan)
+
+    async def search_async(
+        self,
+        q: Annotated[Optional[str], "Search query"] = None,
+        engines: Annotated[Optional[list[str]], "List of search engines"] = None,
+        enabled_plugins: Annotated[Optional[list[str]], "List of plugins"] = None,
+        time_range: Annotated[str, "Time range filter"] = None,
+        language: Annotated[str, "Search language"] = "",
+        limit: Annotated[Optional[int], "Number of results per engine"] = None,
+        pageno: Annotated[int, "Page number"] = 1,
+        safesearch: Annotated[int, "Safe search level"] = 0,
+        country: Annotated[str, "Country to search"] = "",
+        categories: Annotated[str, "Search category"] = "general",
+        proxy: Annotated[Union[str, dict[str, str], ProxyPool], "HTTP or HTTPS proxy string or dict, or a ProxyPool"] = None,
+        merge: Annotated[Optional[str], "Merge method of the results, e.g. 'rrf'"] = None,
+        deadline: Annotated[Optional[float], "Seconds until the search returns what it has"] = None,
+        timeout: Annotated[Union[float, dict[str, float], None], "Seconds per engine, or per engine name"] = None,
+        typed: Annotated[bool, "Return engine outputs as SearchResponse objects"] = False,
+        pages: Annotated[Optional[Iterable[int]], "Pages to fetch, e.g. range(1, 6)"] = None,
+        max_results: Annotated[Optional[int], "Unique results to collect over the pages"] = None,
+        prefetch: Annotated[bool, "Fetch the next page into the cache in the background"] = False,
+        hedge: Annotated[bool, "Duplicate engine requests slower than the engine's p95"] = False,
+        quorum: Annotated[Optional[int], "Engines that have to answer before returning"] = None,
+        quorum_results: Annotated[int, "Results an engine needs to count towards the quorum"] = 1,
+        ):
+        """
+        Async version of search(). Takes the same arguments and returns the same structure.
+
+        Engines run through their asearch() method on the running event loop. Engines and
+        plugins that are only blocking are run on the bounded shared executor.
+        """
+        pages = self._pages(pages, max_results, pageno, quorum)
+        plan = await self._aplan(
+            q, engines, enabled_plugins, time_range, language, limit,
+            pages[0] if pages else pageno, safesearch, country, categories, proxy, merge, deadline, timeout,
+            hedge, quorum, quorum_results,
+        )
+        if pages is None:
+            response, last_page = await self._acollect(plan, merge, typed), pageno
+        else:
+            response, last_page = await self._acollect_pages(plan, pages, max_results, merge, typed)
+        if prefetch:
+            self._aprefetch(plan, last_page + 1)
+        return response
+
+    async def _acollect(self, plan: SearchPlan, merge=None, typed=False) -> dict:
+        pre_plugin_outputs = {}
+        answered = 0
+
+        runner = self._arun_plans([plan])
+        try:
+            async for _, ftype, name, output in runner:
+                if ftype == "engine":
+                    plan.results[name] = output
+                    answered += plan.quorum is not None and self._answered(plan, output)
+                    if plan.quorum is not None and answered >= plan.quorum:
+                        self._quorum_reached(plan)
+                        break
+                elif ftype == "pre_plugin":
+                    pre_plugin_outputs[name] = output
+        finally:
+            await runner.aclose()
+
+        return self._response(
+            plan.results, pre_plugin_outputs, merge, typed, plan.timings.to_dict(), plan.engine_timings, plan.params["query"],
+        )
+
+    async def _acollect_pages(self, plan: SearchPlan, pages: list, max_results=None, merge=None, typed=False) -> tuple:
+        # Async version of _collect_pages().
+        collector = PageCollector(max_results)
+        plans, pre_plugin_outputs = [], {}
+        while not collector.done:
+            wave = collector.next_wave(pages)
+            engines = {name: engine for name, engine in plan.selected.items() if name not in collector.exhausted}
+            if not wave or (plans and not engines):
+                break
+            wave_plans = [plan if not plans and page == wave[0] else self._page_plan(plan, page, engines) for page in wave]
+            plans.extend(wave_plans)
+            async for page_plan, ftype, name, output in self._arun_plans(wave_plans):
+                if ftype == "pre_plugin":
+                    pre_plugin_outputs[name] = output
+                    continue
+                page_plan.results[name] = output
+                collector.add(name, output)
+        return self._pages_response(plans, pre_plugin_outputs, max_results, merge, typed)
+
+    async def aiter_search(
+        self,
+        q: Annotated[Optional[str], "Search query"] = None,
+        engines: Annotated[Optional[list[str]], "List of search engines"] = None,
+        enabled_plugins: Annotated[Optional[list[str]], "List of plugins"] = None,
+        time_range: Annotated[str, "Time range filter"] = None,
+        language: Annotated[str, "Search language"] = "",
+        limit: Annotated[Optional[int], "Number of results per engine"] = None,
+        pageno: Annotated[int, "Page number"] = 1,
+        safesearch: Annotated[int, "Safe search level"] = 0,
+        country: Annotated[str, "Country to search"] = "",
+        categories: Annotated[str, "Search category"] = "general",
+        proxy: Annotated[Union[str, dict[str, str], ProxyPool], "HTTP or HTTPS proxy string or dict, or a ProxyPool"] = None,
+        deadline: Annotated[Optional[float], "Seconds until the search returns what it has"] = None,
+        timeout: Annotated[Union[float, dict[str, float], None], "Seconds per engine, or per engine name"] = None,
+        hedge: Annotated[bool, "Duplicate engine requests slower than the engine's p95"] = False,
+        ) -> AsyncIterator[tuple]:
+        """
+        Async iterator version of iter_search(). Takes the same arguments and yields the same tuples.
+        """
+        plan = await self._aplan(
+            q, engines, enabled_plugins, time_range, language, limit,
+            pageno, safesearch, country, categories, proxy, None, deadline, timeout, hedge,
+        )
+        async for item in self._arun(plan):
+            yield item
+
+    def _batch_search(self, kwargs: dict, retries: int, retry_backoff: float) -> dict:
+        # One query of search_many(): a rate limited search, then retries of the engines that failed transiently.
+        _check_batch_arguments(kwargs)
+        kwargs = dict(kwargs)
+        typed = kwargs.pop("typed", False)
+        plan = self._plan(**kwargs)
+        plan.rate_limited = True
+        response = self._collect(plan)
+
+        query, results = plan.params["query"], response["results"]
+        for attempt in range(retries):
+            failed = [name for name, output in results.items() if isinstance(output, dict) and is_transient(output)]
+            if not failed:
+                break
+            time.sleep(backoff_delay(attempt, retry_backoff))
+
+            plan = self._plan(**{**kwargs, "engines": failed, "merge": None})
+            plan.rate_limited = True
+            retried = self._collect(plan)["results"]
+            for name in failed:
+                results[name] = retried.get(name, results[name])
+            if "timed_out_engines" in results:
+                results["timed_out_engines"] = [name for name in results["timed_out_engines"] if results[name].get("timed_out")]
+
+        return self._response(
+            results, response["pre_plugins"], kwargs.get("merge"), typed, response.get("plugin_timings"), response.get("timings"), query,
+        )
+
+    def search_many(
+        self,
+        queries: Annotated[Iterable[Union[str, dict]], "Queries, or dicts of search() arguments"],
+        concurrency: Annotated[int, "Queries searched at the same time"] = 8,
+        retries: Annotated[int, "Retries of engines that failed transiently"] = 2,
+        retry_backoff: Annotated[float, "Base of the jittered exponential backoff in seconds"] = 1.0,
+        checkpoint: Annotated[Union[str, Checkpoint, None], "Progress file to resume from"] = None,
+        **search_kwargs,
+        ) -> Iterator[dict]:
+        """
+        Searches many queries and yields each one's response as soon as it completes.
+
+        At most `concurrency` queries run at once and the requests of every engine follow the engine's
+        "rate_limit" in engine_params.json, counted per host. Engines failing with timeouts, connection
+        errors or 5xx/429 responses are retried with jittered exponential backoff. With a checkpoint
+        file, finished queries are recorded and skipped when the batch is started again.
+
+        Args:
+            queries: Query strings, or dicts of search() arguments including "q".
+            search_kwargs: search() arguments shared by all queries. pages, max_results and prefetch
+                are not supported and raise TypeError before any query is searched.
+
+        Yields:
+            dict: {"query": query, "response": search() response}, or {"query": query, "error": message}
+                if the search raised.
+        """
+        _check_batch_arguments(search_kwargs)
+        return self._search_many(queries, concurrency, retries, retry_backoff, checkpoint, search_kwargs)
+
+    def _search_many(self, queries, concurrency, retries, retry_backoff, checkpoint, search_kwargs) -> Iterator[dict]:
+        own_checkpoint = checkpoint is not None and not isinstance(checkpoint, Checkpoint)
+        if own_checkpoint:
+            checkpoint = Checkpoint(checkpoint)
+
+        def run(query):
+            kwargs = {**search_kwargs, **query} if isinstance(query, dict) else {**search_kwargs, "q": query}
+            return self._batch_search(kwargs, retries, retry_backoff)
+
+        queries = iter(queries)
+        pending = {}
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pyMOA-batch") as pool:
+                def fill():
+                    # Only a window of queries is submitted, so huge batches aren't loaded at once.
+                    while len(pending) < concurrency * 2:
+                        query = next(queries, None)
+                        if query is None:
+                            return
+                        if checkpoint is not None and query in checkpoint:
+                            continue
+                        pending[pool.submit(run, query)] = query
+
+                fill()
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        query = pending.pop(future)
+                        try:
+                            item = {"query": query, "response": future.result()}
+                        except Exception as e:
+                            item = {"query": query, "error": str(e)}
+                        yield item
+                        # Recorded once the caller has taken the result.
+                        if checkpoint is not None and "error" not in item:
+                            checkpoint.mark(query)
+                    fill()
+        finally:
+            for future in pending:
+                future.cancel()
+            if own_checkpoint:
+                checkpoint.close()
@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+import time
+import logging
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CONFIGS_DIR = Path(__file__).parent.parent / "configs"
+
+# Seconds between two checks of a config file for changes.
+CHECK_INTERVAL = 1.0
+
+NUMBER = (int, float)
+OPTIONAL_NUMBER = (int, float, type(None))
+
+# Expected type of the keys of each class section. Nested dicts describe blocks whose keys are all known,
+# other keys may hold anything the engine or plugin reads itself.
+ENGINE_SCHEMA = {
+    "type": str,
+    "params": dict,
+    "http": {"pool_connections": int, "pool_maxsize": int, "idle_timeout": OPTIONAL_NUMBER, "pool_block": bool},
+    "stream": {"max_bytes": int, "chunk_size": int, "drain_bytes": int},
+    "rate_limit": {"rate": NUMBER, "burst": NUMBER},
+}
+
+PLUGIN_SCHEMA = {
+    "type": str,
+    "params": dict,
+    "budget": OPTIONAL_NUMBER,
+    "enabled": bool,
+}
+
+EMPTY = MappingProxyType({})
+
+
+def validate(section: dict, schema: dict, path: str):
+    # Raises ValueError naming the first key that does not match the schema.
+    for key, value in section.items():
+        expected = schema.get(key)
+        if expected is None:
+            continue
+        if isinstance(expected, dict):
+            if not isinstance(value, dict):
+                raise ValueError(f"{path}.{key} must be an object")
+            unknown = set(value) - set(expected)
+            if unknown:
+                raise ValueError(f"{path}.{key} has unknown keys {sorted(unknown)}")
+            validate(value, expected, f"{path}.{key}")
+            continue
+        types = expected if isinstance(expected, tuple) else (expected,)
+        # bool is an int, but true is no number of connections.
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            names = " or ".join("null" if t is type(None) else t.__name__ for t in types)
+            raise ValueError(f"{path}.{key} must be {names}, not {type(value).__name__}")
+
+
+class ConfigStore:
+    """
+    One JSON config file, parsed once and shared by every engine or plugin that reads it.
+
+    The file maps class names to their config. It is checked for changes at most every `interval`
+    seconds, when a config is read. A changed file is parsed and validated against the schema
+    before it replaces the previous version as a whole, so readers see either the old or the new
+    file, never a mix. An invalid file is logged and ignored until it changes again.
+
+    Args:
+        path (Path): The JSON file. A missing file is the same as an empty one.
+        schema (dict): Expected types of the keys of each class section, see ENGINE_SCHEMA.
+        interval (float): Seconds between two checks of the file.
+    """
+
+    def __init__(self, path: Path, schema: dict, interval: float = CHECK_INTERVAL):
+        self.path = Path(path)
+        self.schema = schema
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stamp = self._stat()
+        self._data = self._read()
+        self._next_check = time.monotonic() + interval
+
+    def _stat(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read(self) -> Dict[str, dict]:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.path.name} must hold an object")
+        for name, section in data.items():
+            if not isinstance(section, dict):
+                raise ValueError(f"{self.path.name}: {name} must be an object")
+            validate(section, self.schema, f"{self.path.name}: {name}")
+        return data
+
+    def check(self, force: bool = False) -> bool:
+        # Reloads the file if it changed since it was read. Returns whether it was reloaded.
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        with self._lock:
+            if not force and now < self._next_check:
+                return False
+            self._next_check = now + self.interval
+            stamp = self._stat()
+            if stamp == self._stamp:
+                return False
+            self._stamp = stamp
+            try:
+                data = self._read()
+            except ValueError as e:  # json.JSONDecodeError is a ValueError too
+                logger.error("Ignoring the changes to %s: %s", self.path.name, str(e))
+                return False
+            self._data = data
+        logger.info("Reloaded %s", self.path.name)
+        return True
+
+    def section(self, name: str) -> Mapping:
+        self.check()
+        return self._data.get(name, EMPTY)
+
+    def view(self, name: str) -> "ConfigView":
+        return ConfigView(self, name)
+
+
+class ConfigView(Mapping):
+    """
+    Read-only view of the config of one class. Always shows the current version of the file.
+    """
+
+    def __init__(self, store: ConfigStore, name: str):
+        self.store = store
+        self.name = name
+
+    def __getitem__(self, key):
+        return self.store.section(self.name)[key]
+
+    def __iter__(self):
+        return iter(self.store.section(self.name))
+
+    def __len__(self):
+        return len(self.store.section(self.name))
+
+    def __repr__(self):
+        return f"ConfigView({self.name!r}, {dict(self.store.section(self.name))!r})"
+
+
+_stores: Dict[str, ConfigStore] = {}
+_stores_lock = threading.Lock()
+
+
+def config_store(file_name: str, schema: dict) -> ConfigStore:
+    # The shared store of a file in the configs directory.
+    with _stores_lock:
+        store = _stores.get(file_name)
+        if store is None:
+            store = _stores[file_name] = ConfigStore(CONFIGS_DIR / file_name, schema)
+        return store
+
+
+def engine_config() -> ConfigStore:
+    return config_store("engine_params.json", ENGINE_SCHEMA)
+
+
+def plugin_config() -> ConfigStore:
+    return config_store("plugin_params.json", PLUGIN_SCHEMA)
+
+
+def check_configs():
+    # Reloads the config files that changed, without waiting for their next check.
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.check(force=True)
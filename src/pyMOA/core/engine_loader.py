@@ -1,16 +1,41 @@
 import importlib
-import pkgutil
+import json
+import threading
+from importlib import metadata
 from pathlib import Path
-from typing import Dict, Type
+from typing import Callable, Dict, Optional
 from pyMOA.core.base_engine import BaseEngine
 import logging
 
 logger = logging.getLogger(__name__)
 
+ENTRY_POINT_GROUP = "pyMOA.engines"
+
+
 class EngineLoader:
-    
-    def __init__(self):
+    """
+    Registry of the available engines.
+
+    Engines are found without importing them: built-in engines are listed in configs/engine_manifest.json,
+    third-party packages register theirs under the "pyMOA.engines" entry point group, e.g.
+
+        [project.entry-points."pyMOA.engines"]
+        myengine = "mypackage.engine:MyEngine"
+
+    and modules under pyMOA/engines/ missing from the manifest are picked up by name. With lazy=True
+    (the default) an engine is only imported and instantiated the first time get_engine() asks for it.
+    Entry point engines are listed as "general" until loaded, then under their configured type.
+    Manifest entries can set "selected_by_default": false for engines that only run when named.
+
+    Args:
+        lazy (bool): Import engines on first use instead of all at once.
+        setup (callable or None): Called with every engine instance right after it is created.
+    """
+
+    def __init__(self, lazy: bool = True, setup: Optional[Callable[[BaseEngine], None]] = None):
         self.engines: Dict[str, BaseEngine] = {}
+        self.registry: Dict[str, dict] = {}  # engine id -> {"path": ..., "category": ...}
+        self.setup = setup
         self.valid_engines = []
         self.failed_engines = []
         self.general_engines = []
@@ -21,6 +46,7 @@ class EngineLoader:
         self.maps_engines = []
         self.shaping_engines = []
         self.other_engines = []
+        self._lock = threading.RLock()
 
         self.category_map = {
             "general": self.general_engines,
@@ -33,57 +59,146 @@ class EngineLoader:
         }
 
 
-        self.load_engines()
-    
-    def load_engines(self):
+        self.discover_engines()
+        if not lazy:
+            self.load_engines()
+
+    def discover_engines(self):
+        # Fills the registry from the manifest, the entry points and the engines directory, without imports.
+        manifest_path = Path(__file__).parent.parent / "configs" / "engine_manifest.json"
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+
+        for engine_id, entry in manifest.items():
+            self._register(engine_id, entry["path"], entry.get("category", "general"))
+            if "selected_by_default" in entry:
+                self.registry[engine_id.lower()]["selected_by_default"] = entry["selected_by_default"]
+
+        for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+            if entry_point.name.lower() not in self.registry:
+                self._register(entry_point.name, entry_point.value, "general")
+
+        known_modules = {entry["path"].split(":")[0] for entry in self.registry.values()}
         engines_dir = Path(__file__).parent.parent / "engines"
-        
         for module_path in engines_dir.glob("*.py"):
-            if module_path.name == "__init__.py":
+            module_name = f"pyMOA.engines.{module_path.stem}"
+            if module_path.name == "__init__.py" or module_name in known_modules:
                 continue
-            
-            module_name = module_path.stem
+            self._register(module_path.stem, module_name, "general")
+
+    def _register(self, engine_id: str, path: str, category: str):
+        engine_id = engine_id.lower()
+        self.registry[engine_id] = {"path": path, "category": category}
+        self.valid_engines.append(engine_id)
+        self.category_map.get(category.lower(), self.other_engines).append(engine_id)
+
+    def _unregister(self, engine_id: str):
+        for engines in [self.valid_engines, self.other_engines, *self.category_map.values()]:
+            if engine_id in engines:
+                engines.remove(engine_id)
+
+    @staticmethod
+    def _import_class(path: str):
+        # "package.module:Class", or just a module in which the first BaseEngine subclass is used.
+        module_name, _, class_name = path.partition(":")
+        module = importlib.import_module(module_name)
+        if class_name:
+            return getattr(module, class_name)
+
+        for attr_name in dir(module):
+            attr = getattr(module, attr_name)
+            if (
+                isinstance(attr, type)
+                and issubclass(attr, BaseEngine)
+                and attr != BaseEngine
+            ):
+                return attr
+        raise AttributeError("No valid engine class found")
+
+    def _load(self, engine_id: str) -> Optional[BaseEngine]:
+        with self._lock:
+            if engine_id in self.engines:
+                return self.engines[engine_id]
+            entry = self.registry.get(engine_id)
+            if entry is None or engine_id in self.failed_engines:
+                return None
+
             try:
-                module = importlib.import_module(f"pyMOA.engines.{module_name}")
-                engine_class = None
-                
-                for attr_name in dir(module):
-                    attr = getattr(module, attr_name)
-                    if (
-                        isinstance(attr, type)
-                        and issubclass(attr, BaseEngine)
-                        and attr != BaseEngine
-                    ):
-                        engine_class = attr
-                        break
-                
-                if not engine_class:
-                    raise AttributeError("No valid engine class found")
-                
-                engine_id = engine_class.__name__.replace("Engine", "").lower()
+                engine_class = self._import_class(entry["path"])
                 instance = engine_class()
-                self.engines[engine_id] = instance
-                self.valid_engines.append(engine_id)
-                engine_type = instance.get_type().lower()
-                target_list = self.category_map.get(engine_type, self.other_engines)
-                target_list.append(engine_id)
+                if self.setup is not None:
+                    self.setup(instance)
             except Exception as e:
-                self.failed_engines.append(module_name)
-                logger.error("Engine %s failed: %s", module_name, str(e))
+                self._unregister(engine_id)
+                self.failed_engines.append(engine_id)
+                logger.error("Engine %s failed: %s", engine_id, str(e))
+                return None
+
+            # The configured type wins over the category listed in the registry.
+            engine_type = instance.get_type().lower()
+            if engine_type != entry["category"]:
+                self._unregister(engine_id)
+                self.valid_engines.append(engine_id)
+                self.category_map.get(engine_type, self.other_engines).append(engine_id)
+                entry["category"] = engine_type
+
+            self.engines[engine_id] = instance
+            return instance
+
+    def selected_by_default(self, engine_id: str) -> bool:
+        """
+        Whether the engine runs in searches that don't name their engines (its SELECTED_BY_DEFAULT).
+        Read from the manifest, or else from the engine class, so opt-in engines are not instantiated.
+        """
+        engine_id = engine_id.lower()
+        engine = self.engines.get(engine_id)
+        if engine is not None:
+            return engine.SELECTED_BY_DEFAULT
+        entry = self.registry.get(engine_id)
+        if entry is None:
+            return True
+        if "selected_by_default" not in entry:
+            try:
+                entry["selected_by_default"] = self._import_class(entry["path"]).SELECTED_BY_DEFAULT
+            except Exception:
+                return True  # get_engine() reports the failure
+        return entry["selected_by_default"]
+
+    def load_engines(self):
+        # Imports every registered engine.
+        for engine_id in list(self.registry):
+            self._load(engine_id)
     
     def list_engines(self):
-        return {
-            "active": self.valid_engines,
-            "failed": self.failed_engines,
-            "general": self.general_engines,
-            "images": self.images_engines,
-            "videos": self.videos_engines,
-            "news": self.news_engines,
-            "books": self.books_engines,
-            "maps": self.maps_engines,
-            "shaping": self.shaping_engines,
-            "other": self.other_engines,
-        }
+        # Copies, since loading an engine can move it between the lists.
+        with self._lock:
+            return {
+                "active": list(self.valid_engines),
+                "failed": list(self.failed_engines),
+                "general": list(self.general_engines),
+                "images": list(self.images_engines),
+                "videos": list(self.videos_engines),
+                "news": list(self.news_engines),
+                "books": list(self.books_engines),
+                "maps": list(self.maps_engines),
+                "shaping": list(self.shaping_engines),
+                "other": list(self.other_engines),
+            }
     
     def get_engine(self, name: str) -> BaseEngine | None:
-        return self.engines.get(name.lower())
+        name = name.lower()
+        engine = self.engines.get(name)
+        if engine is None:
+            engine = self._load(name)
+        return engine
+
+    def close(self):
+        # Closes the connection pools of all loaded engines.
+        for engine in list(self.engines.values()):
+            try:
+                engine.close()
+            except Exception as e:
+                logger.warning("Closing engine %s failed: %s", engine.__class__.__name__, str(e))
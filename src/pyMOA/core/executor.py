@@ -0,0 +1,38 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_shared_executor: ThreadPoolExecutor | None = None
+_shared_executor_lock = threading.Lock()
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """
+    Bounded thread pool shared by the async search path.
+    Runs engines and plugins that only have a blocking interface. The size can be set with the PYMOA_MAX_WORKERS environment variable.
+    """
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_executor_lock:
+            if _shared_executor is None:
+                max_workers = int(os.environ.get("PYMOA_MAX_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+                _shared_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pyMOA-shared")
+    return _shared_executor
+
+
+def shutdown_shared_executor(wait: bool = True):
+    global _shared_executor
+    with _shared_executor_lock:
+        executor, _shared_executor = _shared_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_in_shared_executor(fn, *args, **kwargs):
+    # Runs a blocking call on the shared executor with the caller's context variables, like asyncio.to_thread().
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_shared_executor(), functools.partial(context.run, fn, *args, **kwargs))
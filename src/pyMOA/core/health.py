@@ -0,0 +1,235 @@
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+SUCCESS = "success"
+ERROR = "error"
+CAPTCHA = "captcha"
+TIMEOUT = "timeout"
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def error_output(e: BaseException) -> dict:
+    """
+    Output of an engine call that raised e. Next to the message, "exc_type" holds the exception's
+    class name and "status" the HTTP status of the response, for errors raised from one.
+    """
+    output = {"error": str(e), "exc_type": type(e).__name__}
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if isinstance(status, int):
+        output["status"] = status
+    return output
+
+
+def classify_output(output) -> str:
+    """
+    Returns the outcome of an engine output: success, error, captcha or timeout.
+    """
+    if not isinstance(output, dict) or "error" not in output:
+        return SUCCESS
+    if output.get("timed_out") or "timed out" in str(output["error"]).lower():
+        return TIMEOUT
+    if "captcha" in str(output["error"]).lower():
+        return CAPTCHA
+    return ERROR
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one engine.
+
+    Opens after failure_threshold failures in a row. While open, requests are refused until the
+    backoff has passed. Then a single probe request is let through (half open): a success closes
+    the breaker, a failure opens it again with the backoff doubled, up to max_backoff.
+    CAPTCHA pages count as captcha_weight failures, since repeating the request only makes them worse.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 30.0,
+                 max_backoff: float = 1800.0, captcha_weight: int = 3):
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.captcha_weight = captcha_weight
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0  # Times opened in a row, drives the exponential backoff
+        self.opened_at = 0.0
+        self.probe_at = 0.0
+        self.backoff = 0.0
+
+    def allow(self, now: float) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now - self.opened_at >= self.backoff:
+            self.state = HALF_OPEN
+            self.probe_at = now
+            return True
+        if self.state == HALF_OPEN and now - self.probe_at >= self.backoff:
+            # The probe never reported back, let another one through.
+            self.probe_at = now
+            return True
+        # Only one probe at a time while half open.
+        return False
+
+    def record(self, outcome: str, now: float):
+        if outcome == SUCCESS:
+            self.state = CLOSED
+            self.failures = 0
+            self.trips = 0
+            return
+
+        self.failures += self.captcha_weight if outcome == CAPTCHA else 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trips += 1
+            self.state = OPEN
+            self.opened_at = now
+            self.backoff = min(self.base_backoff * 2 ** (self.trips - 1), self.max_backoff)
+            self.failures = 0
+
+    def retry_in(self, now: float) -> float:
+        return max(self.opened_at + self.backoff - now, 0.0) if self.state == OPEN else 0.0
+
+
+class LatencyHistogram:
+    """
+    Latencies in buckets growing by 10%, from 1 ms to about 2 minutes, so quantiles are within 10%
+    of the exact value. The counts are halved once there are more than max_count, which makes the
+    histogram follow an engine getting faster or slower.
+    """
+
+    GROWTH = 1.1
+    SMALLEST = 0.001
+    BUCKETS = 125  # The last one holds everything above SMALLEST * GROWTH ** 123, about 2 minutes
+
+    def __init__(self, max_count: int = 1000):
+        self.max_count = max_count
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+
+    def record(self, latency: float):
+        if latency <= self.SMALLEST:
+            bucket = 0
+        else:
+            bucket = min(int(math.log(latency / self.SMALLEST, self.GROWTH)) + 1, self.BUCKETS - 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        if self.count > self.max_count:
+            self.counts = [count // 2 for count in self.counts]
+            self.count = sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Upper bound of the bucket holding the q quantile.
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.SMALLEST * self.GROWTH ** bucket
+        return self.SMALLEST * self.GROWTH ** (self.BUCKETS - 1)
+
+
+class EngineStats:
+    # Counters and latency of one engine.
+
+    def __init__(self):
+        self.outcomes = {SUCCESS: 0, ERROR: 0, CAPTCHA: 0, TIMEOUT: 0}
+        self.last_outcome: Optional[str] = None
+        self.last_latency: Optional[float] = None
+        self.average_latency: Optional[float] = None  # Exponential moving average
+        self.latencies = LatencyHistogram()  # Of successful calls only
+
+    def record(self, outcome: str, latency: Optional[float]):
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.last_outcome = outcome
+        if latency is not None and outcome == SUCCESS:
+            self.latencies.record(latency)
+        if latency is not None:
+            self.last_latency = latency
+            if self.average_latency is None:
+                self.average_latency = latency
+            else:
+                self.average_latency += 0.2 * (latency - self.average_latency)
+
+
+class HealthRegistry:
+    """
+    Records the outcome and latency of every engine call and keeps a circuit breaker per engine.
+    Engines with an open breaker are skipped by MOAClient.search and reported as degraded.
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 30.0,
+                 max_backoff: float = 1800.0, captcha_weight: int = 3):
+        self.breaker_options = {
+            "failure_threshold": failure_threshold,
+            "base_backoff": base_backoff,
+            "max_backoff": max_backoff,
+            "captcha_weight": captcha_weight,
+        }
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats: Dict[str, EngineStats] = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, engine_name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(engine_name)
+        if breaker is None:
+            breaker = self.breakers[engine_name] = CircuitBreaker(**self.breaker_options)
+            self.stats[engine_name] = EngineStats()
+        return breaker
+
+    def allow(self, engine_name: str) -> bool:
+        with self._lock:
+            return self._breaker(engine_name).allow(time.monotonic())
+
+    def record(self, engine_name: str, outcome: str, latency: Optional[float] = None, trip: bool = True):
+        # With trip=False the outcome is only counted in the stats and leaves the breaker as it is.
+        with self._lock:
+            breaker = self._breaker(engine_name)
+            if trip:
+                breaker.record(outcome, time.monotonic())
+            self.stats[engine_name].record(outcome, latency)
+
+    def record_output(self, engine_name: str, output, latency: Optional[float] = None, trip: bool = True) -> str:
+        outcome = classify_output(output)
+        self.record(engine_name, outcome, latency, trip)
+        return outcome
+
+    def quantile(self, engine_name: str, q: float, min_samples: int = 20) -> Optional[float]:
+        """
+        Latency of the engine's successful calls at quantile q, e.g. 0.95 for the p95.
+        None until the engine succeeded min_samples times.
+        """
+        with self._lock:
+            stats = self.stats.get(engine_name)
+            if stats is None or stats.latencies.count < min_samples:
+                return None
+            return stats.latencies.quantile(q)
+
+    def reset(self, engine_name: Optional[str] = None):
+        with self._lock:
+            if engine_name is None:
+                self.breakers.clear()
+                self.stats.clear()
+            else:
+                self.breakers.pop(engine_name, None)
+                self.stats.pop(engine_name, None)
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "state": breaker.state,
+                    "retry_in": breaker.retry_in(now),
+                    "outcomes": dict(self.stats[name].outcomes),
+                    "last_outcome": self.stats[name].last_outcome,
+                    "average_latency": self.stats[name].average_latency,
+                    "p50": self.stats[name].latencies.quantile(0.5),
+                    "p95": self.stats[name].latencies.quantile(0.95),
+                }
+                for name, breaker in self.breakers.items()
+            }
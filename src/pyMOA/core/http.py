@@ -0,0 +1,294 @@
+import asyncio
+import functools
+import importlib.util
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional, Union
+from pyMOA.core.metrics import add_timing, current_timings
+
+# requests and httpx are slow to import, they are imported with the first session so that
+# importing pyMOA, listing engines or answering from the cache does not pay for them.
+
+
+CONNECT_STAGES = ("connection.connect_tcp", "connection.connect_unix_socket", "connection.start_tls")
+
+
+@functools.lru_cache(maxsize=None)
+def _timed_adapter_class():
+    """
+    HTTPAdapter whose connections add the time spent opening them (DNS, TCP and TLS) to the
+    timings of the engine call, when metrics are enabled.
+    """
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.poolmanager import pool_classes_by_scheme
+
+    class TimedConnect:
+        def connect(self):
+            timings = current_timings()
+            if timings is None:
+                return super().connect()
+            started = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                add_timing(timings, "connect", time.perf_counter() - started)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = type("TimedHTTPConnection", (TimedConnect, HTTPConnection), {})
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = type("TimedHTTPSConnection", (TimedConnect, HTTPSConnection), {})
+
+    timed_pools = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+    class TimedHTTPAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = timed_pools
+
+        def proxy_manager_for(self, proxy, **proxy_kwargs):
+            manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+            # SOCKS proxy managers bring their own connection classes.
+            if manager.pool_classes_by_scheme is pool_classes_by_scheme:
+                manager.pool_classes_by_scheme = timed_pools
+            return manager
+
+    return TimedHTTPAdapter
+
+
+@functools.lru_cache(maxsize=None)
+def _session_class():
+    """
+    requests.Session that looks up the proxy and CA bundle settings of the environment once per host,
+    instead of on every request: reading them scans os.environ several times, which took about a third
+    of the CPU time of an engine call. Sessions are recreated after idle_timeout, which picks up changes.
+    """
+    import requests
+    from urllib.parse import urlsplit
+
+    class Session(requests.Session):
+        def __init__(self):
+            super().__init__()
+            self._environment = {}
+
+        def merge_environment_settings(self, url, proxies, stream, verify, cert):
+            parts = urlsplit(url)
+            key = (parts.scheme, parts.netloc, tuple(sorted((proxies or {}).items())), stream, verify, cert)
+            try:
+                settings = self._environment.get(key)
+            except TypeError:  # Unhashable arguments
+                return super().merge_environment_settings(url, proxies, stream, verify, cert)
+            if settings is None:
+                settings = super().merge_environment_settings(url, proxies, stream, verify, cert)
+                if len(self._environment) >= 256:
+                    self._environment.clear()
+                self._environment[key] = settings
+            return dict(settings)
+
+    return Session
+
+
+class SessionPool:
+    """
+    Pooled keep-alive HTTP sessions of an engine.
+
+    One requests.Session is kept per proxy configuration, so connections are only reused
+    through the same proxy. Sessions unused for longer than idle_timeout seconds are
+    closed by the next request of the engine, through any proxy, and recreated on next use.
+    """
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 idle_timeout: Optional[float] = None, pool_block: bool = False):
+        self.pool_connections = pool_connections  # Number of hosts to keep pools for
+        self.pool_maxsize = pool_maxsize          # Max connections kept per host
+        self.idle_timeout = idle_timeout
+        self.pool_block = pool_block
+        self._sessions: Dict[object, list] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(proxy):
+        if isinstance(proxy, dict):
+            return tuple(sorted(proxy.items()))
+        return proxy or None
+
+    @staticmethod
+    def _proxies(proxy: Union[str, dict, None]) -> dict:
+        if not proxy:
+            return {}
+        if isinstance(proxy, str):
+            return {"http": proxy, "https": proxy}
+        return dict(proxy)
+
+    def _new_session(self, proxy) -> "requests.Session":
+        session = _session_class()()
+        adapter = _timed_adapter_class()(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.proxies.update(self._proxies(proxy))
+        # Nothing is remembered between searches, cookies are passed per request by the engines.
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get(self, proxy=None) -> "requests.Session":
+        key = self._key(proxy)
+        now = time.monotonic()
+        with self._lock:
+            stale = self._pop_idle(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = self._sessions[key] = [self._new_session(proxy), now]
+            entry[1] = now
+        for session in stale:
+            session.close()
+        return entry[0]
+
+    def _pop_idle(self, now: float) -> list:
+        # Takes the sessions unused for longer than idle_timeout out of the pool, the caller closes them
+        # outside the lock. Every get() sweeps them, so pools of proxies that are no longer used don't stay open.
+        if self.idle_timeout is None:
+            return []
+        idle = [key for key, (_, last_used) in self._sessions.items() if now - last_used > self.idle_timeout]
+        return [self._sessions.pop(key)[0] for key in idle]
+
+    def request(self, method: str, url: str, proxy=None, **kwargs) -> "requests.Response":
+        timings = current_timings()
+        if timings is None:
+            return self.get(proxy).request(method, url, **kwargs)
+
+        # Headers and body are read separately to tell the time to first byte from the download.
+        stream = kwargs.pop("stream", False)
+        connect = timings.get("connect", 0)
+        started = time.perf_counter()
+        response = self.get(proxy).request(method, url, stream=True, **kwargs)
+        headers = time.perf_counter()
+        add_timing(timings, "ttfb", headers - started - (timings.get("connect", 0) - connect))
+        if not stream:
+            add_timing(timings, "bytes", len(response.content))
+            add_timing(timings, "download", time.perf_counter() - headers)
+        return response
+
+    def close_idle(self):
+        with self._lock:
+            stale = self._pop_idle(time.monotonic())
+        for session in stale:
+            session.close()
+
+    def close(self):
+        with self._lock:
+            sessions = [session for session, _ in self._sessions.values()]
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+class AsyncSessionPool:
+    """
+    Pooled keep-alive async HTTP clients of an engine, backed by httpx.
+
+    Clients are bound to the event loop they were created in, so one client is kept per
+    event loop and proxy configuration. Takes the same settings as SessionPool.
+    """
+
+    # The async HTTP client is optional, see the "async" extra.
+    available = importlib.util.find_spec("httpx") is not None
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 idle_timeout: Optional[float] = None, pool_block: bool = False):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.idle_timeout = idle_timeout
+        self._clients: Dict[tuple, "httpx.AsyncClient"] = {}
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        import httpx
+
+        return httpx.Limits(
+            max_connections=self.pool_connections * self.pool_maxsize,
+            max_keepalive_connections=self.pool_connections * self.pool_maxsize,
+            keepalive_expiry=self.idle_timeout if self.idle_timeout is not None else 5.0,
+        )
+
+    def _new_client(self, proxy) -> "httpx.AsyncClient":
+        import httpx
+
+        limits = self._limits()
+        mounts = {
+            f"{scheme}://": httpx.AsyncHTTPTransport(proxy=url, limits=limits)
+            for scheme, url in SessionPool._proxies(proxy).items()
+        }
+        return httpx.AsyncClient(limits=limits, mounts=mounts or None, follow_redirects=True)
+
+    def get(self, proxy=None) -> "httpx.AsyncClient":
+        loop = asyncio.get_running_loop()
+        key = (loop, SessionPool._key(proxy))
+        with self._lock:
+            # Forget clients of event loops that no longer exist.
+            for dead in [k for k in self._clients if k[0].is_closed()]:
+                del self._clients[dead]
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = self._new_client(proxy)
+        return client
+
+    @staticmethod
+    async def _send(client, method: str, url: str, stream: bool, **kwargs) -> "httpx.Response":
+        if not stream:
+            return await client.request(method, url, **kwargs)
+        # The body is left unread, the caller reads it and closes the response.
+        return await client.send(client.build_request(method, url, **kwargs), stream=True)
+
+    async def request(self, method: str, url: str, proxy=None, cookies=None, stream: bool = False,
+                      **kwargs) -> "httpx.Response":
+        if cookies:
+            # httpx deprecates per request cookies, send them as a header instead.
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+            kwargs["headers"] = headers
+        timings = current_timings()
+        if timings is None:
+            return await self._send(self.get(proxy), method, url, stream, **kwargs)
+
+        started = {}
+
+        async def trace(event: str, info: dict):
+            # httpcore reports each step of the request as "<step>.started" and "<step>.complete".
+            step, _, state = event.rpartition(".")
+            if state == "started":
+                started[step] = time.perf_counter()
+            elif state == "complete" and step in started:
+                if step in CONNECT_STAGES:
+                    add_timing(timings, "connect", time.perf_counter() - started[step])
+                elif step.endswith("receive_response_headers"):
+                    sent = started.get(step.replace("receive_response_headers", "send_request_headers"), started[step])
+                    add_timing(timings, "ttfb", time.perf_counter() - sent)
+                elif step.endswith("receive_response_body") and not stream:
+                    # Streamed bodies are timed by their reader.
+                    add_timing(timings, "download", time.perf_counter() - started[step])
+
+        extensions = {**(kwargs.pop("extensions", None) or {}), "trace": trace}
+        response = await self._send(self.get(proxy), method, url, stream, extensions=extensions, **kwargs)
+        if not stream:
+            add_timing(timings, "bytes", len(response.content))
+        return response
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            keys = [k for k in self._clients if k[0] is loop]
+            clients = [self._clients.pop(k) for k in keys]
+        for client in clients:
+            await client.aclose()
+
+    def close(self):
+        # Clients can only be closed from their own event loop, the rest are dropped.
+        with self._lock:
+            self._clients.clear()
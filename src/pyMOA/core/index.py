@@ -0,0 +1,248 @@
+import re
+import sqlite3
+import threading
+import time
+import logging
+from collections import deque
+from pathlib import Path
+from typing import List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Results inserted or refreshed, newest fetch wins when several engines return the same url.
+UPSERT = (
+    "INSERT INTO results (url, title, content, engine, query, fetched) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (url) DO UPDATE SET title = excluded.title, content = excluded.content, "
+    "engine = excluded.engine, query = excluded.query, fetched = excluded.fetched"
+)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS results ("
+    "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, title TEXT NOT NULL, content TEXT NOT NULL, "
+    "engine TEXT NOT NULL, query TEXT NOT NULL, fetched REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS results_fetched ON results (fetched)",
+    # External content table: the text is only stored once, in results, and the triggers keep the index in sync.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS results_fts USING fts5("
+    "title, content, query, content='results', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN "
+    "INSERT INTO results_fts (rowid, title, content, query) VALUES (new.id, new.title, new.content, new.query); END",
+    "CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN "
+    "INSERT INTO results_fts (results_fts, rowid, title, content, query) "
+    "VALUES ('delete', old.id, old.title, old.content, old.query); END",
+    "CREATE TRIGGER IF NOT EXISTS results_update AFTER UPDATE ON results BEGIN "
+    "INSERT INTO results_fts (results_fts, rowid, title, content, query) "
+    "VALUES ('delete', old.id, old.title, old.content, old.query); "
+    "INSERT INTO results_fts (rowid, title, content, query) VALUES (new.id, new.title, new.content, new.query); END",
+    # Matches in titles count most, matches with the query the result was fetched for least.
+    "INSERT INTO results_fts (results_fts, rank) VALUES ('rank', 'bm25(4.0, 1.0, 0.5)')",
+]
+
+SEARCH = (
+    "SELECT results.title, results.url, results.content, results.engine, results.fetched "
+    "FROM results_fts JOIN results ON results.id = results_fts.rowid "
+    "WHERE results_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?"
+)
+
+
+def match_expression(query: str, operator: str = " ") -> Optional[str]:
+    # FTS5 query of the words of a search query, each quoted so no word is read as FTS5 syntax.
+    terms = re.findall(r"\w+", query.lower())
+    return operator.join(f'"{term}"' for term in dict.fromkeys(terms)) or None
+
+
+class LocalIndex:
+    """
+    Full-text index of every result fetched by the client it is given to, in an SQLite FTS5 database.
+    The "local" engine answers searches from it without any network request.
+
+    Results are queued by add() and written by a background thread, in one transaction per batch,
+    so recording them never waits for the disk. The database is kept bounded: results older than
+    max_age and the oldest results above max_rows are deleted every compact_interval seconds and
+    the freed pages given back to the file system. Several processes can share one database.
+
+    Args:
+        path (str or Path): The database file.
+        max_rows (int): Results kept at most.
+        max_age (float or None): Seconds a result is kept after it was last fetched, forever if None.
+        batch_size (int): Results written per transaction. A full batch is written right away,
+            smaller ones every flush_interval seconds.
+        flush_interval (float): Seconds between two writes of the queued results.
+        compact_interval (float): Seconds between two compactions.
+        max_pending (int): Results queued at most. When the writer falls behind, the oldest are dropped.
+    """
+
+    def __init__(self, path: Union[str, Path], max_rows: int = 200000, max_age: Optional[float] = 30 * 24 * 3600,
+                 batch_size: int = 500, flush_interval: float = 1.0, compact_interval: float = 300.0,
+                 max_pending: int = 20000):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1.")
+        self.path = str(path)
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flushed = threading.Condition(self._pending_lock)
+        self._writing = 0  # Results taken by the writer and not committed yet
+        self._closed = False
+        self._writer = None
+        self._next_compaction = time.monotonic() + compact_interval
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        with self._connection() as db:
+            if not db.execute("SELECT name FROM sqlite_master WHERE name = 'results'").fetchone():
+                # Only applies to a new database, before its first table is created.
+                db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            for statement in SCHEMA:
+                db.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared between threads, each thread opens its own.
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def add(self, engine: str, query: str, results: list):
+        """
+        Queues the results of one engine for the query they were fetched for. Returns right away.
+        """
+        now = time.time()
+        rows = [
+            (result["url"], result.get("title") or "", result.get("content") or "", engine, query or "", now)
+            for result in results
+            if isinstance(result, dict) and result.get("url")
+        ]
+        if not rows or self._closed:
+            return
+        with self._pending_lock:
+            self._pending.extend(rows)
+            overflow = len(self._pending) - self.max_pending
+            for _ in range(max(overflow, 0)):
+                self._pending.popleft()
+            self.dropped += max(overflow, 0)
+            full = len(self._pending) >= self.batch_size
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="pyMOA-index", daemon=True)
+                self._writer.start()
+        if full:
+            self._wake.set()
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            closed = self._closed
+            try:
+                self._write_pending()
+                if time.monotonic() >= self._next_compaction:
+                    self.compact()
+            except sqlite3.Error as e:
+                logger.error("Writing to the local index failed: %s", str(e))
+            if closed:
+                return
+
+    def _write_pending(self):
+        while True:
+            with self._pending_lock:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                self._writing = len(batch)
+            if not batch:
+                return
+            try:
+                db = self._connection()
+                with db:
+                    db.executemany(UPSERT, batch)
+            finally:
+                with self._pending_lock:
+                    self._writing = 0
+                    self._flushed.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the results queued so far are written. Returns False if the timeout passed first.
+        """
+        with self._pending_lock:
+            if self._writer is None:
+                return True
+            self._wake.set()
+            return self._flushed.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def compact(self) -> int:
+        """
+        Deletes the results older than max_age and the oldest ones above max_rows. Returns how many were deleted.
+        """
+        self._next_compaction = time.monotonic() + self.compact_interval
+        db = self._connection()
+        with db:
+            deleted = 0
+            if self.max_age is not None:
+                deleted += db.execute("DELETE FROM results WHERE fetched < ?", (time.time() - self.max_age,)).rowcount
+            deleted += db.execute(
+                "DELETE FROM results WHERE id IN (SELECT id FROM results ORDER BY fetched DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            ).rowcount
+            if deleted > 0:
+                # Merges the index segments, most of what was deleted is still in them until then.
+                db.execute("INSERT INTO results_fts (results_fts) VALUES ('optimize')")
+        if deleted > 0:
+            db.execute("PRAGMA incremental_vacuum")
+            logger.info("Compacted the local index, %s results deleted", deleted)
+        return deleted
+
+    def search(self, query: str, limit: int = 10, offset: int = 0) -> List[dict]:
+        """
+        Indexed results matching every word of the query, best match first. If none matches them all,
+        the results matching any of them.
+        """
+        db = self._connection()
+        rows = []
+        for operator in (" ", " OR "):
+            expression = match_expression(query or "", operator)
+            if expression is None:
+                return []
+            rows = db.execute(SEARCH, (expression, limit, offset)).fetchall()
+            if rows or expression.count('"') == 2:
+                break
+        return [
+            {"title": title, "url": url, "content": content, "engine": engine, "fetched": fetched}
+            for title, url, content, engine, fetched in rows
+        ]
+
+    def clear(self):
+        with self._pending_lock:
+            self._pending.clear()
+        db = self._connection()
+        with db:
+            db.execute("DELETE FROM results")
+        db.execute("PRAGMA incremental_vacuum")
+
+    def close(self):
+        # Writes what is still queued before closing.
+        self._closed = True
+        writer = self._writer
+        if writer is not None:
+            self._wake.set()
+            writer.join()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+    def stats(self) -> dict:
+        rows = self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        with self._pending_lock:
+            pending = len(self._pending) + self._writing
+        return {"results": rows, "pending": pending, "dropped": self.dropped}
@@ -0,0 +1,148 @@
+import contextvars
+import time
+import logging
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Timings of the engine call running in the current thread or task. None while metrics are disabled,
+# which keeps the instrumented code paths down to one context variable lookup.
+_current: contextvars.ContextVar = contextvars.ContextVar("pyMOA_timings", default=None)
+
+
+def current_timings() -> Optional[dict]:
+    return _current.get()
+
+
+def add_timing(timings: dict, stage: str, value: float):
+    # Engines may send several requests in one call, their stages add up.
+    timings[stage] = timings.get(stage, 0) + value
+
+
+def record_error(e: BaseException):
+    # Called by engines that turn an exception into an error output, so its class is not lost.
+    timings = _current.get()
+    if timings is not None:
+        timings["error"] = type(e).__name__
+
+
+def measure(timings: dict, submitted: float, fn, *args, **kwargs):
+    """
+    Calls fn with its timings made current, so the HTTP and parsing layers fill them in.
+    submitted is the time.perf_counter() value of when the call was queued.
+    """
+    started = time.perf_counter()
+    timings["queue_wait"] = started - submitted
+    token = _current.set(timings)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.reset(token)
+        timings["total"] = time.perf_counter() - started
+
+
+async def ameasure(timings: dict, submitted: float, awaitable):
+    # Async version of measure(). The timings stay current in executor threads the awaitable hands work to.
+    started = time.perf_counter()
+    timings["queue_wait"] = started - submitted
+    token = _current.set(timings)
+    try:
+        return await awaitable
+    finally:
+        _current.reset(token)
+        timings["total"] = time.perf_counter() - started
+
+
+class MetricsSink:
+    """
+    Receives the timings of every engine call of a MOAClient created with metrics enabled.
+
+    The timings are a dict of seconds spent per stage: queue_wait, connect (DNS, TCP and TLS of new
+    connections), ttfb, download, parse and total, plus bytes (body size), results (result count)
+    and error (exception class or outcome) when the call failed. Stages that did not happen, e.g.
+    connect on a reused connection, are missing.
+    """
+
+    def record(self, engine: str, timings: dict):
+        pass
+
+    def close(self):
+        pass
+
+
+class OpenTelemetrySink(MetricsSink):
+    """
+    Emits an OpenTelemetry span per engine call, with the stage timings as attributes.
+    Needs opentelemetry-api, and an SDK configured by the application to export the spans.
+    """
+
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("pyMOA")
+
+    def record(self, engine: str, timings: dict):
+        # The call already ended, the span gets its real start and end times.
+        end = time.time_ns()
+        start = end - int((timings.get("queue_wait", 0) + timings.get("total", 0)) * 1e9)
+        span = self.tracer.start_span(f"pyMOA.search {engine}", start_time=start)
+        span.set_attribute("pyMOA.engine", engine)
+        for stage, value in timings.items():
+            if stage != "error":
+                span.set_attribute(f"pyMOA.{stage}", value)
+        if "error" in timings:
+            span.set_attribute("error.type", timings["error"])
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+        span.end(end_time=end)
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Keeps Prometheus histograms of the stage timings per engine, and counters of results and errors.
+    Needs prometheus-client. serve() starts the exporter, or add the metrics of `registry` to your own.
+    """
+
+    STAGES = ("queue_wait", "connect", "ttfb", "download", "parse", "total")
+
+    def __init__(self, registry=None, namespace: str = "pymoa"):
+        from prometheus_client import REGISTRY, Counter, Histogram
+        self.registry = registry if registry is not None else REGISTRY
+        self.seconds = Histogram(
+            "engine_stage_seconds", "Seconds spent per stage of an engine call",
+            ["engine", "stage"], namespace=namespace, registry=self.registry,
+        )
+        self.bytes = Histogram(
+            "engine_response_bytes", "Size of the engine response bodies",
+            ["engine"], namespace=namespace, registry=self.registry,
+            buckets=(1e4, 3e4, 1e5, 3e5, 1e6, 3e6, float("inf")),
+        )
+        self.results = Counter(
+            "engine_results", "Results returned by the engines", ["engine"], namespace=namespace, registry=self.registry,
+        )
+        self.errors = Counter(
+            "engine_errors", "Failed engine calls", ["engine", "error"], namespace=namespace, registry=self.registry,
+        )
+
+    def record(self, engine: str, timings: dict):
+        for stage in self.STAGES:
+            if stage in timings:
+                self.seconds.labels(engine, stage).observe(timings[stage])
+        if "bytes" in timings:
+            self.bytes.labels(engine).observe(timings["bytes"])
+        if timings.get("results"):
+            self.results.labels(engine).inc(timings["results"])
+        if "error" in timings:
+            self.errors.labels(engine, timings["error"]).inc()
+
+    def serve(self, port: int, addr: str = "0.0.0.0"):
+        # Serves /metrics from a background thread.
+        from prometheus_client import start_http_server
+        return start_http_server(port, addr, registry=self.registry)
+
+
+def emit(sinks: Iterable[MetricsSink], engine: str, timings: dict):
+    for sink in sinks:
+        try:
+            sink.record(engine, timings)
+        except Exception as e:
+            logger.error("metrics sink %s failed: %s", sink.__class__.__name__, str(e))
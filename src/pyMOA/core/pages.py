@@ -0,0 +1,121 @@
+import math
+from typing import Iterable, List, Optional
+from pyMOA.core.aggregator import normalize_url
+from pyMOA.core.metrics import add_timing
+
+# Pages fetched at most when only max_results is given.
+MAX_PAGES = 10
+
+# Lists of engine names in the results, combined over the pages.
+STATUS_LISTS = ("cached_engines", "degraded_engines", "timed_out_engines", "hedged_engines", "fallback_engines")
+
+
+class PageCollector:
+    """
+    Tracks the unique results of a multi-page search and which engines ran out of results.
+
+    An engine is exhausted once one of its pages fails or brings no result that was not seen
+    before, so its later pages are not requested.
+    """
+
+    def __init__(self, max_results: Optional[int] = None):
+        self.max_results = max_results
+        self.seen = set()
+        self.exhausted = set()
+        self.fetched = 0
+        self._wave_seen = 0
+        self._wave_size = 1
+
+    def add(self, name: str, output):
+        new = 0
+        if isinstance(output, dict) and isinstance(output.get("results"), list):
+            for result in output["results"]:
+                key = normalize_url(result.get("url") or "") if isinstance(result, dict) else None
+                if key and key not in self.seen:
+                    self.seen.add(key)
+                    new += 1
+        if not new:
+            self.exhausted.add(name)
+
+    @property
+    def done(self) -> bool:
+        # True once max_results unique results were collected.
+        return self.max_results is not None and len(self.seen) >= self.max_results
+
+    def next_wave(self, pages: List[int]) -> List[int]:
+        """
+        The next pages to fetch at the same time, an empty list once all pages were fetched.
+
+        Without max_results all pages are fetched at once. Otherwise the first page is fetched alone,
+        then as many pages as the unique results per page of the previous wave say are still needed.
+        """
+        remaining = pages[self.fetched:]
+        if self.max_results is not None and remaining:
+            per_page = (len(self.seen) - self._wave_seen) / self._wave_size if self.fetched else 0
+            needed = self.max_results - len(self.seen)
+            remaining = remaining[:max(math.ceil(needed / per_page), 1) if per_page else 1]
+        self.fetched += len(remaining)
+        self._wave_seen, self._wave_size = len(self.seen), max(len(remaining), 1)
+        return remaining
+
+
+def merge_pages(plans: Iterable, limit: Optional[int] = None) -> dict:
+    """
+    Combines the results of the page plans of one search into the results of the first plan.
+
+    Each engine's results are concatenated in page order, without duplicates, and cut to limit
+    if given. "pages" lists the pages that succeeded and "page_errors" the errors of the pages
+    that failed.
+    """
+    plans = list(plans)
+    results = plans[0].results
+    for key in STATUS_LISTS:
+        names = []
+        for plan in plans:
+            names.extend(name for name in plan.results.get(key, []) if name not in names)
+        if names or key in results:
+            results[key] = names
+
+    for name in list(plans[0].selected):
+        outputs = [(plan.params["page"], plan.results[name]) for plan in plans if name in plan.results]
+        if not outputs:
+            continue
+        merged, pages, errors, seen, first = [], [], {}, set(), None
+        for page, output in outputs:
+            if not isinstance(output, dict) or not isinstance(output.get("results"), list):
+                errors[page] = output.get("error") if isinstance(output, dict) else output
+                continue
+            first = first if first is not None else output
+            pages.append(page)
+            for result in output["results"]:
+                key = normalize_url(result.get("url") or "") if isinstance(result, dict) else None
+                if key and key in seen:
+                    continue
+                if key:
+                    seen.add(key)
+                merged.append(result)
+
+        if first is None:
+            results[name] = outputs[0][1]
+            continue
+        results[name] = {**first, "results": merged[:limit] if limit else merged, "pages": pages}
+        if errors:
+            results[name]["page_errors"] = errors
+    return results
+
+
+def merge_timings(plans: Iterable) -> Optional[dict]:
+    # Stage timings of each engine summed over its pages.
+    timings = None
+    for plan in plans:
+        if plan.engine_timings is None:
+            continue
+        timings = {} if timings is None else timings
+        for name, stages in plan.engine_timings.items():
+            engine = timings.setdefault(name, {})
+            for stage, value in stages.items():
+                if stage == "error":
+                    engine[stage] = value
+                else:
+                    add_timing(engine, stage, value)
+    return timings
@@ -0,0 +1,46 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+
+def _warm_up():
+    # Import lxml once per worker instead of in the first parse.
+    import pyMOA.core.parsing  # noqa: F401
+
+
+class ParsePool:
+    """
+    Runs the CPU bound parse step of the engines (HTML bytes to result dicts) in worker processes.
+
+    Requests stay on threads or asyncio, only the raw body bytes are sent to a worker and only the
+    parsed results come back, so lxml parsing no longer competes for one interpreter. Bodies smaller
+    than min_bytes are parsed in the calling thread, where the round trip to a worker costs more than
+    it saves.
+
+    Args:
+        max_workers (int or None): Number of worker processes. Defaults to the number of CPUs.
+        min_bytes (int): Smallest body that is sent to a worker.
+        start_method (str or None): multiprocessing start method. Defaults to forkserver where it is
+            available, since forking a process that runs engine threads is unsafe.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, min_bytes: int = 64 * 1024, start_method: Optional[str] = None):
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self.min_bytes = min_bytes
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_warm_up,
+        )
+
+    def parse(self, engine_cls, content: bytes, **kwargs) -> list:
+        """
+        Returns engine_cls.parse_results(content, **kwargs), computed in a worker for large bodies.
+        """
+        if len(content) < self.min_bytes:
+            return engine_cls.parse_results(content, **kwargs)
+        return self._executor.submit(engine_cls.parse_results, bytes(content), **kwargs).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,253 @@
+import functools
+import threading
+from typing import Callable, Optional
+from lxml import etree, html
+
+_local = threading.local()
+
+
+def get_parser(encoding: Optional[str] = None) -> html.HTMLParser:
+    """
+    Returns an HTML parser for the current thread.
+
+    lxml parsers can't be used by two threads at once, so each thread keeps one parser per
+    encoding. Comments, processing instructions and the id table are skipped since engines
+    never use them.
+    """
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = _new_parser(encoding)
+    return parser
+
+
+def _new_parser(encoding: Optional[str] = None) -> html.HTMLParser:
+    return html.HTMLParser(
+        encoding=encoding,
+        remove_comments=True,
+        remove_pis=True,
+        collect_ids=False,
+        no_network=True,
+        default_doctype=False,
+    )
+
+
+@functools.lru_cache(maxsize=64)
+def header_charset(content_type: Optional[str]) -> Optional[str]:
+    """
+    Charset named in a Content-Type header, e.g. "text/html; charset=UTF-8". None if there is none
+    or lxml doesn't know it, the parser then looks for a BOM or meta charset in the body.
+    """
+    for param in (content_type or "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            charset = value.strip().strip("\"'").lower()
+            try:
+                _new_parser(charset)
+            except LookupError:
+                return None
+            return charset or None
+    return None
+
+
+def parse_html(content: bytes, encoding: Optional[str] = None, stop_marker: Optional[bytes] = None):
+    """
+    Parses an HTML document straight from the response bytes.
+
+    Args:
+        content (bytes): Raw response body.
+        encoding (str or None): Charset of the body. If None, lxml looks for a BOM or meta charset.
+        stop_marker (bytes or None): Marker that only appears after the last result. Everything from
+            its first occurrence on is not parsed. The whole body is parsed if it isn't found.
+
+    Returns:
+        The root element. Empty bodies give an empty <html> element.
+    """
+    if stop_marker:
+        end = content.find(stop_marker)
+        if end > 0:
+            content = content[:end]
+    if not content or not content.strip():
+        return html.Element("html")
+    return html.document_fromstring(content, parser=get_parser(encoding))
+
+
+class StreamParser:
+    """
+    Parses an HTML document while it is downloaded, one chunk at a time.
+
+    feed() returns False once the rest of the body is not needed: when the stop marker arrived,
+    when the result marker was seen limit + 1 times (so `limit` results are complete), or when
+    max_bytes were received. Markers split between two chunks are found too: the last bytes of
+    each chunk that could start one are held back until the next chunk, so the part parsed ends
+    exactly where parse_html() would cut it.
+
+    Not every marked block has to give a result, engines drop those without a title, url or
+    snippet. With count, the document is parsed when the limit is reached and, if fewer than
+    `limit` of its results count, the body is parsed again from the start with the limit raised
+    by the missing results. The chunks read are kept for that.
+
+    Args:
+        encoding (str or None): Charset of the body. If None, lxml looks for a BOM or meta charset.
+        stop_marker (bytes or None): Marker that only appears after the last result.
+        result_marker (bytes or None): Marker that starts each result.
+        limit (int or None): Number of results needed, all of them if None.
+        max_bytes (int or None): Largest body that is read, the rest is dropped.
+        parse (bool): If False the chunks are only collected, content then holds the bytes to parse.
+        count (callable or None): Number of results of a parsed root element. Only used when parsing.
+    """
+
+    def __init__(self, encoding: Optional[str] = None, stop_marker: Optional[bytes] = None,
+                 result_marker: Optional[bytes] = None, limit: Optional[int] = None,
+                 max_bytes: Optional[int] = None, parse: bool = True, count: Optional[Callable] = None):
+        self.encoding = encoding
+        self.stop_marker = stop_marker
+        self.result_marker = result_marker if limit else None
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.count = count if parse and self.result_marker else None
+        self._wanted = limit
+        self._read = [] if self.count is not None else None  # Chunks fed, to parse again
+        self._chunks = None if parse else []
+        self._reset()
+
+    def _reset(self):
+        self.size = 0             # Bytes kept
+        self.results = 0          # Result markers seen
+        self.truncated = False    # Whether max_bytes cut the body
+        self.stopped = False
+        self.limited = False      # Whether the result limit cut the body
+        self._tail = b""          # End of the previous chunk, held back for markers split between chunks
+        self._parser = None       # Feed parsers keep the state of one document, they aren't shared
+        self._empty = True
+        self.root = None
+
+    def _occurrences(self, marker: bytes, data: bytes, end: Optional[int] = None):
+        # Offsets in data of the marker, in order, ending before end. An offset is negative if the marker
+        # starts in the previous chunk. data is searched in place, only the seam between the two chunks
+        # is copied, and markers entirely in the tail were already found with the previous chunk.
+        tail = self._tail
+        if tail:
+            seam = tail + data[:len(marker) - 1]
+            found = seam.find(marker)
+            while 0 <= found < len(tail):
+                if found + len(marker) > len(tail) and (end is None or found - len(tail) + len(marker) <= end):
+                    yield found - len(tail)
+                found = seam.find(marker, found + 1)
+        limit = len(data) if end is None else max(end, 0)
+        found = data.find(marker, 0, limit)
+        while found >= 0:
+            yield found
+            found = data.find(marker, found + 1, limit)
+
+    def _cut(self, data: bytes) -> Optional[int]:
+        # Returns the offset in data of the first marker that ends the part to parse, negative if it
+        # starts in the held back tail. Holds back the end of data as the new tail.
+        end = None
+        if self.stop_marker:
+            end = next(self._occurrences(self.stop_marker, data), None)
+        if self.result_marker:
+            for found in self._occurrences(self.result_marker, data, end):
+                self.results += 1
+                if self.results > self.limit:
+                    end, self.limited = found, True
+                    break
+        keep = max(len(self.stop_marker or b""), len(self.result_marker or b"")) - 1
+        if keep <= 0:
+            self._tail = b""
+        elif len(data) >= keep:
+            self._tail = data[-keep:]
+        else:
+            self._tail = (self._tail + data)[-keep:]
+        return end
+
+    def feed(self, data: bytes) -> bool:
+        if self.stopped:
+            return False
+        if self._read is None:
+            return self._feed(data)
+        self._read.append(data)
+        more = self._feed(data)
+        while self.limited:
+            complete = self.count(self.close())
+            if complete >= self._wanted:
+                break
+            # Some marked blocks gave no result, the body is parsed again up to more of them.
+            self.limit += self._wanted - complete
+            self._reset()
+            for chunk in self._read:
+                more = self._feed(chunk)
+                if not more:
+                    break
+        return more
+
+    def _feed(self, data: bytes) -> bool:
+        if self.max_bytes is not None and self.size + len(data) > self.max_bytes:
+            data = data[:self.max_bytes - self.size]
+            self.truncated = self.stopped = True
+        held = self._tail
+        end = self._cut(data)
+        if end is not None:
+            # Nothing from the marker on is parsed.
+            self.stopped = True
+            self._tail = b""
+            parts = (held[:len(held) + end],) if end < 0 else (held, data[:end])
+        elif self.stopped:
+            self._tail = b""
+            parts = (held, data)
+        elif len(data) >= len(self._tail):
+            parts = (held, data[:len(data) - len(self._tail)])
+        else:
+            # A chunk shorter than the tail, some of the bytes held back before are let through.
+            parts = (held[:len(held) + len(data) - len(self._tail)],)
+        self.size += sum(len(part) for part in parts) + len(self._tail) - len(held)
+        for part in parts:
+            self._emit(part)
+        return not self.stopped
+
+    def _emit(self, data: bytes):
+        # Passes bytes that are known to come before any marker to the parser.
+        if not data:
+            return
+        if self._empty and not data.isspace():
+            self._empty = False
+        if self._chunks is not None:
+            self._chunks.append(data)
+        else:
+            if self._parser is None:
+                self._parser = _new_parser(self.encoding)
+            self._parser.feed(data)
+
+    @property
+    def content(self) -> bytes:
+        # The body read so far, up to the first marker that ends it.
+        return b"".join([*(self._chunks or ()), self._tail])
+
+    def close(self):
+        # Returns the root element of what was fed. Empty bodies give an empty <html> element.
+        # lxml parsers are bound to a thread, close() has to be called in the thread that fed it.
+        if self.root is None:
+            if self._chunks is None:
+                # The body ended without a marker, the tail held back is part of the document.
+                tail, self._tail = self._tail, b""
+                self._emit(tail)
+            parser, self._parser = self._parser, None
+            if parser is not None and not self._empty:
+                self.root = parser.close()
+            if self.root is None:
+                self.root = html.Element("html")
+        return self.root
+
+
+def join_text(nodes) -> str:
+    # Joins the text nodes returned by an XPath as the engines did with " ".join(...).strip()
+    return " ".join(nodes).strip()
+
+
+def first(nodes, default=""):
+    return nodes[0] if nodes else default
+
+
+XPath = etree.XPath
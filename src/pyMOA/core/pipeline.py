@@ -0,0 +1,104 @@
+import functools
+import inspect
+import threading
+import time
+import logging
+from typing import Dict, Iterable, Optional, Set
+from pyMOA.core.base_plugin import BasePlugin
+
+logger = logging.getLogger(__name__)
+
+PLUGIN_TIMED_OUT = "Plugin exceeded its time budget"
+
+
+def plugin_name(plugin: BasePlugin) -> str:
+    return plugin.__class__.__name__
+
+
+class PluginTimings:
+    """
+    Time spent in each plugin during one search.
+
+    Post plugins run once per engine output, so their calls and seconds are summed. A plugin
+    that took longer than its budget in any call is reported with over_budget set.
+    """
+
+    def __init__(self):
+        self._timings: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, plugin: BasePlugin, stage: str) -> dict:
+        return self._timings.setdefault(plugin_name(plugin), {
+            "stage": stage, "calls": 0, "seconds": 0.0, "budget": plugin.get_budget(), "over_budget": False,
+        })
+
+    def record(self, plugin: BasePlugin, stage: str, seconds: float) -> bool:
+        # Returns whether the call went over the plugin's budget.
+        budget = plugin.get_budget()
+        over_budget = budget is not None and seconds > budget
+        with self._lock:
+            timing = self._entry(plugin, stage)
+            timing["calls"] += 1
+            timing["seconds"] += seconds
+            timing["over_budget"] = timing["over_budget"] or over_budget
+        if over_budget:
+            logger.warning("%s plugin %s took %.3fs, its budget is %.3fs", stage, plugin_name(plugin), seconds, budget)
+        return over_budget
+
+    def timed_out(self, plugin: BasePlugin, stage: str):
+        # A plugin that was not waited for. It keeps running in the background and is recorded when it returns.
+        with self._lock:
+            self._entry(plugin, stage)["over_budget"] = True
+        logger.warning("%s plugin %s did not return within its budget of %ss", stage, plugin_name(plugin), plugin.get_budget())
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {name: dict(timing) for name, timing in self._timings.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def takes_results(plugin_class: type) -> bool:
+    # Pre plugins written before the pipeline define run(self, query) and are called with the query only.
+    try:
+        parameters = list(inspect.signature(plugin_class.run).parameters.values())[1:]
+    except (TypeError, ValueError):
+        return True
+    if any(parameter.kind == inspect.Parameter.VAR_POSITIONAL for parameter in parameters):
+        return True
+    positional = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+    return sum(parameter.kind in positional for parameter in parameters) >= 2
+
+
+def call_plugin(plugin: BasePlugin, timings: PluginTimings, stage: str, query: Optional[str], results: dict):
+    started = time.perf_counter()
+    try:
+        if stage == "pre" and not takes_results(type(plugin)):
+            return plugin.run(query)
+        return plugin.run(query, results)
+    finally:
+        timings.record(plugin, stage, time.perf_counter() - started)
+
+
+def run_post_plugins(plugins: Iterable[BasePlugin], query: Optional[str], output: dict,
+                     timings: PluginTimings, slow: Set[str]) -> dict:
+    """
+    Runs the post plugins over one engine output, in order, each one on the output of the previous one.
+
+    A plugin that fails leaves the output unchanged. A plugin that goes over its budget is added
+    to slow and skipped for the outputs of the remaining engines of the search.
+    """
+    for plugin in plugins:
+        name = plugin_name(plugin)
+        if name in slow:
+            continue
+        started = time.perf_counter()
+        try:
+            processed = plugin.run(query, output)
+        except Exception as e:
+            logger.error("post plugin %s failed: %s", name, str(e))
+            processed = None
+        if timings.record(plugin, "post", time.perf_counter() - started):
+            slow.add(name)
+        if isinstance(processed, dict):
+            output = processed
+    return output
@@ -11,6 +11,8 @@ class PluginLoader:
 
     def __init__(self):
         self.plugins: Dict[str, BasePlugin] = {}
+        # Ids without the "Plugin" suffix, e.g. "testpre" for TestPrePlugin, mapped to the full ids.
+        self.aliases: Dict[str, str] = {}
         self.valid_plugins = []
         self.failed_plugins = []
         self.post_plugins = []
@@ -26,7 +28,7 @@ class PluginLoader:
 
             module_name = module_path.stem
             try:
-                module = importlib.import_module(f"plugins.{module_name}")
+                module = importlib.import_module(f"pyMOA.plugins.{module_name}")
                 plugin_class = None
 
                 for attr_name in dir(module):
@@ -47,8 +49,14 @@ class PluginLoader:
                 instance = plugin_class()
                 self.plugins[plugin_id] = instance
                 self.valid_plugins.append(plugin_id)
+                alias = plugin_class.__name__.replace("Plugin", "").lower()
+                if alias != plugin_id:
+                    self.aliases.setdefault(alias, plugin_id)
 
                 plugin_type = instance.get_type().lower()
+                if not instance.is_enabled():
+                    # Only runs when a search names it in enabled_plugins.
+                    continue
                 if plugin_type == "pre":
                     self.pre_plugins.append(instance)
                 elif plugin_type == "post":
@@ -69,4 +77,5 @@ class PluginLoader:
         }
 
     def get_plugin(self, name: str) -> BasePlugin | None:
-        return self.plugins.get(name.lower())
+        name = name.lower()
+        return self.plugins.get(name) or self.plugins.get(self.aliases.get(name, ""))
@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+import logging
+from typing import Dict, Iterable, Union
+from urllib.parse import urlsplit, urlunsplit
+from pyMOA.core.batch import TRANSIENT_EXCEPTIONS
+from pyMOA.core.health import CAPTCHA, SUCCESS, TIMEOUT, HealthRegistry, classify_output, error_output
+
+logger = logging.getLogger(__name__)
+
+
+def get_proxy_config(proxy: str | dict =None):
+
+    """
+    Checks one proxy setting: an "http://" or "https://" URL string, or a dict with "http" and/or
+    "https" keys as accepted by requests and httpx. The setting is returned unchanged.
+    A ProxyPool is built from several of them, see ProxyPool. For more information, see https://requests.readthedocs.io.
+    """
+    if proxy is None:
+        return None
+
+
+    if isinstance(proxy, str):
+        if proxy[:5] == "http:":
+            return proxy
+        elif proxy[:5] == "https":
+            # HTTPS proxies are supported by requests and httpx, the TLS connection to the proxy is kept.
+            return proxy
+        else:
+            raise TypeError("Proxy string must start with 'http://' or 'https://'.")
+
+    elif isinstance(proxy, dict):
+        if not set(proxy.keys()) & {"http", "https"}:
+            raise TypeError("The input dictionary must contain at least one of the two proxy types http or https.")
+
+        return proxy
+
+
+def redact_proxy(url: str) -> str:
+    # Proxy URL without its user:pass@ credentials, for labels and logs.
+    parts = urlsplit(url)
+    if "@" not in parts.netloc:
+        return url
+    return urlunsplit(parts._replace(netloc="***@" + parts.netloc.rpartition("@")[2]))
+
+
+# Statuses of a proxy that is banned or refused, and exception classes of failed connections through it.
+BAN_STATUSES = {403, 407, 429}
+TRANSPORT_ERRORS = TRANSIENT_EXCEPTIONS | {"SSLError"}
+
+
+def blames_proxy(output) -> bool:
+    """
+    Whether a failed engine output is the proxy's fault: a CAPTCHA page, a ban status, a timeout or
+    a failed connection. Rejected queries, parse errors and other statuses say nothing about it.
+    """
+    outcome = classify_output(output)
+    if outcome in (CAPTCHA, TIMEOUT):
+        return True
+    if outcome == SUCCESS:
+        return False
+    return output.get("status") in BAN_STATUSES or output.get("exc_type") in TRANSPORT_ERRORS
+
+
+class ProxyPool:
+    """
+    Pool of egress proxies the engine requests are spread over. Pass it as the proxy argument of search().
+
+    Each engine request gets one proxy, picked in turn for each engine ("round_robin") or the one
+    with the fewest requests in flight and then the lowest average latency ("least_loaded"). Every
+    proxy has a circuit breaker: after repeated transport failures, ban statuses (403, 407, 429) or
+    CAPTCHA pages it is left out for a growing backoff, then tried again with a single request.
+    Errors that are not the proxy's fault, such as rejected queries or parse errors, are only
+    counted in status(). Engines keep a separate keep-alive connection pool per proxy, so rotating
+    does not close connections.
+
+    Args:
+        proxies: Proxy strings or dicts, as accepted by the proxy argument of search().
+        strategy (str): "round_robin" or "least_loaded".
+        failure_threshold, base_backoff, max_backoff, captcha_weight: Eviction settings, see HealthRegistry.
+    """
+
+    STRATEGIES = ("round_robin", "least_loaded")
+
+    def __init__(self, proxies: Iterable[Union[str, dict]], strategy: str = "round_robin",
+                 failure_threshold: int = 3, base_backoff: float = 60.0, max_backoff: float = 1800.0,
+                 captcha_weight: int = 3):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Invalid proxy strategy. Choose from {list(self.STRATEGIES)}")
+        self.proxies = [get_proxy_config(proxy) for proxy in proxies]
+        if not self.proxies:
+            raise ValueError("A proxy pool needs at least one proxy.")
+        labels = [self._label(proxy) for proxy in self.proxies]
+        # Proxies that only differ by their credentials get numbered labels, the health of each is kept apart.
+        self.labels = [
+            label if labels.count(label) == 1 else f"{label}#{labels[:index].count(label) + 1}"
+            for index, label in enumerate(labels)
+        ]
+        self.strategy = strategy
+        self.health = HealthRegistry(failure_threshold, base_backoff, max_backoff, captcha_weight)
+        self.in_flight = [0] * len(self.proxies)
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _label(proxy) -> str:
+        # Names the proxy in status() and the logs, without credentials.
+        if isinstance(proxy, dict):
+            return ",".join(f"{scheme}={redact_proxy(url)}" for scheme, url in sorted(proxy.items()))
+        return redact_proxy(proxy)
+
+    def _candidates(self, engine_name: str) -> list:
+        # Proxy indexes in order of preference.
+        count = len(self.proxies)
+        if self.strategy == "round_robin":
+            start = self._cursors.get(engine_name, 0)
+            self._cursors[engine_name] = (start + 1) % count
+            return [(start + offset) % count for offset in range(count)]
+
+        def load(index):
+            stats = self.health.stats.get(self.labels[index])
+            return self.in_flight[index], (stats.average_latency or 0.0) if stats else 0.0
+        return sorted(range(count), key=load)
+
+    def acquire(self, engine_name: str) -> int:
+        # Returns the index of the proxy to use, release() it once the request is done.
+        with self._lock:
+            candidates = self._candidates(engine_name)
+            index = next((i for i in candidates if self.health.allow(self.labels[i])), None)
+            if index is None:
+                # Every proxy is evicted, the best candidate is used rather than failing the search.
+                logger.warning("All %d proxies are evicted, using %s", len(self.proxies), self.labels[candidates[0]])
+                index = candidates[0]
+            self.in_flight[index] += 1
+        return index
+
+    def release(self, index: int, output=None, latency: float = None):
+        # output is None when the request was cancelled, which says nothing about the proxy.
+        with self._lock:
+            self.in_flight[index] -= 1
+        if output is not None:
+            # Every output is counted in the proxy's stats, only successes and the proxy's own failures move its breaker.
+            trip = classify_output(output) == SUCCESS or blames_proxy(output)
+            self.health.record_output(self.labels[index], output, latency, trip=trip)
+
+    def call(self, engine_name: str, search, **params) -> dict:
+        # Runs an engine's search() through a proxy of the pool.
+        index = self.acquire(engine_name)
+        started = time.monotonic()
+        try:
+            output = search(**{**params, "proxy": self.proxies[index]})
+        except Exception as e:
+            self.release(index, error_output(e), time.monotonic() - started)
+            raise
+        self.release(index, output, time.monotonic() - started)
+        return output
+
+    async def acall(self, engine_name: str, asearch, **params) -> dict:
+        index = self.acquire(engine_name)
+        started = time.monotonic()
+        try:
+            output = await asearch(**{**params, "proxy": self.proxies[index]})
+        except asyncio.CancelledError:
+            self.release(index)
+            raise
+        except Exception as e:
+            self.release(index, error_output(e), time.monotonic() - started)
+            raise
+        self.release(index, output, time.monotonic() - started)
+        return output
+
+    def status(self) -> dict:
+        health = self.health.status()
+        with self._lock:
+            return {
+                label: {"in_flight": self.in_flight[index], **health.get(label, {"state": "closed"})}
+                for index, label in enumerate(self.labels)
+            }
@@ -0,0 +1,107 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+# The RateLimiter the requests of the current engine call wait on, if its search is rate limited.
+_current: contextvars.ContextVar = contextvars.ContextVar("pyMOA_rate_limiter", default=None)
+
+
+def current_rate_limiter() -> Optional["RateLimiter"]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def rate_limited(limiter: "RateLimiter"):
+    # Makes the requests sent inside the block wait on the limiter. Contexts are copied to the
+    # shared executor, so blocking engines run from async code are limited too.
+    token = _current.set(limiter)
+    try:
+        yield limiter
+    finally:
+        _current.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` requests per second on average and bursts of up to `burst` requests.
+    """
+
+    def __init__(self, rate: float, burst: float = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        # Takes a token and returns 0, or returns the seconds until a token is available.
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait_for = self._take()
+            if not wait_for:
+                return True
+            if deadline is not None and time.monotonic() + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+    async def aacquire(self):
+        while True:
+            wait_for = self._take()
+            if not wait_for:
+                return
+            await asyncio.sleep(wait_for)
+
+
+class RateLimiter:
+    """
+    One token bucket per host, set by the "rate_limit" block of the engine in engine_params.json:
+
+        "rate_limit": {"rate": 2.0, "burst": 5}
+
+    Every request an engine sends while its search is rate limited (see rate_limited()) waits on
+    the bucket of the request's host, so the requests of an engine to a second host, or of two
+    engines to one host, are limited by host. Hosts of engines without the block are not limited.
+    Buckets are created on first use and follow config changes.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, engine, url: str) -> Optional[TokenBucket]:
+        config = engine.config.get("rate_limit")
+        if not config or not config.get("rate"):
+            return None
+
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(config["rate"], config.get("burst", 1))
+            else:
+                bucket.rate, bucket.burst = config["rate"], config.get("burst", 1)
+        return bucket
+
+    def acquire(self, engine, url: str):
+        bucket = self.bucket(engine, url)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def aacquire(self, engine, url: str):
+        bucket = self.bucket(engine, url)
+        if bucket is not None:
+            await bucket.aacquire()
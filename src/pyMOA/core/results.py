@@ -0,0 +1,171 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+
+
+@dataclass(frozen=True, slots=True)
+class SearchResult:
+    """
+    One search result. Slotted, so millions of them take far less memory than dicts.
+    """
+    title: str
+    url: str
+    content: str = ""
+    thumbnail: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        # Same shape as the dicts the engines always returned.
+        item = {"title": self.title, "url": self.url, "content": self.content}
+        if self.thumbnail is not None:
+            item["thumbnail"] = self.thumbnail
+        return item
+
+    @classmethod
+    def from_dict(cls, item: dict) -> "SearchResult":
+        return cls(item.get("title", ""), item.get("url", ""), item.get("content", ""), item.get("thumbnail"))
+
+
+@dataclass(slots=True)
+class SearchResponse:
+    """
+    Output of one engine for one query.
+    """
+    engine: str
+    results: List[SearchResult] = field(default_factory=list)
+    error: Optional[str] = None
+    metadata: Optional[dict] = None
+    extra: dict = field(default_factory=dict)  # Other keys of the output, e.g. "timed_out"
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        output = {}
+        if self.error is not None:
+            output["error"] = self.error
+        else:
+            output["results"] = [result.to_dict() for result in self.results]
+        if self.metadata is not None:
+            output["metadata"] = self.metadata
+        output.update(self.extra)
+        return output
+
+    @classmethod
+    def from_dict(cls, engine: str, output: dict) -> "SearchResponse":
+        extra = {k: v for k, v in output.items() if k not in ("results", "error", "metadata")}
+        results = [r if isinstance(r, SearchResult) else SearchResult.from_dict(r) for r in output.get("results") or []]
+        return cls(engine, results, output.get("error"), output.get("metadata"), extra)
+
+
+class StringColumn:
+    """
+    Strings kept the way Arrow's large_string arrays keep them: the UTF-8 bytes of all values in one
+    buffer, the end offset of each value and a validity bitmap for None. No object per value.
+    """
+
+    __slots__ = ("data", "offsets", "validity", "null_count")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("q", [0])
+        self.validity = bytearray()
+        self.null_count = 0
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def append(self, value: Optional[str]):
+        index = len(self)
+        if index % 8 == 0:
+            self.validity.append(0)
+        if value is None:
+            self.null_count += 1
+        else:
+            self.data += value.encode("utf-8", "replace")
+            self.validity[-1] |= 1 << index % 8
+        self.offsets.append(len(self.data))
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        if not self.validity[index >> 3] >> (index & 7) & 1:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def to_arrow(self):
+        # The buffers are copied whole, so appending afterwards doesn't touch the Arrow array.
+        import pyarrow
+
+        validity = pyarrow.py_buffer(bytes(self.validity)) if self.null_count else None
+        return pyarrow.Array.from_buffers(
+            pyarrow.large_string(), len(self),
+            [validity, pyarrow.py_buffer(self.offsets.tobytes()), pyarrow.py_buffer(bytes(self.data))],
+            null_count=self.null_count,
+        )
+
+
+class ResultTable:
+    """
+    Column oriented container for large result sets.
+
+    Strings are kept in StringColumn buffers and positions in an int64 array, laid out like Arrow
+    arrays, so to_arrow() hands each column over as a few buffers without converting the rows.
+    pyarrow is only needed for to_arrow() and to_parquet().
+    """
+
+    COLUMNS = ("query", "engine", "position", "title", "url", "content", "thumbnail")
+
+    def __init__(self):
+        self.columns = {name: array("q") if name == "position" else StringColumn() for name in self.COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.columns["position"])
+
+    def append(self, query: str, engine: str, results):
+        """
+        Adds the results of one engine. Results can be SearchResult objects or result dicts.
+        """
+        columns = self.columns
+        for position, result in enumerate(results, start=1):
+            if isinstance(result, dict):
+                result = SearchResult.from_dict(result)
+            columns["query"].append(query)
+            columns["engine"].append(engine)
+            columns["position"].append(position)
+            columns["title"].append(result.title)
+            columns["url"].append(result.url)
+            columns["content"].append(result.content)
+            columns["thumbnail"].append(result.thumbnail)
+
+    def add_response(self, query: str, response: dict):
+        """
+        Adds every engine of a search() response.
+        """
+        for engine, output in response["results"].items():
+            if isinstance(output, SearchResponse):
+                self.append(query, engine, output.results)
+            elif isinstance(output, dict) and isinstance(output.get("results"), list):
+                self.append(query, engine, output["results"])
+
+    def __iter__(self) -> Iterator[SearchResult]:
+        columns = self.columns
+        for title, url, content, thumbnail in zip(columns["title"], columns["url"], columns["content"], columns["thumbnail"]):
+            yield SearchResult(title, url, content, thumbnail)
+
+    def to_arrow(self):
+        import pyarrow
+
+        arrays = [
+            pyarrow.Array.from_buffers(pyarrow.int64(), len(self), [None, pyarrow.py_buffer(column.tobytes())])
+            if isinstance(column, array) else column.to_arrow()
+            for column in self.columns.values()
+        ]
+        return pyarrow.table(arrays, names=list(self.columns))
+
+    def to_parquet(self, path, **kwargs):
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(self.to_arrow(), path, **kwargs)
@@ -0,0 +1,404 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import logging
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+from pyMOA.core.cache import MemoryCache, SQLiteCache
+from pyMOA.core.client import MOAClient
+from pyMOA.core.index import LocalIndex
+from pyMOA.core.singleflight import FileLockFlight, fcntl
+
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+           413: "Payload Too Large", 500: "Internal Server Error", 501: "Not Implemented"}
+
+# Search arguments taken from the query string or the JSON body, and how each is read from a string.
+INT_PARAMS = {"limit", "pageno", "safesearch", "quorum", "quorum_results"}
+FLOAT_PARAMS = {"deadline", "timeout"}
+LIST_PARAMS = {"engines", "enabled_plugins"}
+BOOL_PARAMS = {"hedge"}
+STR_PARAMS = {"q", "time_range", "language", "country", "categories", "merge"}
+
+STREAM_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def search_arguments(params: dict) -> dict:
+    """
+    Converts the parameters of a /search request to MOAClient.search() arguments.
+    Lists may be given comma separated, "plugins" is short for "enabled_plugins".
+    """
+    params = dict(params)
+    if "plugins" in params:
+        params["enabled_plugins"] = params.pop("plugins")
+    arguments = {}
+    for name, value in params.items():
+        if name in ("stream", "query"):
+            continue
+        try:
+            if name in LIST_PARAMS:
+                arguments[name] = [v for v in value.split(",") if v] if isinstance(value, str) else list(value)
+            elif name in INT_PARAMS:
+                arguments[name] = int(value)
+            elif name in FLOAT_PARAMS:
+                arguments[name] = float(value)
+            elif name in BOOL_PARAMS:
+                if isinstance(value, str):
+                    arguments[name] = value.lower() in ("1", "true", "yes")
+                elif isinstance(value, int):  # JSON true or 1
+                    arguments[name] = bool(value)
+                else:
+                    raise ValueError(value)
+            elif name in STR_PARAMS:
+                arguments[name] = str(value)
+            else:
+                raise HTTPError(400, f"Unknown parameter '{name}'")
+        except (TypeError, ValueError):
+            raise HTTPError(400, f"Invalid value of '{name}'")
+    if "query" in params and "q" not in arguments:
+        arguments["q"] = str(params["query"])
+    if not arguments.get("q"):
+        raise HTTPError(400, "Missing 'q'")
+    return arguments
+
+
+def dumps(value) -> bytes:
+    # Engine outputs may hold dates and other values JSON doesn't know, they are sent as strings.
+    return json.dumps(value, default=str, ensure_ascii=False).encode("utf-8")
+
+
+class SearchServer:
+    """
+    HTTP/JSON front of one MOAClient, on asyncio.
+
+    The client, with its connection pools, cache and engine health, lives as long as the server,
+    so every request profits from the ones before it. Routes:
+
+        GET or POST /search   search() arguments as query parameters or a JSON object. With
+                              stream=ndjson or stream=sse, or the matching Accept header, each
+                              engine output is sent as soon as the engine finishes.
+        GET /engines          EngineLoader.list_engines() and the health of each engine.
+        GET /metrics          Prometheus metrics, when prometheus-client is installed.
+
+    Args:
+        client (MOAClient): The client searches run on.
+        registry: Prometheus registry /metrics is generated from, the default one if None.
+    """
+
+    def __init__(self, client: MOAClient, registry=None):
+        self.client = client
+        self.registry = registry
+        self.routes = {
+            "/search": self.search,
+            "/engines": self.engines,
+            "/metrics": self.metrics,
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # One connection, kept alive for as many requests as the client sends.
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 413, {"error": "Headers too large"}, keep_alive=False)
+                    return
+                keep_alive = await self._request(reader, writer, head)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        except Exception as e:
+            logger.error("Request failed: %s", str(e))
+        finally:
+            writer.close()
+
+    async def _request(self, reader, writer, head: bytes) -> bool:
+        # Parses and answers one request, returns whether the connection stays open.
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self._send(writer, 400, {"error": "Malformed request line"}, keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+        body = b""
+        if "transfer-encoding" in headers:
+            await self._send(writer, 411, {"error": "Send a Content-Length"}, keep_alive=False)
+            return False
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            await self._send(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+            return False
+        if length > MAX_BODY_BYTES:
+            await self._send(writer, 413, {"error": "Body too large"}, keep_alive=False)
+            return False
+        if length:
+            body = await reader.readexactly(length)
+
+        url = urlsplit(target)
+        route = self.routes.get(url.path.rstrip("/") or "/")
+        try:
+            if route is None:
+                raise HTTPError(404, "Not found")
+            if method not in ("GET", "POST") or (method == "POST" and route != self.search):
+                raise HTTPError(405, "Method not allowed")
+            params = dict(parse_qsl(url.query))
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, "Body is not JSON")
+                if not isinstance(data, dict):
+                    raise HTTPError(400, "Body must be a JSON object")
+                params.update(data)
+            return await route(writer, params, headers, keep_alive)
+        except HTTPError as e:
+            await self._send(writer, e.status, {"error": str(e)}, keep_alive=keep_alive)
+            return keep_alive
+        except ConnectionError:
+            raise
+        except Exception as e:
+            logger.exception("%s %s failed", method, url.path)
+            await self._send(writer, 500, {"error": str(e)}, keep_alive=False)
+            return False
+
+    async def _send(self, writer, status: int, body, content_type: str = "application/json", keep_alive: bool = True):
+        data = body if isinstance(body, bytes) else dumps(body)
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def search(self, writer, params: dict, headers: dict, keep_alive: bool) -> bool:
+        stream = params.get("stream")
+        if stream is None:
+            accept = headers.get("accept", "")
+            stream = next((name for name, content_type in STREAM_TYPES.items() if content_type in accept), None)
+        if stream is not None and stream not in STREAM_TYPES:
+            raise HTTPError(400, f"Invalid stream format. Choose from {list(STREAM_TYPES)}")
+        arguments = search_arguments(params)
+
+        if stream is None:
+            try:
+                response = await self.client.search_async(**arguments)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+            await self._send(writer, 200, response, keep_alive=keep_alive)
+            return keep_alive
+        return await self._stream(writer, stream, arguments, keep_alive)
+
+    async def _stream(self, writer, stream: str, arguments: dict, keep_alive: bool) -> bool:
+        # Engine outputs as they arrive, in a chunked response. Stopping early cancels the remaining engines.
+        unsupported = set(arguments) & {"merge", "quorum", "quorum_results"}
+        if unsupported:
+            raise HTTPError(400, f"{sorted(unsupported)} can't be streamed")
+        outputs = self.client.aiter_search(**arguments)
+        try:
+            first = await outputs.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: {STREAM_TYPES[stream]}\r\nTransfer-Encoding: chunked\r\n"
+            f"Cache-Control: no-cache\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+        try:
+            item = first
+            while item is not None:
+                ftype, name, output = item
+                await self._chunk(writer, stream, ftype, {"type": ftype, "name": name, "output": output})
+                item = await outputs.__anext__()
+        except StopAsyncIteration:
+            pass
+        except ConnectionError:
+            raise
+        except Exception as e:
+            # The 200 status is already sent, so the stream ends with an error event and the connection is closed.
+            logger.exception("Streamed search failed")
+            await self._chunk(writer, stream, "error", {"type": "error", "error": str(e)})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return False
+        finally:
+            await outputs.aclose()
+        await self._chunk(writer, stream, "done", {"type": "done"})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        return keep_alive
+
+    @staticmethod
+    async def _chunk(writer, stream: str, event: str, item: dict):
+        if stream == "sse":
+            data = b"event: " + event.encode() + b"\ndata: " + dumps(item) + b"\n\n"
+        else:
+            data = dumps(item) + b"\n"
+        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+        await writer.drain()
+
+    async def engines(self, writer, params: dict, headers: dict, keep_alive: bool) -> bool:
+        body = {**self.client.loader.list_engines(), "health": self.client.health.status()}
+        await self._send(writer, 200, body, keep_alive=keep_alive)
+        return keep_alive
+
+    async def metrics(self, writer, params: dict, headers: dict, keep_alive: bool) -> bool:
+        try:
+            from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+        except ImportError:
+            raise HTTPError(501, "Metrics need prometheus-client")
+        registry = self.registry if self.registry is not None else REGISTRY
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            # The metrics of all the worker processes, not only the one answering.
+            from prometheus_client import multiprocess
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        await self._send(writer, 200, generate_latest(registry), CONTENT_TYPE_LATEST, keep_alive=keep_alive)
+        return keep_alive
+
+    async def serve(self, sock: socket.socket):
+        # Serves on a bound socket until SIGTERM or SIGINT.
+        server = await asyncio.start_server(self.handle, sock=sock, limit=MAX_HEADER_BYTES)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):  # Windows, or not the main thread
+                pass
+        async with server:
+            await stop.wait()
+        await self.client.aclose()
+
+
+def shared_cache_path(cache: Optional[str], workers: int) -> Optional[str]:
+    if cache == "memory":
+        return None
+    if cache is None and workers > 1:
+        return os.path.join(tempfile.gettempdir(), "pyMOA-serve-cache.db")
+    return cache
+
+
+def metrics_registry():
+    # Prometheus registry of one server, None without prometheus-client.
+    try:
+        from prometheus_client import CollectorRegistry
+    except ImportError:
+        return None
+    return CollectorRegistry()
+
+
+def make_client(cache: Optional[str] = None, workers: int = 1, local_index: Optional[str] = None,
+                parse_processes: Optional[int] = None, registry=None) -> MOAClient:
+    """
+    The client of one server worker. Workers share an SQLiteCache, in the temp dir unless `cache`
+    names the file, and coalesce identical engine requests between them where fcntl is available.
+    A single worker caches in memory unless given a file. Metrics go to Prometheus when installed,
+    in `registry` or a new registry of the client's own, so several clients can run in one process.
+    """
+    cache = shared_cache_path(cache, workers)
+    shared = cache is not None
+    metrics = None
+    try:
+        from pyMOA.core.metrics import PrometheusSink
+        metrics = PrometheusSink(registry if registry is not None else metrics_registry())
+    except ImportError:
+        logger.info("prometheus-client is not installed, /metrics is disabled")
+    client = MOAClient(
+        cache=SQLiteCache(cache) if shared else MemoryCache(),
+        process_lock=FileLockFlight() if shared and workers > 1 and fcntl is not None else None,
+        local_index=LocalIndex(local_index) if local_index else None,
+        parse_processes=parse_processes,
+        metrics=metrics,
+    )
+    # Imported now, so the first requests don't pay for it.
+    client.loader.load_engines()
+    return client
+
+
+def _worker(sock: socket.socket, options: dict):
+    registry = metrics_registry()
+    client = make_client(**options, registry=registry)
+    asyncio.run(SearchServer(client, registry).serve(sock))
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+def serve(host: str = "127.0.0.1", port: int = 8888, workers: int = 1, **options):
+    """
+    Runs the search server until interrupted. With several workers, each one is a process with its
+    own client accepting connections from the same socket.
+
+    Args:
+        options: make_client() arguments: cache, local_index and parse_processes.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    sock = bind(host, port)
+    options = {**options, "workers": workers}
+    if workers > 1:
+        # Created before the workers start, so they don't race to set up the same new database.
+        cache = shared_cache_path(options.get("cache"), workers)
+        if cache:
+            SQLiteCache(cache).close()
+        if options.get("local_index"):
+            LocalIndex(options["local_index"]).close()
+    logger.info("Serving on http://%s:%s with %s worker(s)", host, sock.getsockname()[1], workers)
+    if workers == 1:
+        _worker(sock, options)
+        return
+
+    processes = [
+        multiprocessing.Process(target=_worker, args=(sock, options), name=f"pyMOA-worker-{i}")
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    # SIGTERM stops the workers too, like Ctrl+C does.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        for process in processes:
+            process.join()
+        sock.close()
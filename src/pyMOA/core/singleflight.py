@@ -0,0 +1,180 @@
+import asyncio
+import contextlib
+import copy
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import logging
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, FileLockFlight can't be used there.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class _Abandoned(Exception):
+    # The leader of a call was cancelled before finishing, a waiting caller has to make the call itself.
+    pass
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller of a key makes the call and the callers
+    that arrive while it is running wait for it and get a copy of its result.
+
+    Calls submitted to an executor are coalesced with each other and asyncio tasks with tasks of
+    the same event loop, so a blocking caller never waits on a task of a loop it may be blocking.
+    """
+
+    def __init__(self):
+        self._calls: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key) -> tuple:
+        # Returns the future of the call running for key and whether the caller has to make it.
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                return future, True
+            return future, False
+
+    def _done(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def submit(self, key: str, executor, fn) -> Future:
+        """
+        Submits fn to the executor, unless a call of the same key is already queued or running.
+        Every caller gets its own future, so cancelling it does not affect the others. The first
+        caller gets the result itself and the others a copy.
+        """
+        with self._lock:
+            shared = self._calls.get((None, key))
+            leader = shared is None
+            if leader:
+                shared = self._calls[(None, key)] = executor.submit(fn)
+        if leader:
+            # Outside the lock: a call that already finished runs the callback right here.
+            shared.add_done_callback(functools.partial(self._done, (None, key)))
+        future = Future()
+        shared.add_done_callback(functools.partial(self._resolve, future, not leader))
+        return future
+
+    @staticmethod
+    def _resolve(future: Future, copied: bool, shared: Future):
+        if not future.set_running_or_notify_cancel():
+            return  # Cancelled by its caller
+        if shared.cancelled():
+            future.set_exception(_Abandoned())
+        elif shared.exception() is not None:
+            future.set_exception(shared.exception())
+        else:
+            future.set_result(copy.deepcopy(shared.result()) if copied else shared.result())
+
+    async def ado(self, key: str, make_awaitable):
+        # Async version of submit(): awaits the call of the same key already running in this event loop,
+        # or makes it. make_awaitable is only called by the caller that makes the call.
+        loop_key = (asyncio.get_running_loop(), key)
+        while True:
+            future, leader = self._join(loop_key)
+            if not leader:
+                try:
+                    return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(future)))
+                except _Abandoned:
+                    continue
+            try:
+                result = await make_awaitable()
+            except asyncio.CancelledError:
+                future.set_exception(_Abandoned())
+                raise
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(result)
+                return result
+            finally:
+                self._done(loop_key, future)
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class FileLockFlight:
+    """
+    Extends coalescing to the processes of one host that share a cache, e.g. SQLiteCache on one file.
+
+    The process that requests a key first holds a lock file while it calls the engine and stores
+    the result in the cache. The other processes wait for the lock and then read the cache. Locks
+    are released by the OS if a process dies. Keys are spread over a fixed number of lock files,
+    so unrelated keys sharing one only wait for each other. Needs fcntl, so not on Windows.
+
+    Args:
+        directory (str or None): Where the lock files are kept, a "pyMOA-locks" folder in the temp dir by default.
+        timeout (float): Seconds to wait for another process before making the call anyway.
+        stripes (int): Number of lock files.
+    """
+
+    def __init__(self, directory: Optional[str] = None, timeout: float = 30.0, stripes: int = 256,
+                 poll_interval: float = 0.01):
+        if fcntl is None:
+            raise RuntimeError("FileLockFlight needs fcntl, which is not available on this platform.")
+        self.directory = Path(directory or os.path.join(tempfile.gettempdir(), "pyMOA-locks"))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.stripes = stripes
+        self.poll_interval = poll_interval
+
+    def _open(self, key: str) -> int:
+        stripe = int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:4], "big") % self.stripes
+        return os.open(self.directory / f"{stripe}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+
+    @staticmethod
+    def _try_lock(fd: int) -> bool:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    @contextlib.contextmanager
+    def hold(self, key: str):
+        # Yields True if the lock is held, False if the wait timed out.
+        fd = self._open(key)
+        try:
+            deadline = time.monotonic() + self.timeout
+            locked = self._try_lock(fd)
+            while not locked and time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                locked = self._try_lock(fd)
+            if not locked:
+                logger.warning("Waited %ss for another process on %s, calling anyway", self.timeout, key)
+            yield locked
+        finally:
+            # Closing the file releases the lock.
+            os.close(fd)
+
+    @contextlib.asynccontextmanager
+    async def ahold(self, key: str):
+        fd = self._open(key)
+        try:
+            deadline = time.monotonic() + self.timeout
+            locked = self._try_lock(fd)
+            while not locked and time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                locked = self._try_lock(fd)
+            if not locked:
+                logger.warning("Waited %ss for another process on %s, calling anyway", self.timeout, key)
+            yield locked
+        finally:
+            os.close(fd)
@@ -1,12 +1,23 @@
 import json
 import re
 from urllib.parse import urlencode
-from lxml import html
-import requests
 from pyMOA.core.base_engine import BaseEngine
+from pyMOA.core.health import error_output
+from pyMOA.core.metrics import record_error
+from pyMOA.core.parsing import XPath, first, join_text, parse_html
+from pyMOA.core.results import SearchResult
 
 
 class BingEngine(BaseEngine):
+    # Selectors are compiled once, when the module is imported.
+    ENCODING = "utf-8"  # Requested with ie/oe=UTF-8
+    STOP_MARKER = b'id="b_context"'  # The sidebar follows the result list
+    RESULT_MARKER = b'class="b_algo"'
+    XPATH_RESULTS = XPath('//li[contains(@class, "b_algo")]')
+    XPATH_TITLE = XPath('.//h2//text()')
+    XPATH_URL = XPath('.//h2/a/@href')
+    XPATH_CONTENT = XPath('.//p//text()')
+
     def __init__(self):
         super().__init__()
         self.BASE_HEADERS = {
@@ -19,7 +30,7 @@ class BingEngine(BaseEngine):
         }
 
     def detect_bing_sorry(self, response):
-        if "captcha" in response.url:
+        if "captcha" in str(response.url):
             raise Exception("Bing CAPTCHA detected")
 
     def get_bing_info(self, locale="en-US", country="US"):
@@ -36,51 +47,74 @@ class BingEngine(BaseEngine):
             "cookies": {"CONSENT": "YES+"},
         }
 
-    def search(self, query: str, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", proxy="" **kwargs) -> dict:
+    def _prepare_request(self, query: str, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US") -> dict:
+        bing_info = self.get_bing_info(locale, country)
+        offset = (page - 1) * 10
+        params = {
+            "q": query,
+            "first": offset,
+            **bing_info["params"],
+        }
+
+        time_range_dict = {"day": "d", "week": "w", "month": "m", "year": "y"}
+        if time_range in time_range_dict:
+            params["tbs"] = f"qdr:{time_range_dict[time_range]}"
+
+        safesearch_mapping = {0: "off", 1: "medium", 2: "high"}
+        params["safe"] = safesearch_mapping.get(safesearch, "off")
+
+        return {
+            "method": "GET",
+            "url": f"https://{bing_info['subdomain']}/search?{urlencode(params)}",
+            "headers": bing_info["headers"],
+            "cookies": bing_info["cookies"],
+            "timeout": timeout,
+        }
+
+    def _parse_response(self, response, body) -> dict:
+        response.raise_for_status()
+        self.detect_bing_sorry(response)
+
+        return {"results": [result.to_dict() for result in self.parse(body)]}
+
+    @classmethod
+    def parse_results(cls, content: bytes, encoding: str = None) -> list[SearchResult]:
+        return cls.parse_dom(parse_html(content, encoding or cls.ENCODING, cls.STOP_MARKER))
+
+    @classmethod
+    def parse_dom(cls, dom) -> list[SearchResult]:
+        results = []
+
+        for result in cls.XPATH_RESULTS(dom):
+            title = cls.XPATH_TITLE(result)
+            url = cls.XPATH_URL(result)
+            content = cls.XPATH_CONTENT(result)
+
+            if title and url and content:
+                results.append(SearchResult(
+                    title=join_text(title),
+                    url=first(url),
+                    content=join_text(content),
+                ))
+
+        return results
+
+    def search(self, query: str, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", proxy=None, **kwargs) -> dict:
         try:
-            bing_info = self.get_bing_info(locale, country)
-            offset = (page - 1) * 10
-            params = {
-                "q": query,
-                "first": offset,
-                **bing_info["params"],
-            }
-
-            time_range_dict = {"day": "d", "week": "w", "month": "m", "year": "y"}
-            if time_range in time_range_dict:
-                params["tbs"] = f"qdr:{time_range_dict[time_range]}"
-
-            safesearch_mapping = {0: "off", 1: "medium", 2: "high"}
-            params["safe"] = safesearch_mapping.get(safesearch, "off")
-
-            url = f"https://{bing_info['subdomain']}/search?{urlencode(params)}"
-            response = requests.get(
-                url,
-                headers=bing_info["headers"],
-                cookies=bing_info["cookies"],
-                timeout=timeout,
-                proxies=proxy
-            )
-
-            response.raise_for_status()
-            self.detect_bing_sorry(response)
-
-            dom = html.fromstring(response.text)
-            results = []
-
-            for result in dom.xpath('//li[contains(@class, "b_algo")]'):
-                title = result.xpath('.//h2//text()')
-                url = result.xpath('.//h2/a/@href')
-                content = result.xpath('.//p//text()')
-
-                if title and url and content:
-                    results.append({
-                        "title": " ".join(title).strip(),
-                        "url": url[0],
-                        "content": " ".join(content).strip(),
-                    })
-
-            return {"results": results}
+            request = self._prepare_request(query, timeout, page, time_range, safesearch, locale, country)
+            response = self.request(proxy=proxy, stream=True, **request)
+            return self._parse_response(response, self.read(response, kwargs.get("num_results")))
         
         except Exception as e:
-            return {"error": str(e)}
+            record_error(e)
+            return error_output(e)
+
+    async def asearch(self, query: str, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", proxy=None, **kwargs) -> dict:
+        try:
+            request = self._prepare_request(query, timeout, page, time_range, safesearch, locale, country)
+            response = await self.arequest(proxy=proxy, stream=True, **request)
+            return await self.aparse_response(response, await self.aread(response, kwargs.get("num_results")))
+
+        except Exception as e:
+            record_error(e)
+            return error_output(e)
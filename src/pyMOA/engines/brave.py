@@ -1,10 +1,26 @@
 from urllib.parse import urlencode, urlparse
-from lxml import html
-import requests
 from pyMOA.core.base_engine import BaseEngine
+from pyMOA.core.health import error_output
+from pyMOA.core.metrics import record_error
+from pyMOA.core.parsing import XPath, first, join_text, parse_html
+from pyMOA.core.results import SearchResult
 from dateutil import parser
 
 class BraveEngine(BaseEngine):
+    # Selectors are compiled once, when the module is imported.
+    ENCODING = "utf-8"
+    RESULT_MARKER = b'<div class="snippet '
+    NEWS_RESULT_MARKER = b'data-type="news"'
+    XPATH_RESULTS = XPath('//div[contains(@class, "snippet ")]')
+    XPATH_URL = XPath('.//a[contains(@class, "h")]/@href')
+    XPATH_TITLE = XPath('.//a[contains(@class, "h")]//div[contains(@class, "title")]//text()')
+    XPATH_CONTENT = XPath('.//div[contains(@class, "snippet-description")]//text()')
+    XPATH_NEWS_RESULTS = XPath('//div[contains(@class, "results")]//div[@data-type="news"]')
+    XPATH_NEWS_TITLE = XPath('.//a[contains(@class, "result-header")]//text()')
+    XPATH_NEWS_URL = XPath('.//a[contains(@class, "result-header")]/@href')
+    XPATH_NEWS_CONTENT = XPath('.//p[contains(@class, "desc")]//text()')
+    XPATH_NEWS_THUMBNAIL = XPath('.//div[contains(@class, "image-wrapper")]//img/@src')
+
     def __init__(self):
         super().__init__()
         self.base_url = "https://search.brave.com/"
@@ -47,105 +63,129 @@ class BraveEngine(BaseEngine):
             }
         }
 
-    def _get_xpath_first(self, element, xpath_expr, default=''):
-        result = element.xpath(xpath_expr)
-        return result[0] if result else default
-
-
-    def _parse_results(self, response, category):
+    @classmethod
+    def parse_results(cls, content: bytes, category: str = 'search', encoding: str = None) -> list[SearchResult]:
         """
         Results Analysis
         Currently, other categories are not supported. Results are only retrieved from the web category.
         """
-        dom = html.fromstring(response.text)
+        return cls.parse_dom(parse_html(content, encoding or cls.ENCODING), category)
+
+    @classmethod
+    def parse_dom(cls, dom, category: str = 'search') -> list[SearchResult]:
         results = []
 
         if category == 'news':
-            for result in dom.xpath('//div[contains(@class, "results")]//div[@data-type="news"]'):
-                title = ' '.join(result.xpath('.//a[contains(@class, "result-header")]//text()')).strip()
-                url = self._get_xpath_first(result, './/a[contains(@class, "result-header")]/@href')
-                content = ' '.join(result.xpath('.//p[contains(@class, "desc")]//text()')).strip()
-                thumbnail = self._get_xpath_first(result, './/div[contains(@class, "image-wrapper")]//img/@src')
+            for result in cls.XPATH_NEWS_RESULTS(dom):
+                title = join_text(cls.XPATH_NEWS_TITLE(result))
+                url = first(cls.XPATH_NEWS_URL(result))
+                content = join_text(cls.XPATH_NEWS_CONTENT(result))
+                thumbnail = first(cls.XPATH_NEWS_THUMBNAIL(result))
 
                 if not url or not urlparse(url).netloc:
                     continue
 
-                item = {
-                    'title': title,
-                    'url': url,
-                    'content': content,
-                    'thumbnail': thumbnail
-                }
-                results.append(item)
+                results.append(SearchResult(title, url, content, thumbnail))
 
         else:  # Default web search
-            for result in dom.xpath('//div[contains(@class, "snippet ")]'):
-                url = self._get_xpath_first(result, './/a[contains(@class, "h")]/@href')
-                title = ' '.join(result.xpath('.//a[contains(@class, "h")]//div[contains(@class, "title")]//text()')).strip()
-                content = ' '.join(result.xpath('.//div[contains(@class, "snippet-description")]//text()')).strip()
+            for result in cls.XPATH_RESULTS(dom):
+                url = first(cls.XPATH_URL(result))
+                title = join_text(cls.XPATH_TITLE(result))
+                content = join_text(cls.XPATH_CONTENT(result))
 
                 if not url or not urlparse(url).netloc:
                     continue
 
-                item = {
-                    'url': url,
-                    'title': title,
-                    'content': content
-                }
-                results.append(item)
+                results.append(SearchResult(title, url, content))
 
         return results
 
+    def _prepare_request(self, query: str, timeout: int = 10, page: int = 1,
+                category: str = 'search', time_range: str = None,
+                safesearch: int = 0, locale: str = 'en-US',
+                country: str = 'US') -> dict:
+        config = self._get_brave_config(category, locale, country)
+        params = {
+            'q': query,
+            'source': 'web',
+            'spellcheck': '0'
+        }
+        
+        # Pagination
+        if category in ['search', 'goggles'] and page > 1:
+            params['offset'] = page - 1
+        
+        # Time range
+        if time_range and category in ['search', 'goggles']:
+            params['tf'] = self.time_range_map.get(time_range, '')
+        
+        # Safesearch
+        config['cookies']['safesearch'] = self.safesearch_map.get(safesearch, 'off')
+        
+        return {
+            'method': 'GET',
+            'url': f"{self.base_url}{self.category_map[category]}?{urlencode(params)}",
+            'headers': config['headers'],
+            'cookies': config['cookies'],
+            'timeout': timeout
+        }
+
+    def _result_marker(self, category: str) -> bytes:
+        return self.NEWS_RESULT_MARKER if category == 'news' else self.RESULT_MARKER
+
+    def _parse_response(self, response, body, page: int, category: str) -> dict:
+        response.raise_for_status()
+        
+        return {
+            "results": [result.to_dict() for result in self.parse(body, category=category)],
+            "metadata": {
+                "page": page,
+                "category": category,
+                "status": "success"
+            }
+        }
+
     def search(self, query: str, timeout: int = 10, page: int = 1,
                 category: str = 'search', time_range: str = None,
                 safesearch: int = 0, locale: str = 'en-US',
                 country: str = 'US',
-                proxy = ""
+                proxy=None,
                 **kwargs) -> dict:
         
         try:
-            config = self._get_brave_config(category, locale, country)
-            params = {
-                'q': query,
-                'source': 'web',
-                'spellcheck': '0'
-            }
-            
-            # Pagination
-            if category in ['search', 'goggles'] and page > 1:
-                params['offset'] = page - 1
-            
-            # Time range
-            if time_range and category in ['search', 'goggles']:
-                params['tf'] = self.time_range_map.get(time_range, '')
-            
-            # Safesearch
-            config['cookies']['safesearch'] = self.safesearch_map.get(safesearch, 'off')
-            
-            url = f"{self.base_url}{self.category_map[category]}?{urlencode(params)}"
+            request = self._prepare_request(query, timeout, page, category, time_range, safesearch, locale, country)
             
             # Submit request
-            response = requests.get(
-                url,
-                headers=config['headers'],
-                cookies=config['cookies'],
-                timeout=timeout,
-                proxies=proxy
-            )
-            response.raise_for_status()
+            response = self.request(proxy=proxy, stream=True, **request)
+            body = self.read(response, kwargs.get("num_results"), self._result_marker(category), category=category)
+            return self._parse_response(response, body, page, category)
             
+        except Exception as e:
+            record_error(e)
             return {
-                "results": self._parse_results(response, category),
+                **error_output(e),
                 "metadata": {
-                    "page": page,
-                    "category": category,
-                    "status": "success"
+                    "status": "failed"
                 }
             }
-            
+
+    async def asearch(self, query: str, timeout: int = 10, page: int = 1,
+                category: str = 'search', time_range: str = None,
+                safesearch: int = 0, locale: str = 'en-US',
+                country: str = 'US',
+                proxy=None,
+                **kwargs) -> dict:
+
+        try:
+            request = self._prepare_request(query, timeout, page, category, time_range, safesearch, locale, country)
+            response = await self.arequest(proxy=proxy, stream=True, **request)
+            body = await self.aread(response, kwargs.get("num_results"), self._result_marker(category), category=category)
+            return await self.aparse_response(response, body, page, category)
+
         except Exception as e:
+            record_error(e)
             return {
-                "error": str(e),
+                **error_output(e),
                 "metadata": {
                     "status": "failed"
                 }
@@ -1,18 +1,29 @@
+from pyMOA.core.aggregator import unwrap_redirect
 from pyMOA.core.base_engine import BaseEngine
-import requests
+from pyMOA.core.health import error_output
+from pyMOA.core.metrics import record_error
 import re
 from urllib.parse import urlencode, quote_plus
-from lxml import html
+from pyMOA.core.parsing import XPath, first, join_text, parse_html
+from pyMOA.core.results import SearchResult
 
 
 class DuckDuckGoEngine(BaseEngine):
+    # Selectors are compiled once, when the module is imported.
+    ENCODING = "utf-8"
+    STOP_MARKER = b'class="nav-link"'  # Pagination forms follow the results
+    RESULT_MARKER = b'web-result'
+    XPATH_RESULTS = XPath('//div[contains(@class, "web-result")]')
+    XPATH_TITLE = XPath('.//h2/a/text()')
+    XPATH_URL = XPath('.//h2/a/@href')
+    XPATH_CONTENT = XPath('.//a[contains(@class, "result__snippet")]//text()')
 
     def __init__(self):
         super().__init__()
         self.time_range_dict = {'day': 'd', 'week': 'w', 'month': 'm', 'year': 'y'}
         self.base_url = "https://html.duckduckgo.com/html"
 
-    def search(self, query: str,timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, proxy="" **kwargs) -> dict:
+    def _prepare_request(self, query: str, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, **kwargs) -> dict:
         params = {
             "page": page,
             "safesearch": safesearch,
@@ -21,42 +32,70 @@ class DuckDuckGoEngine(BaseEngine):
             **kwargs
         }
 
+        data = {
+            "q": query,
+            "kl": self.config.get("region", "wt-wt"),
+            "df": self.time_range_dict.get(params["time_range"], ""),
+            "s": (params["page"] - 1) * 30
+        }
+
+        return {
+            "method": "POST",
+            "url": self.base_url,
+            "data": data,
+            "headers": {"User-Agent": "Mozilla/5.0"},
+            "timeout": self.config.get("timeout", timeout),
+        }
+
+    def _parse_response(self, response, body) -> dict:
+        response.raise_for_status()
+
+        return {"results": [result.to_dict() for result in self.parse(body)]}
+
+    @classmethod
+    def parse_results(cls, content: bytes, encoding: str = None) -> list[SearchResult]:
+        return cls.parse_dom(parse_html(content, encoding or cls.ENCODING, cls.STOP_MARKER))
+
+    @classmethod
+    def parse_dom(cls, dom) -> list[SearchResult]:
+        results = []
+
+        for result in cls.XPATH_RESULTS(dom):
+            title = cls.XPATH_TITLE(result)
+            url = cls.XPATH_URL(result)
+            content = cls.XPATH_CONTENT(result)
+
+            if title and url and content:
+                results.append(SearchResult(
+                    title=join_text(title),
+                    url=unwrap_redirect(first(url)),
+                    content=join_text(content),
+                ))
+
+        return results
+
+    def search(self, query: str,timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, proxy=None, **kwargs) -> dict:
+        try:
+            if len(query) >= 500:
+                return {"error": "Query too long (max 500 chars)"}
+
+            request = self._prepare_request(query, timeout, page, time_range, safesearch, **kwargs)
+            response = self.request(proxy=proxy, stream=True, **request)
+            return self._parse_response(response, self.read(response, kwargs.get("num_results")))
+
+        except Exception as e:
+            record_error(e)
+            return error_output(e)
+
+    async def asearch(self, query: str,timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, proxy=None, **kwargs) -> dict:
         try:
             if len(query) >= 500:
                 return {"error": "Query too long (max 500 chars)"}
 
-            data = {
-                "q": query,
-                "kl": self.config.get("region", "wt-wt"),
-                "df": self.time_range_dict.get(params["time_range"], ""),
-                "s": (params["page"] - 1) * 30
-            }
-
-            response = requests.post(
-                self.base_url,
-                data=data,
-                headers={"User-Agent": "Mozilla/5.0"},
-                timeout=self.config.get("timeout", timeout),
-                proxies=proxy
-            )
-            response.raise_for_status()
-
-            dom = html.fromstring(response.text)
-            results = []
-
-            for result in dom.xpath('//div[contains(@class, "web-result")]'):
-                title = result.xpath('.//h2/a/text()')
-                url = result.xpath('.//h2/a/@href')
-                content = result.xpath('.//a[contains(@class, "result__snippet")]//text()')
-
-                if title and url and content:
-                    results.append({
-                        "title": " ".join(title).strip(),
-                        "url": url[0].split("//duckduckgo.com/?q=")[-1],
-                        "content": " ".join(content).strip()
-                    })
-
-            return {"results": results}
+            request = self._prepare_request(query, timeout, page, time_range, safesearch, **kwargs)
+            response = await self.arequest(proxy=proxy, stream=True, **request)
+            return await self.aparse_response(response, await self.aread(response, kwargs.get("num_results")))
 
         except Exception as e:
-            return {"error": str(e)}
+            record_error(e)
+            return error_output(e)
@@ -1,15 +1,26 @@
 import json
 import re
 from urllib.parse import urlencode
-from lxml import html
-import requests
 import random
 import string
 import time
+from pyMOA.core.aggregator import unwrap_redirect
 from pyMOA.core.base_engine import BaseEngine
+from pyMOA.core.health import error_output
+from pyMOA.core.metrics import record_error
+from pyMOA.core.parsing import XPath, first, join_text, parse_html
+from pyMOA.core.results import SearchResult
 
 
 class GoogleEngine(BaseEngine):
+    # Selectors are compiled once, when the module is imported.
+    ENCODING = "utf-8"  # Requested with ie/oe=utf8
+    RESULT_MARKER = b'jscontroller="SC7lYd"'
+    XPATH_RESULTS = XPath('//div[contains(@jscontroller, "SC7lYd")]')
+    XPATH_TITLE = XPath('.//a/h3//text()')
+    XPATH_URL = XPath('.//a[h3]/@href')
+    XPATH_CONTENT = XPath('.//div[contains(@data-sncf, "1")]//text()')
+
     def __init__(self):
         super().__init__()
         self.BASE_HEADERS = {
@@ -43,7 +54,8 @@ class GoogleEngine(BaseEngine):
         return ",".join([arc_id, use_ac, _fmt])
 
     def detect_google_sorry(self, response):
-        if "sorry.google.com" in response.url or "/sorry" in response.url:
+        url = str(response.url)
+        if "sorry.google.com" in url or "/sorry" in url:
             raise Exception("Google CAPTCHA detected")
 
     def get_google_info(self, locale="en-US", country="US"):
@@ -61,54 +73,78 @@ class GoogleEngine(BaseEngine):
             "cookies": {"CONSENT": "YES+"},
         }
 
-    def search(self, query: str,timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", proxy="" **kwargs) -> dict:
+    def _prepare_request(self, query: str, timeout: int = 10, page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US") -> dict:
+        google_info = self.get_google_info(locale, country)
+        offset = (page - 1) * 10
+        str_async = self.ui_async(offset)
+        params = {
+            "q": query,
+            **google_info["params"],
+            'filter': '0',
+            "start": offset,
+            "asearch": "arc",
+            "async": str_async,
+        }
+
+        time_range_dict = {"day": "d", "week": "w", "month": "m", "year": "y"}
+        if time_range in time_range_dict:
+            params["tbs"] = f"qdr:{time_range_dict[time_range]}"
+
+        safesearch_mapping = {0: "off", 1: "medium", 2: "high"}
+        params["safe"] = safesearch_mapping.get(safesearch, "off")
+
+        return {
+            "method": "GET",
+            "url": f"https://{google_info['subdomain']}/search?{urlencode(params)}",
+            "headers": google_info["headers"],
+            "cookies": google_info["cookies"],
+            "timeout": timeout,
+        }
+
+    def _parse_response(self, response, body) -> dict:
+        response.raise_for_status()
+        self.detect_google_sorry(response)
+
+        return {"results": [result.to_dict() for result in self.parse(body)]}
+
+    @classmethod
+    def parse_results(cls, content: bytes, encoding: str = None) -> list[SearchResult]:
+        return cls.parse_dom(parse_html(content, encoding or cls.ENCODING))
+
+    @classmethod
+    def parse_dom(cls, dom) -> list[SearchResult]:
+        results = []
+
+        for result in cls.XPATH_RESULTS(dom):
+            title = cls.XPATH_TITLE(result)
+            url = cls.XPATH_URL(result)
+            content = cls.XPATH_CONTENT(result)
+
+            if title and url and content:
+                results.append(SearchResult(
+                    title=join_text(title),
+                    url=unwrap_redirect(first(url)),
+                    content=join_text(content),
+                ))
+
+        return results
+
+    def search(self, query: str,timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", proxy=None, **kwargs) -> dict:
+        try:
+            request = self._prepare_request(query, timeout, page, time_range, safesearch, locale, country)
+            response = self.request(proxy=proxy, stream=True, **request)
+            return self._parse_response(response, self.read(response, kwargs.get("num_results")))
+
+        except Exception as e:
+            record_error(e)
+            return error_output(e)
+
+    async def asearch(self, query: str,timeout: int = 10 , page: int = 1, time_range: str = None, safesearch: int = 0, locale="en-US", country="US", proxy=None, **kwargs) -> dict:
         try:
-            google_info = self.get_google_info(locale, country)
-            offset = (page - 1) * 10
-            str_async = self.ui_async(offset)
-            params = {
-                "q": query,
-                **google_info["params"],
-                'filter': '0',
-                "start": offset,
-                "asearch": "arc",
-                "async": str_async,
-            }
-
-            time_range_dict = {"day": "d", "week": "w", "month": "m", "year": "y"}
-            if time_range in time_range_dict:
-                params["tbs"] = f"qdr:{time_range_dict[time_range]}"
-
-            safesearch_mapping = {0: "off", 1: "medium", 2: "high"}
-            params["safe"] = safesearch_mapping.get(safesearch, "off")
-
-            url = f"https://{google_info['subdomain']}/search?{urlencode(params)}"
-            response = requests.get(
-                url,
-                headers=google_info["headers"],
-                cookies=google_info["cookies"],
-                timeout=timeout,
-                proxies=proxy
-            )
-            response.raise_for_status()
-            self.detect_google_sorry(response)
-
-            dom = html.fromstring(response.text)
-            results = []
-
-            for result in dom.xpath('//div[contains(@jscontroller, "SC7lYd")]'):
-                title = result.xpath('.//a/h3//text()')
-                url = result.xpath('.//a[h3]/@href')
-                content = result.xpath('.//div[contains(@data-sncf, "1")]//text()')
-
-                if title and url and content:
-                    results.append({
-                        "title": " ".join(title).strip(),
-                        "url": url[0].split("&sa=U&")[0],  # پاکسازی URL
-                        "content": " ".join(content).strip(),
-                    })
-
-            return {"results": results}
+            request = self._prepare_request(query, timeout, page, time_range, safesearch, locale, country)
+            response = await self.arequest(proxy=proxy, stream=True, **request)
+            return await self.aparse_response(response, await self.aread(response, kwargs.get("num_results")))
 
         except Exception as e:
-            return {"error": str(e)}
+            record_error(e)
+            return error_output(e)
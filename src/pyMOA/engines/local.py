@@ -0,0 +1,29 @@
+from pyMOA.core.base_engine import BaseEngine
+from pyMOA.core.health import error_output
+
+
+class LocalEngine(BaseEngine):
+    """
+    Answers searches from the LocalIndex of the client, with the results the other engines returned
+    before, and without network requests. Only runs when named in `engines`, or in place of engines
+    that are skipped as degraded. Needs a client created with MOAClient(local_index=LocalIndex(path)).
+    """
+
+    SELECTED_BY_DEFAULT = False
+
+    def __init__(self):
+        super().__init__()
+        self.local_index = None  # Set by MOAClient
+
+    def search(self, query: str, num_results: int = None, page: int = 1, **kwargs) -> dict:
+        if self.local_index is None:
+            return {"error": "No local index, create the client with MOAClient(local_index=LocalIndex(path))"}
+        try:
+            limit = num_results or self.get_params().get("limit", 10)
+            return {"results": self.local_index.search(query, limit, (max(page or 1, 1) - 1) * limit)}
+        except Exception as e:
+            return error_output(e)
+
+    async def asearch(self, query: str, **kwargs) -> dict:
+        # A local query takes less time than a hop to the executor.
+        return self.search(query, **kwargs)
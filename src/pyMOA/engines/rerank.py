@@ -0,0 +1,22 @@
+from pyMOA.core.base_engine import BaseEngine
+from pyMOA.core.rerank import rerank
+
+
+class RerankEngine(BaseEngine):
+    """
+    Shaping engine that ranks the merged results of a search by relevance to the query, in process
+    and without network calls: BM25 over title and content, plus how many engines returned each
+    result and at which positions. Selected with search(..., merge="rerank"). Needs numpy.
+    """
+
+    def shape(self, query: str, records: list) -> list:
+        # Re-orders the records of merge_results(), best first.
+        params = self.get_params()
+        return rerank(query or "", records, params.get("weights"), params.get("k1", 1.2), params.get("b", 0.75))
+
+    def search(self, query: str, results: list = None, **kwargs) -> dict:
+        # Shaping engines don't search, they rank the merged results they are given.
+        try:
+            return {"results": self.shape(query, list(results or []))}
+        except Exception as e:
+            return {"error": str(e)}
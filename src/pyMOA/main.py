@@ -1,32 +1,38 @@
-from concurrent.futures import ThreadPoolExecutor
-from pyMOA.core.engine_loader import EngineLoader
-from pyMOA.core.plugin_loader import PluginLoader
+import atexit
+import threading
+from pyMOA.core.client import MOAClient
+from pyMOA.core.proxy import ProxyPool, get_proxy_config
 from typing import Optional, Annotated , Union
 
-def get_proxy_config(proxy: str | dict =None):
+_default_client: Optional[MOAClient] = None
+_default_client_lock = threading.Lock()
 
+
+def get_default_client() -> MOAClient:
     """
-    Global proxy settings for engines that use the "requests" library.
-    Supported proxy types: Follows the "requests" supported ones. Current inputs are passed directly to requests.get proxies input. For more information, see https://requests.readthedocs.io.
+    Returns the shared client used by the module level functions. It is created on first use.
     """
-    if proxy is None:
-        return None
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = MOAClient()
+    return _default_client
+
 
+def _close_default_client():
+    if _default_client is not None:
+        _default_client.close()
 
-    if isinstance(proxy, str):
-        if proxy[:5] == "http:":
-            return proxy
-        elif proxy[:5] == "https":
-            proxy = proxy.replace("https://", "http://", 1)
-            return proxy
-        else:
-            raise TypeError("Proxy string must start with 'http://' or 'https://'.")
 
-    elif isinstance(proxy, dict):
-        if not set(proxy.keys()) & {"http", "https"}:
-            raise TypeError("The input dictionary must contain at least one of the two proxy types http or https.")
+atexit.register(_close_default_client)
 
-        return proxy
+
+def reload():
+    """
+    Rediscovers engines and plugins and rereads their configs in the default client.
+    """
+    get_default_client().reload()
 
 
 def search(
@@ -40,10 +46,13 @@ def search(
     safesearch: Annotated[int, "Safe search level"] = 0,
     country: Annotated[str, "Country to search"] = "",
     categories: Annotated[str, "Search category"] = "general",
-    proxy: Annotated[Union[str, dict[str, str]], "HTTP or HTTPS proxy string or dict"] = None,
+    proxy: Annotated[Union[str, dict[str, str], ProxyPool], "HTTP or HTTPS proxy string or dict, or a ProxyPool"] = None,
+    **kwargs,
     ):
     """
     Multi-engine search interface as a Python function.
+    Runs on the default MOAClient, so engines and plugins are only loaded on the first call.
+    Extra keyword arguments are passed to MOAClient.search.
 
     Args:
         query (str): Search query.
@@ -55,114 +64,75 @@ def search(
     Returns:
         str: List search results.
     """
+    return get_default_client().search(
+        q=q,
+        engines=engines,
+        enabled_plugins=enabled_plugins,
+        time_range=time_range,
+        language=language,
+        limit=limit,
+        pageno=pageno,
+        safesearch=safesearch,
+        country=country,
+        categories=categories,
+        proxy=proxy,
+        **kwargs,
+    )
+
+
+async def search_async(
+    q: Annotated[Optional[str], "Search query"] = None,
+    engines: Annotated[Optional[list[str]], "List of search engines"] = None,
+    enabled_plugins: Annotated[Optional[list[str]], "List of plugins"] = None,
+    time_range: Annotated[str, "Time range filter"] = None,
+    language: Annotated[str, "Search language"] = "",
+    limit: Annotated[Optional[int], "Number of results per engine"] = None,
+    pageno: Annotated[int, "Page number"] = 1,
+    safesearch: Annotated[int, "Safe search level"] = 0,
+    country: Annotated[str, "Country to search"] = "",
+    categories: Annotated[str, "Search category"] = "general",
+    proxy: Annotated[Union[str, dict[str, str], ProxyPool], "HTTP or HTTPS proxy string or dict, or a ProxyPool"] = None,
+    **kwargs,
+    ):
+    """
+    Async version of search() for use inside an asyncio event loop.
+    Takes the same arguments and returns the same structure. Runs on the default MOAClient.
+    """
+    return await get_default_client().search_async(
+        q=q,
+        engines=engines,
+        enabled_plugins=enabled_plugins,
+        time_range=time_range,
+        language=language,
+        limit=limit,
+        pageno=pageno,
+        safesearch=safesearch,
+        country=country,
+        categories=categories,
+        proxy=proxy,
+        **kwargs,
+    )
+
+
+def iter_search(q: Annotated[Optional[str], "Search query"] = None, **kwargs):
+    """
+    Yields (type, name, output) as each engine finishes, in completion order.
+    Takes the same arguments as search(). See MOAClient.iter_search.
+    """
+    yield from get_default_client().iter_search(q=q, **kwargs)
+
 
-    # Validate safesearch
-    if safesearch not in [0, 1, 2]:
-        raise ValueError("Invalid safesearch level. Choose from 0 (off), 1 (moderate), 2 (strict).")
-
-    # Validate time_range
-    allowed_ranges = ["day", "week", "month", "year"]
-    if time_range is not None and time_range not in allowed_ranges:
-        raise ValueError(f"Invalid time_range. Choose from {allowed_ranges}")
-
-    # Loading engines and plugin anf determining healthy
-    ploader = PluginLoader()
-    loader = EngineLoader()
-    engine_status = loader.list_engines()
-    plugin_status = ploader.list_plugins()
-
-    categories = category.lower() if categories else "general"
-    if categories not in engine_status:
-        categories = "general"
-
-    if engines:
-        if categories in engine_status:
-            invalid_engines = [e for e in engines if e not in engine_status[categories]]
-            if invalid_engines:
-                raise ValueError(f"Engine(s) {invalid_engines} not found in category '{categories}'")
-
-        selected_engines = engines
-    else:
-        selected_engines = engine_status[categories]
-
-
-    selected_pre_plugins = []
-    selected_post_plugins = []
-
-    if enabled_plugins:
-        for plugin_name in enabled_plugins:
-            plugin_instance = ploader.get_plugin(plugin_name)
-            if not plugin_instance:
-                raise ValueError(f"Plugin '{plugin_name}' not found or failed to load.")
-
-            plugin_type = plugin_instance.get_type().lower()
-            if plugin_type == "pre":
-                selected_pre_plugins.append(plugin_instance)
-            elif plugin_type == "post":
-                selected_post_plugins.append(plugin_instance)
-            else:
-                raise ValueError(f"Plugin '{plugin_name}' has unknown type '{plugin_type}'")
-
-
-    else:
-        selected_pre_plugins = ploader.pre_plugins
-        selected_post_plugins = ploader.post_plugins
-
-
-    proxy = get_proxy_config(proxy)
-
-    results = {}
-    pre_plugin_outputs = {}
-    # Adding active or inactive motors to the results
-    results["active_engines"] = engine_status["active"]
-    results["failed_engines"] = engine_status["failed"]
-    results["active_plugins"] = plugin_status["active"]
-    results["failed_plugins"] = plugin_status["failed"]
-
-    with ThreadPoolExecutor() as executor:
-        futures = {}
-        for engine_name in selected_engines:
-            engine = loader.get_engine(engine_name)
-            if not engine:
-                results[engine_name] = {"error": f"Engine {engine_name} not found!"}
-                continue
-            # Creating search parameters
-            search_params = {
-                "query": q,
-                "page": pageno,
-                "safesearch": safesearch,
-                "time_range": time_range,
-                "locale": language,
-                "num_results": limit, # For engines that can return a certain number of results by default
-                "country": country,
-                "proxy": proxy
-            }
-
-            futures[executor.submit(engine.search, **search_params)] = ("engine", engine_name)
-
-
-
-        for plugin in selected_pre_plugins:
-            futures[executor.submit(plugin.run, q)] = ("pre_plugin", plugin.__class__.__name__)
-
-        for future in futures:
-            ftype, name = futures[future]
-            try:
-                output = future.result()
-                if ftype == "engine":
-                    if limit and isinstance(output, dict) and "results" in output and isinstance(output["results"], list):
-                        output["results"] = output["results"][:limit]
-                    results[name] = output
-                elif ftype == "pre_plugin":
-                    pre_plugin_outputs[name] = output
-
-            except Exception as e:
-                if ftype == "engine":
-                    results[name] = {"error": str(e)}
-                elif ftype == "pre_plugin":
-                    pre_plugin_outputs[name] = {"error": str(e)}
-
-    return {
-        "results": results,
-        "pre_plugins": pre_plugin_outputs
-    }
+async def aiter_search(q: Annotated[Optional[str], "Search query"] = None, **kwargs):
+    """
+    Async iterator version of iter_search(). See MOAClient.aiter_search.
+    """
+    async for item in get_default_client().aiter_search(q=q, **kwargs):
+        yield item
+
+
+def search_many(queries, **kwargs):
+    """
+    Searches many queries with a shared worker pool, per host rate limits and retries.
+    Yields each query's response as it completes. See MOAClient.search_many.
+    """
+    return get_default_client().search_many(queries, **kwargs)
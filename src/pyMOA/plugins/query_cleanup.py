@@ -0,0 +1,18 @@
+import re
+from pyMOA.core.base_plugin import BasePlugin
+
+SYMBOLS = re.compile(r"[^\w\s\"'+-]")
+WHITESPACE = re.compile(r"\s+")
+
+
+class QueryCleanupPlugin(BasePlugin):
+    # Sample pre plugin, disabled in plugin_params.json. Enable it per search with enabled_plugins=["querycleanup"].
+
+    def run(self, query: str, results: dict) -> dict:
+        params = self.get_params()
+        cleaned = query or ""
+        if params.get("remove_symbols"):
+            cleaned = SYMBOLS.sub(" ", cleaned)
+        if params.get("strip_whitespace", True):
+            cleaned = WHITESPACE.sub(" ", cleaned).strip()
+        return {"query": cleaned} if cleaned and cleaned != query else {}
@@ -0,0 +1,36 @@
+"""
+Records live SERPs of the engines into fixtures/.
+
+    python -m tests.benchmarks.record -q "privacy search engine" --engines google bing
+
+Only run this by hand. The committed fixtures are representative pages built around the
+selectors of each engine, refresh them with live captures when an engine changes its markup.
+"""
+import argparse
+from pyMOA.core.client import MOAClient
+from tests.benchmarks.server import FIXTURES_DIR
+
+
+def record(query: str, engines: list = None, fixtures_dir=FIXTURES_DIR):
+    with MOAClient() as client:
+        client.loader.load_engines()
+        for engine_id, engine in client.loader.engines.items():
+            if engines and engine_id not in engines:
+                continue
+            if not hasattr(engine, "_prepare_request"):
+                print(f"{engine_id}: skipped, no _prepare_request()")
+                continue
+
+            response = engine.request(**engine._prepare_request(query))
+            response.raise_for_status()
+            path = fixtures_dir / f"{engine_id}.html"
+            path.write_bytes(response.content)
+            print(f"{engine_id}: {len(response.content)} bytes -> {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record live SERPs as benchmark fixtures.")
+    parser.add_argument("-q", "--query", default="privacy search engine")
+    parser.add_argument("--engines", nargs="*")
+    args = parser.parse_args()
+    record(args.query, args.engines)
@@ -0,0 +1,190 @@
+"""
+pyMOA benchmark suite.
+
+Runs against the recorded SERPs in fixtures/, served by a local ReplayServer, so results are
+repeatable and no live engine is contacted. Results are written as JSON, compare two runs to spot
+regressions between commits:
+
+    python -m tests.benchmarks.run --out bench.json
+    python -m tests.benchmarks.run --only parse --iterations 500
+    python -m tests.benchmarks.run --only fetch --gzip --latency 0 --jitter 0
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from pyMOA.core.client import MOAClient
+from tests.benchmarks.server import ReplayServer, load_fixtures
+
+QUERIES = ["privacy search engine", "python metasearch", "open source library", "web index ranking"]
+
+
+def percentiles(samples: list) -> dict:
+    # Latencies in milliseconds
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] * 1000
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered) * 1000,
+        "p50": pick(50),
+        "p90": pick(90),
+        "p99": pick(99),
+        "max": ordered[-1] * 1000,
+    }
+
+
+def bench_parse(client: MOAClient, iterations: int) -> dict:
+    """
+    CPU time of turning a SERP into result dicts, per engine.
+    """
+    fixtures = load_fixtures()
+    report = {}
+    client.loader.load_engines()
+    for engine_id, engine in client.loader.engines.items():
+        content = fixtures.get(engine_id)
+        if content is None or not hasattr(engine, "parse_results"):
+            continue
+
+        results = engine.parse_results(content)  # Warm up
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            engine.parse_results(content)
+            samples.append(time.perf_counter() - started)
+
+        report[engine_id] = {"bytes": len(content), "results": len(results), **percentiles(samples)}
+    return report
+
+
+def bench_fetch(client: MOAClient, searches: int) -> dict:
+    """
+    CPU time and allocations of one engine call, per engine: the request, reading (and decompressing)
+    the body and parsing it. Measured in the calling thread only, the replay server runs in others.
+    """
+    fixtures = load_fixtures()
+    report = {}
+    client.loader.load_engines()
+    for engine_id, engine in client.loader.engines.items():
+        if engine_id not in fixtures:
+            continue
+        output = engine.search(QUERIES[0])  # Open the connection pool
+        samples, cpu = [], []
+        for i in range(searches):
+            started, thread_started = time.perf_counter(), time.thread_time()
+            engine.search(QUERIES[i % len(QUERIES)])
+            cpu.append(time.thread_time() - thread_started)
+            samples.append(time.perf_counter() - started)
+        peaks = []
+        for i in range(min(searches, 20)):
+            tracemalloc.start()
+            engine.search(QUERIES[i % len(QUERIES)])
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        report[engine_id] = {
+            "results": len(output.get("results", [])),
+            "error": output.get("error"),
+            "cpu_ms": statistics.fmean(cpu) * 1000,
+            "peak_bytes": statistics.median(peaks),
+            **percentiles(samples),
+        }
+    return report
+
+
+def bench_latency(client: MOAClient, searches: int) -> dict:
+    """
+    End to end latency of sequential search() calls.
+    """
+    client.search(q=QUERIES[0])  # Open the connection pools
+    samples = []
+    for i in range(searches):
+        started = time.perf_counter()
+        client.search(q=QUERIES[i % len(QUERIES)])
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def bench_throughput(client: MOAClient, searches: int, concurrency: int) -> dict:
+    """
+    Searches per second with several callers sharing one client.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        list(callers.map(lambda i: client.search(q=QUERIES[i % len(QUERIES)]), range(searches)))
+    elapsed = time.perf_counter() - started
+    return {"searches": searches, "concurrency": concurrency, "seconds": elapsed, "searches_per_second": searches / elapsed}
+
+
+def bench_memory(client: MOAClient, searches: int) -> dict:
+    """
+    Allocations of one search() call, traced with tracemalloc.
+    """
+    client.search(q=QUERIES[0])
+    peaks, retained = [], []
+    for i in range(searches):
+        tracemalloc.start()
+        response = client.search(q=QUERIES[i % len(QUERIES)])
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del response
+        peaks.append(peak)
+        retained.append(current)
+    return {"peak_bytes": statistics.median(peaks), "result_bytes": statistics.median(retained)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pyMOA against recorded SERPs.")
+    parser.add_argument("--out", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--only", nargs="*", choices=["parse", "fetch", "latency", "throughput", "memory"])
+    parser.add_argument("--iterations", type=int, default=200, help="Parses per engine")
+    parser.add_argument("--searches", type=int, default=100, help="Searches per search benchmark")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.02, help="Replay server delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Replay server random delay in seconds")
+    parser.add_argument("--gzip", action="store_true", help="Replay server compresses its responses")
+    parser.add_argument("--parse-processes", type=int, help="Parse in this many worker processes (0 = one per CPU)")
+    args = parser.parse_args(argv)
+    selected = set(args.only or ["parse", "fetch", "latency", "throughput", "memory"])
+
+    report = {
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "settings": vars(args),
+    }
+
+    with ReplayServer(args.latency, args.jitter, compress=args.gzip) as server, MOAClient(parse_processes=args.parse_processes) as client:
+        server.attach(client)
+        if "parse" in selected:
+            report["parse"] = bench_parse(client, args.iterations)
+        if "fetch" in selected:
+            report["fetch"] = bench_fetch(client, args.searches)
+        if "latency" in selected:
+            report["latency"] = bench_latency(client, args.searches)
+        if "throughput" in selected:
+            report["throughput"] = bench_throughput(client, args.searches, args.concurrency)
+        if "memory" in selected:
+            report["memory"] = bench_memory(client, min(args.searches, 20))
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Local stand-in for the search engines.
+
+ReplayServer serves the recorded SERPs in fixtures/ over HTTP with a configurable latency and
+jitter, gzip compressed when asked to. attach() points the engines of a MOAClient at it, so benchmarks run the real request,
+connection pool and parsing code without touching the live engines.
+"""
+import functools
+import gzip
+import http.server
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def load_fixtures(fixtures_dir: Path = FIXTURES_DIR) -> dict:
+    return {path.stem: path.read_bytes() for path in sorted(fixtures_dir.glob("*.html"))}
+
+
+class ReplayHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real engines
+    disable_nagle_algorithm = True  # Headers and body are written separately
+
+    def _replay(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+
+        server = self.server
+        engine_id = self.path.lstrip("/").split("/", 1)[0]
+        body = server.fixtures.get(engine_id)
+        compressed = server.compress and body is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        if compressed:
+            body = server.compressed[engine_id]
+
+        delay = server.delay(engine_id)
+        if delay > 0:
+            time.sleep(delay)
+
+        if body is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _replay
+    do_POST = _replay
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Concurrent searches open many connections at once
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, fixtures: dict = None, port: int = 0,
+                 compress: bool = False, latencies: dict = None):
+        super().__init__(("127.0.0.1", port), ReplayHandler)
+        self.latency = latency
+        self.latencies = latencies or {}  # Engine id -> latency, in place of latency
+        self.jitter = jitter
+        self.fixtures = fixtures if fixtures is not None else load_fixtures()
+        # Compressed once, like a CDN cache would, so the server's CPU time doesn't add to the latency.
+        self.compress = compress
+        self.compressed = {name: gzip.compress(body, 6) for name, body in self.fixtures.items()} if compress else {}
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Clients that stopped waiting for a slow response close the connection, which is not an error here.
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def delay(self, engine_id: str) -> float:
+        # Seconds the response of one request to the engine is held back.
+        return self.latencies.get(engine_id, self.latency) + random.uniform(-self.jitter, self.jitter)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def rewrite(self, engine_id: str, url: str) -> str:
+        # https://www.google.com/search?q=... -> http://127.0.0.1:port/google/search?q=...
+        parts = urlsplit(url)
+        query = f"?{parts.query}" if parts.query else ""
+        return f"{self.base_url}/{engine_id}{parts.path}{query}"
+
+    def attach(self, client):
+        """
+        Sends every request of the client's engines to this server instead of the live engine.
+        """
+        client.loader.load_engines()
+        for engine_id, engine in client.loader.engines.items():
+            engine.request = functools.partial(self._request, engine_id, engine.__class__.request.__get__(engine))
+            engine.arequest = functools.partial(self._arequest, engine_id, engine.__class__.arequest.__get__(engine))
+        return client
+
+    def _request(self, engine_id, request, method, url, **kwargs):
+        return request(method, self.rewrite(engine_id, url), **kwargs)
+
+    async def _arequest(self, engine_id, arequest, method, url, **kwargs):
+        return await arequest(method, self.rewrite(engine_id, url), **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay recorded SERPs over HTTP.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- delay in seconds")
+    parser.add_argument("--gzip", action="store_true", help="Compress responses for clients that accept gzip")
+    args = parser.parse_args()
+
+    server = ReplayServer(args.latency, args.jitter, port=args.port, compress=args.gzip)
+    print(f"Serving {', '.join(server.fixtures)} on {server.base_url}/<engine>/")
+    server.serve_forever()
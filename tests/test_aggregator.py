@@ -0,0 +1,100 @@
+import pytest
+from pyMOA.core.aggregator import merge_results, normalize_url, unwrap_redirect
+from pyMOA.core.pages import PageCollector
+
+
+def test_unwrap_google_redirect():
+    url = "/url?q=https://example.com/page&sa=U&ved=abc"
+    assert unwrap_redirect(url) == "https://example.com/page"
+    assert unwrap_redirect("https://www.google.com/url?url=https://example.com/") == "https://example.com/"
+
+
+def test_unwrap_duckduckgo_redirect():
+    url = "//duckduckgo.com/l/?uddg=https%3A%2F%2Fexample.com%2Fpage&rut=abc"
+    assert unwrap_redirect(url) == "https://example.com/page"
+
+
+def test_unwrap_keeps_plain_urls():
+    assert unwrap_redirect("https://example.com/url?q=1") == "https://example.com/url?q=1"
+    assert unwrap_redirect("") == ""
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/page",
+    "http://www.example.com/page/",
+    "https://EXAMPLE.com:443/page#section",
+    "https://example.com/page?utm_source=news&gclid=123",
+    "/url?q=https://example.com/page&sa=U",
+])
+def test_normalize_url_variants_share_a_key(url):
+    assert normalize_url(url) == normalize_url("https://example.com/page")
+
+
+def test_normalize_url_keeps_what_changes_the_page():
+    assert normalize_url("https://example.com/page?b=2&a=1") == normalize_url("https://example.com/page?a=1&b=2")
+    assert normalize_url("https://example.com/page?a=1") != normalize_url("https://example.com/page?a=2")
+    assert normalize_url("https://example.com:8080/page") != normalize_url("https://example.com/page")
+
+
+@pytest.mark.parametrize("url", ["http://a.example:abc/x", "http://[::1/x"])
+def test_malformed_urls_are_their_own_key(url):
+    assert unwrap_redirect(url) == url
+    assert normalize_url(f" {url} ") == url
+
+
+def test_merge_and_pages_survive_malformed_urls():
+    outputs = {
+        "google": {"results": [{"title": "Bad port", "url": "http://a.example:abc/x", "content": ""}]},
+        "bing": {"results": [
+            {"title": "Bad port", "url": "http://a.example:abc/x", "content": "x"},
+            {"title": "B", "url": "https://b.example/", "content": "b"},
+        ]},
+    }
+    assert [record["url"] for record in merge_results(outputs)] == ["http://a.example:abc/x", "https://b.example/"]
+    collector = PageCollector()
+    collector.add("google", outputs["google"])
+    collector.add("bing", outputs["bing"])
+    assert len(collector.seen) == 2
+
+
+def engines():
+    return {
+        "google": {"results": [
+            {"title": "A", "url": "https://a.example/", "content": "a"},
+            {"title": "B", "url": "https://b.example/", "content": "b"},
+            {"title": "C", "url": "https://c.example/", "content": "c"},
+        ]},
+        "bing": {"results": [
+            {"title": "B longer title", "url": "https://www.b.example", "content": "b"},
+            {"title": "A", "url": "https://a.example/?utm_medium=x", "content": "a longer snippet"},
+            {"title": "B again", "url": "https://b.example/", "content": ""},
+        ]},
+        "brave": {"error": "timed out"},
+    }
+
+
+def test_merge_deduplicates_across_engines():
+    merged = merge_results(engines())
+    # The url of the first engine that returned a result is kept.
+    assert [record["url"] for record in merged] == ["https://a.example/", "https://b.example/", "https://c.example/"]
+    by_title = {record["title"]: record for record in merged}
+    assert by_title["B longer title"]["positions"] == {"google": 2, "bing": 1}  # The second "B" of bing is dropped
+    assert by_title["A"]["content"] == "a longer snippet"
+    assert by_title["A"]["engines"] == ["google", "bing"]
+
+
+def test_merge_orders_by_score():
+    merged = merge_results(engines())
+    scores = [record["score"] for record in merged]
+    assert scores == sorted(scores, reverse=True)
+    assert merged[-1]["title"] == "C"  # Only one engine returned it
+
+    # With rrf, A (1 + 2) and B (2 + 1) tie, ties keep the order of first appearance.
+    assert [record["title"] for record in merged] == ["A", "B longer title", "C"]
+    assert [record["title"] for record in merge_results(engines(), "count")][:2] == ["A", "B longer title"]
+
+
+def test_merge_limit_and_invalid_method():
+    assert len(merge_results(engines(), limit=1)) == 1
+    with pytest.raises(ValueError):
+        merge_results(engines(), method="best")
@@ -0,0 +1,100 @@
+import asyncio
+import contextvars
+import threading
+import time
+
+import pytest
+
+import pyMOA.core.base_engine as base_engine
+from pyMOA.core.base_engine import BaseEngine
+from pyMOA.core.client import MOAClient
+from tests.benchmarks.server import ReplayServer
+
+ENGINES = ["bing", "brave", "duckduckgo", "google"]
+REQUEST = contextvars.ContextVar("request", default=None)
+
+
+@pytest.fixture
+def replay_client():
+    with ReplayServer() as server, MOAClient() as client:
+        server.attach(client)
+        yield client
+
+
+class BlockingEngine(BaseEngine):
+    # An engine with only the blocking interface.
+    def search(self, query: str, **kwargs) -> dict:
+        return {"results": [], "thread": threading.current_thread().name, "request": REQUEST.get(), "query": query}
+
+
+def test_sync_only_engines_run_on_the_shared_executor():
+    async def main():
+        REQUEST.set("abc")
+        return await BlockingEngine().asearch("privacy", language="en")
+
+    output = asyncio.run(main())
+    assert output["thread"].startswith("pyMOA-shared")
+    assert (output["request"], output["query"]) == ("abc", "privacy")
+
+
+def test_search_async_matches_search(replay_client):
+    expected = replay_client.search(q="privacy", engines=ENGINES)["results"]
+    results = asyncio.run(replay_client.search_async(q="privacy", engines=ENGINES))["results"]
+    for engine in ENGINES:
+        assert expected[engine]["results"]
+        assert results[engine] == expected[engine]
+
+
+def test_native_engines_stay_on_the_event_loop(replay_client, monkeypatch):
+    loader = replay_client._snapshot()[0]
+    assert all(loader.get_engine(engine).async_http.available for engine in ENGINES)
+
+    async def refuse(*args, **kwargs):
+        raise AssertionError("blocking call on the shared executor")
+
+    monkeypatch.setattr(base_engine, "run_in_shared_executor", refuse)
+    results = asyncio.run(replay_client.search_async(q="privacy", engines=ENGINES))["results"]
+    assert all(results[engine]["results"] for engine in ENGINES)
+
+
+def test_concurrent_searches_share_one_loop():
+    async def main(client):
+        async with client:
+            return await asyncio.gather(*(
+                client.search_async(q=f"privacy {i}", engines=ENGINES) for i in range(20)
+            ))
+
+    with ReplayServer(latency=0.05) as server:
+        client = MOAClient()
+        server.attach(client)
+        responses = asyncio.run(main(client))
+    assert len(responses) == 20
+    assert all(response["results"][engine]["results"] for response in responses for engine in ENGINES)
+
+
+def test_aiter_search_yields_each_engine(replay_client):
+    async def main():
+        return [item async for item in replay_client.aiter_search(q="privacy", engines=ENGINES)]
+
+    items = asyncio.run(main())
+    assert sorted(name for ftype, name, _ in items if ftype == "engine") == ENGINES
+    assert all(output["results"] for ftype, _, output in items if ftype == "engine")
+
+
+def test_aclose_does_not_block_the_event_loop():
+    client = MOAClient()
+    client._executor.submit(time.sleep, 0.3)  # A running engine call close() waits for
+    ticks = []
+
+    async def tick():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        ticker = asyncio.ensure_future(tick())
+        await client.aclose()
+        ticker.cancel()
+
+    asyncio.run(main())
+    assert len(ticks) > 10
@@ -0,0 +1,82 @@
+import pytest
+import requests
+from pyMOA.core.batch import is_transient
+from pyMOA.core.health import error_output
+from pyMOA.core.client import MOAClient
+from pyMOA.core.ratelimit import RateLimiter, current_rate_limiter, rate_limited
+from tests.benchmarks.server import ReplayServer
+
+
+class Engine:
+    def __init__(self, rate=2.0, burst=5):
+        self.config = {"rate_limit": {"rate": rate, "burst": burst}}
+
+
+def test_buckets_are_kept_per_host():
+    limiter = RateLimiter()
+    google, other = Engine(), Engine()
+    first = limiter.bucket(google, "https://www.google.com/search?q=a")
+    assert limiter.bucket(google, "https://www.google.com/search?q=b") is first
+    assert limiter.bucket(other, "https://WWW.GOOGLE.COM/complete") is first
+    assert limiter.bucket(google, "https://consent.google.com/") is not first
+    assert limiter.bucket(type("Unlimited", (), {"config": {}})(), "https://example.com/") is None
+
+
+def test_buckets_follow_config_changes():
+    limiter = RateLimiter()
+    bucket = limiter.bucket(Engine(rate=2.0), "https://example.com/")
+    limiter.bucket(Engine(rate=5.0, burst=1), "https://example.com/")
+    assert (bucket.rate, bucket.burst) == (5.0, 1)
+
+
+def test_rate_limited_context():
+    limiter = RateLimiter()
+    assert current_rate_limiter() is None
+    with rate_limited(limiter):
+        assert current_rate_limiter() is limiter
+    assert current_rate_limiter() is None
+
+
+@pytest.mark.parametrize("argument", [{"pages": [1, 2]}, {"max_results": 20}, {"prefetch": True}])
+def test_multi_page_arguments_are_rejected_up_front(argument):
+    with MOAClient() as client:
+        with pytest.raises(TypeError, match=next(iter(argument))):
+            client.search_many(["privacy"], **argument)
+
+
+def test_batch_requests_wait_on_the_host_bucket():
+    with ReplayServer() as server, MOAClient() as client:
+        server.attach(client)
+        items = list(client.search_many(["privacy", {"q": "python", "max_results": 5}], engines=["google", "bing"]))
+
+    by_query = {str(item["query"]): item for item in items}
+    response = by_query["privacy"]["response"]["results"]
+    assert response["google"]["results"] and response["bing"]["results"]
+    assert "max_results" in by_query[str({"q": "python", "max_results": 5})]["error"]
+    # Both engines were sent to the replay server, so they shared its bucket.
+    assert list(client.rate_limiter.buckets) == [server.base_url.split("//")[1]]
+
+
+def http_error(status: int, url: str) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code, response.url = status, url
+    return requests.HTTPError(f"{status} Error for url: {url}", response=response)
+
+
+def test_rejected_queries_are_not_retried():
+    assert not is_transient({"error": "Query too long (max 500 chars)"})
+
+
+def test_transience_follows_the_status_not_the_message():
+    not_found = error_output(http_error(404, "https://example.com/search?q=500+errors"))
+    assert not_found["status"] == 404
+    assert not is_transient(not_found)
+    assert is_transient(error_output(http_error(503, "https://example.com/search")))
+    assert is_transient(error_output(http_error(429, "https://example.com/search")))
+
+
+def test_transience_follows_the_exception_class():
+    assert is_transient(error_output(requests.ConnectionError("Connection refused")))
+    assert is_transient({"error": "Engine timed out", "timed_out": True})
+    assert not is_transient(error_output(ValueError("connection string 500 is invalid")))
+    assert not is_transient({"error": "Google CAPTCHA detected", "exc_type": "ConnectionError"})
@@ -0,0 +1,118 @@
+import json
+import time
+import pytest
+from pyMOA.core.cache import MemoryCache, SQLiteCache, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "time", clock)
+    return clock
+
+
+def output(n: int) -> dict:
+    return {"results": [{"title": f"Result {n}", "url": f"https://example.com/{n}", "content": ""}]}
+
+
+def test_cache_key_ignores_query_case_and_proxy():
+    key = make_cache_key("google", {"query": "Privacy  Search", "page": 1, "proxy": "http://p:1"})
+    assert key == make_cache_key("google", {"page": 1, "query": "privacy search"})
+    assert key != make_cache_key("bing", {"page": 1, "query": "privacy search"})
+
+
+def test_memory_cache_returns_copies():
+    cache = MemoryCache()
+    value = output(1)
+    cache.set("a", value)
+    value["results"].clear()
+    got = cache.get("a")
+    assert got == output(1)
+    got["results"].clear()
+    assert cache.get("a") == output(1)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", output(1))
+    cache.set("b", output(2))
+    assert cache.get("a") is not None  # b is now the least recently used
+    cache.set("c", output(3))
+    assert cache.get("b") is None
+    assert cache.get("a") == output(1)
+    assert cache.get("c") == output(3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries(clock):
+    cache = MemoryCache(ttl=10)
+    cache.set("a", output(1))
+    clock.now += 9
+    assert cache.get("a") == output(1)
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_cache_byte_limit():
+    size = len(json.dumps(output(1)))
+    cache = MemoryCache(max_bytes=2 * size + 1)
+    for n in range(1, 4):
+        cache.set(str(n), output(n))
+    assert cache.get("1") is None
+    assert cache.get("2") == output(2) and cache.get("3") == output(3)
+    assert cache.stats()["bytes"] == 2 * size
+
+    # A value larger than the whole cache is not stored and evicts nothing.
+    cache.set("big", {"results": [{"content": "x" * 3 * size}]})
+    assert cache.get("big") is None
+    assert cache.get("3") == output(3)
+
+
+def test_memory_cache_replaces_a_key():
+    cache = MemoryCache()
+    cache.set("a", output(1))
+    cache.set("a", output(2))
+    assert cache.get("a") == output(2)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == len(json.dumps(output(2)))
+
+
+def test_sqlite_cache_round_trip(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.db")
+    cache.set("a", output(1))
+    assert cache.get("a") == output(1)
+    assert cache.get("missing") is None
+    cache.close()
+
+    # Another process opening the same file sees the entry.
+    reopened = SQLiteCache(tmp_path / "cache.db")
+    assert reopened.get("a") == output(1)
+    reopened.clear()
+    assert reopened.get("a") is None
+    reopened.close()
+
+
+def test_sqlite_cache_expires_and_evicts(tmp_path, clock):
+    cache = SQLiteCache(tmp_path / "cache.db", ttl=10, max_entries=2)
+    cache.set("a", output(1))
+    clock.now += 1
+    cache.set("b", output(2))
+    clock.now += 1
+    assert cache.get("a") == output(1)  # a is now the most recently used
+    clock.now += 1
+    cache.set("c", output(3))
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    clock.now += 20
+    assert cache.get("a") is None
+    cache.close()
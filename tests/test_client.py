@@ -0,0 +1,98 @@
+import asyncio
+import pytest
+from pyMOA.core.client import MOAClient
+from pyMOA.core.health import CLOSED, TIMEOUT
+from tests.benchmarks.server import ReplayServer
+
+ENGINES = ["google", "bing", "brave", "duckduckgo"]
+
+
+@pytest.fixture
+def slow_client():
+    # Engines answering after 0.3 s, from the recorded pages.
+    with ReplayServer(latency=0.3) as server, MOAClient() as client:
+        server.attach(client)
+        yield client
+
+
+def assert_all_answered(response):
+    results = response["results"]
+    assert results["degraded_engines"] == []
+    for engine in ENGINES:
+        assert results[engine].get("results"), results[engine]
+
+
+def test_deadline_does_not_trip_engine_breakers(slow_client):
+    for _ in range(3):
+        results = slow_client.search(q="privacy", engines=ENGINES, deadline=0.1)["results"]
+        assert sorted(results["timed_out_engines"]) == sorted(ENGINES)
+
+    assert_all_answered(slow_client.search(q="privacy", engines=ENGINES))
+    status = slow_client.health.status()
+    for engine in ENGINES:
+        assert status[engine]["state"] == CLOSED
+        assert status[engine]["outcomes"][TIMEOUT] == 3  # Still counted in the stats
+
+
+def test_engine_timeout_does_not_trip_breakers(slow_client):
+    for _ in range(3):
+        results = slow_client.search(q="privacy", engines=ENGINES, timeout=0.1)["results"]
+        assert sorted(results["timed_out_engines"]) == sorted(ENGINES)
+    assert_all_answered(slow_client.search(q="privacy", engines=ENGINES))
+
+
+def test_async_deadline_does_not_trip_engine_breakers(slow_client):
+    async def main():
+        for _ in range(3):
+            await slow_client.search_async(q="privacy", engines=ENGINES, deadline=0.1)
+        return await slow_client.search_async(q="privacy", engines=ENGINES)
+
+    assert_all_answered(asyncio.run(main()))
+
+
+@pytest.fixture
+def replay_client():
+    with ReplayServer() as server, MOAClient() as client:
+        server.attach(client)
+        yield client
+
+
+def test_max_results_finishes_the_page_for_every_engine(replay_client):
+    results = replay_client.search(q="privacy", engines=ENGINES, max_results=1)["results"]
+    for engine in ENGINES:
+        assert results[engine]["pages"] == [1]
+        assert results[engine]["results"]
+
+
+def test_async_max_results_finishes_the_page_for_every_engine(replay_client):
+    response = asyncio.run(replay_client.search_async(q="privacy", engines=ENGINES, max_results=1))
+    for engine in ENGINES:
+        assert response["results"][engine]["pages"] == [1]
+
+
+def page_urls(client, engine_id):
+    # Makes each page of the engine return its own urls, the recorded page is the same for all pages.
+    engine = client.loader.get_engine(engine_id)
+    search, asearch = engine.search, engine.asearch
+
+    def mark(output, page):
+        for result in output.get("results", []):
+            result["url"] = f"{result['url'].rstrip('/')}/page{page}"
+        return output
+
+    engine.search = lambda query, page=1, **kwargs: mark(search(query, page=page, **kwargs), page)
+
+    async def paged_asearch(query, page=1, **kwargs):
+        return mark(await asearch(query, page=page, **kwargs), page)
+
+    engine.asearch = paged_asearch
+
+
+def test_pages_keep_more_results_than_the_page_limit(replay_client):
+    page_urls(replay_client, "google")
+    output = replay_client.search(q="privacy", engines=["google"], limit=3, pages=[1, 2, 3])["results"]["google"]
+    assert output["pages"] == [1, 2, 3]
+    assert [result["url"].rsplit("/", 1)[1] for result in output["results"]] == ["page1"] * 3 + ["page2"] * 3 + ["page3"] * 3
+
+    response = asyncio.run(replay_client.search_async(q="privacy", engines=["google"], limit=3, max_results=7))
+    assert len(response["results"]["google"]["results"]) == 7
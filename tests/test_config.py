@@ -0,0 +1,83 @@
+import json
+import os
+import pytest
+from pyMOA.core.config import ENGINE_SCHEMA, PLUGIN_SCHEMA, ConfigStore, validate
+
+
+def write(path, data, stamp):
+    path.write_text(json.dumps(data))
+    # Two writes within the file system's time resolution would look unchanged.
+    os.utime(path, ns=(stamp, stamp))
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "engine_params.json"
+    write(path, {"GoogleEngine": {"params": {"limit": 10}, "http": {"pool_maxsize": 4}}}, 1_000_000_000)
+    return path
+
+
+def test_reads_sections(config_file):
+    store = ConfigStore(config_file, ENGINE_SCHEMA, interval=0)
+    view = store.view("GoogleEngine")
+    assert view["params"] == {"limit": 10}
+    assert dict(store.view("MissingEngine")) == {}
+
+
+def test_reloads_a_changed_file(config_file):
+    store = ConfigStore(config_file, ENGINE_SCHEMA, interval=0)
+    view = store.view("GoogleEngine")
+    write(config_file, {"GoogleEngine": {"params": {"limit": 20}}}, 2_000_000_000)
+    assert view["params"] == {"limit": 20}
+    assert "http" not in view  # The whole file is replaced
+
+
+def test_checks_at_most_every_interval(config_file):
+    store = ConfigStore(config_file, ENGINE_SCHEMA, interval=3600)
+    write(config_file, {"GoogleEngine": {"params": {"limit": 20}}}, 2_000_000_000)
+    assert store.section("GoogleEngine")["params"] == {"limit": 10}
+    assert store.check(force=True)
+    assert store.section("GoogleEngine")["params"] == {"limit": 20}
+
+
+@pytest.mark.parametrize("data", [
+    {"GoogleEngine": {"http": {"pool_maxsize": "four"}}},
+    {"GoogleEngine": {"http": {"pool_maxsize": True}}},
+    {"GoogleEngine": {"http": {"pool_size": 4}}},
+    {"GoogleEngine": {"stream": 1}},
+    {"GoogleEngine": []},
+    [],
+])
+def test_keeps_the_previous_version_of_an_invalid_file(config_file, data, caplog):
+    store = ConfigStore(config_file, ENGINE_SCHEMA, interval=0)
+    write(config_file, data, 2_000_000_000)
+    assert not store.check()
+    assert store.section("GoogleEngine")["params"] == {"limit": 10}
+    assert "Ignoring the changes" in caplog.text
+
+
+def test_keeps_the_previous_version_of_broken_json(config_file):
+    store = ConfigStore(config_file, ENGINE_SCHEMA, interval=0)
+    config_file.write_text("{")
+    os.utime(config_file, ns=(2_000_000_000, 2_000_000_000))
+    assert store.section("GoogleEngine")["params"] == {"limit": 10}
+
+    # A later valid version is picked up.
+    write(config_file, {"GoogleEngine": {"params": {"limit": 30}}}, 3_000_000_000)
+    assert store.section("GoogleEngine")["params"] == {"limit": 30}
+
+
+def test_invalid_file_at_start_raises(tmp_path):
+    path = tmp_path / "plugin_params.json"
+    write(path, {"SomePlugin": {"budget": "fast"}}, 1_000_000_000)
+    with pytest.raises(ValueError, match="budget"):
+        ConfigStore(path, PLUGIN_SCHEMA)
+
+
+def test_missing_file_is_empty(tmp_path):
+    assert dict(ConfigStore(tmp_path / "missing.json", ENGINE_SCHEMA).view("GoogleEngine")) == {}
+
+
+def test_validate_accepts_optional_numbers():
+    validate({"budget": None}, PLUGIN_SCHEMA, "plugin")
+    validate({"http": {"idle_timeout": 1.5}}, ENGINE_SCHEMA, "engine")
@@ -0,0 +1,29 @@
+from pyMOA.core.client import MOAClient
+from pyMOA.core.engine_loader import EngineLoader
+
+
+def test_engines_are_loaded_on_first_use():
+    loader = EngineLoader()
+    assert "google" in loader.list_engines()["general"]
+    assert loader.engines == {}
+    assert loader.get_engine("Google") is loader.get_engine("google")
+    assert list(loader.engines) == ["google"]
+    assert loader.get_engine("missing") is None
+
+
+def test_selected_by_default_does_not_load_engines():
+    loader = EngineLoader()
+    assert not loader.selected_by_default("local")
+    assert loader.selected_by_default("google")
+    assert loader.engines == {}
+
+
+def test_default_search_skips_opt_in_engines_without_creating_them():
+    with MOAClient() as client:
+        plan = client._plan(q="privacy")
+        assert "google" in plan.engines
+        assert "local" not in plan.engines
+        assert "local" not in client.loader.engines
+
+        plan = client._plan(q="privacy", engines=["local"])
+        assert list(plan.engines) == ["local"]
@@ -0,0 +1,91 @@
+from pyMOA.core.health import (
+    CAPTCHA, CLOSED, ERROR, HALF_OPEN, OPEN, SUCCESS, TIMEOUT, CircuitBreaker, HealthRegistry, LatencyHistogram,
+    classify_output,
+)
+
+
+def test_classify_output():
+    assert classify_output({"results": []}) == SUCCESS
+    assert classify_output({"error": "HTTP 500"}) == ERROR
+    assert classify_output({"error": "Google CAPTCHA page"}) == CAPTCHA
+    assert classify_output({"error": "Timed out", "timed_out": True}) == TIMEOUT
+    assert classify_output({"error": "HTTPConnectionPool(host='x', port=80): Read timed out."}) == TIMEOUT
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, base_backoff=10)
+    for now in range(2):
+        breaker.record(ERROR, now)
+        assert breaker.state == CLOSED and breaker.allow(now)
+    breaker.record(TIMEOUT, 2)
+    assert breaker.state == OPEN
+    assert not breaker.allow(5)
+    assert breaker.retry_in(5) == 7
+
+
+def test_success_resets_failures():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record(ERROR, 0)
+    breaker.record(ERROR, 1)
+    breaker.record(SUCCESS, 2)
+    breaker.record(ERROR, 3)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=10)
+    breaker.record(ERROR, 0)
+    assert breaker.allow(10)  # The probe
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(11)  # One probe at a time
+    breaker.record(SUCCESS, 12)
+    assert breaker.state == CLOSED and breaker.allow(12)
+
+
+def test_half_open_probe_failure_doubles_backoff():
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=10, max_backoff=25)
+    breaker.record(ERROR, 0)
+    assert breaker.allow(10)
+    breaker.record(ERROR, 10)
+    assert breaker.state == OPEN and breaker.backoff == 20
+    assert not breaker.allow(29)
+    assert breaker.allow(30)
+    breaker.record(ERROR, 30)
+    assert breaker.backoff == 25  # Capped at max_backoff
+
+
+def test_half_open_probe_that_never_reports_is_retried():
+    breaker = CircuitBreaker(failure_threshold=1, base_backoff=10)
+    breaker.record(ERROR, 0)
+    assert breaker.allow(10)
+    assert not breaker.allow(15)
+    assert breaker.allow(20)
+
+
+def test_captcha_counts_more():
+    breaker = CircuitBreaker(failure_threshold=3, captcha_weight=3)
+    breaker.record(CAPTCHA, 0)
+    assert breaker.state == OPEN
+
+
+def test_registry_reports_status():
+    health = HealthRegistry(failure_threshold=2)
+    health.record_output("google", {"results": []}, 0.2)
+    health.record_output("bing", {"error": "HTTP 500"}, 0.1)
+    health.record_output("bing", {"error": "HTTP 500"}, 0.1)
+    assert health.allow("google")
+    assert not health.allow("bing")
+    status = health.status()
+    assert status["google"]["state"] == CLOSED and status["google"]["outcomes"][SUCCESS] == 1
+    assert status["bing"]["state"] == OPEN and status["bing"]["outcomes"][ERROR] == 2
+    health.reset("bing")
+    assert health.allow("bing")
+
+
+def test_latency_quantiles():
+    histogram = LatencyHistogram()
+    for n in range(1, 101):
+        histogram.record(n / 1000)
+    assert 0.05 <= histogram.quantile(0.5) <= 0.05 * 1.1
+    assert 0.095 <= histogram.quantile(0.95) <= 0.095 * 1.1
+    assert LatencyHistogram().quantile(0.5) is None
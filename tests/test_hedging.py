@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from pyMOA.core.cache import MemoryCache
+from pyMOA.core.client import MOAClient
+from pyMOA.core.health import SUCCESS
+from tests.benchmarks.server import ReplayServer
+
+ENGINES = ["google", "bing", "brave", "duckduckgo"]
+
+
+class FirstSlowServer(ReplayServer):
+    # The first request of each engine takes `first` seconds, the later ones none.
+    def __init__(self, first: float):
+        super().__init__()
+        self.first = first
+        self.seen = set()
+        self._seen_lock = threading.Lock()
+
+    def delay(self, engine_id: str) -> float:
+        with self._seen_lock:
+            if engine_id in self.seen:
+                return 0.0
+            self.seen.add(engine_id)
+            return self.first
+
+
+def warm(client, engine: str, latency: float, calls: int = 20):
+    for _ in range(calls):
+        client.health.record(engine, SUCCESS, latency)
+
+
+def test_hedge_delay_is_the_p95_of_successful_calls():
+    with MOAClient() as client:
+        plan = client._plan(q="privacy", engines=["google"], hedge=True)
+        warm(client, "google", 0.01, calls=19)
+        assert client._hedge_delay(plan, "google") is None  # Fewer than 20 calls
+        warm(client, "google", 1.0, calls=1)
+        assert client._hedge_delay(plan, "google") == pytest.approx(0.01, rel=0.1)
+        warm(client, "google", 1.0, calls=1)  # 2 of 21 calls are slow, the p95 is one of them
+        assert client._hedge_delay(plan, "google") == pytest.approx(1.0, rel=0.1)
+        assert client._hedge_delay(client._plan(q="privacy", engines=["google"]), "google") is None
+
+
+@pytest.fixture
+def first_slow_client():
+    with FirstSlowServer(first=1.0) as server, MOAClient() as client:
+        server.attach(client)
+        warm(client, "google", 0.05)
+        yield client
+
+
+def test_hedged_request_answers_for_a_slow_call(first_slow_client):
+    started = time.monotonic()
+    results = first_slow_client.search(q="privacy", engines=["google"], hedge=True)["results"]
+    assert time.monotonic() - started < 0.6
+    assert results["hedged_engines"] == ["google"]
+    assert results["google"]["results"]
+
+
+def test_async_hedged_request_answers_for_a_slow_call(first_slow_client):
+    started = time.monotonic()
+    response = asyncio.run(first_slow_client.search_async(q="privacy", engines=["google"], hedge=True))
+    assert time.monotonic() - started < 0.6
+    assert response["results"]["hedged_engines"] == ["google"]
+    assert response["results"]["google"]["results"]
+
+
+def test_no_hedge_without_the_flag(first_slow_client):
+    started = time.monotonic()
+    results = first_slow_client.search(q="privacy", engines=["google"])["results"]
+    assert time.monotonic() - started >= 1.0
+    assert "hedged_engines" not in results
+
+
+@pytest.fixture
+def quorum_server():
+    with ReplayServer(latencies={"brave": 0.8, "duckduckgo": 0.8}) as server:
+        yield server
+
+
+def assert_quorum(results):
+    assert results["google"]["results"] and results["bing"]["results"]
+    assert sorted(results["unfinished_engines"]) == ["brave", "duckduckgo"]
+    assert "brave" not in results and "duckduckgo" not in results
+
+
+def test_quorum_returns_early_and_fills_the_cache(quorum_server):
+    with MOAClient(cache=MemoryCache()) as client:
+        quorum_server.attach(client)
+        started = time.monotonic()
+        results = client.search(q="privacy", engines=ENGINES, quorum=2)["results"]
+        assert time.monotonic() - started < 0.6
+        assert_quorum(results)
+
+        time.sleep(1.0)  # The unfinished engines answer into the cache
+        results = client.search(q="privacy", engines=ENGINES, quorum=2)["results"]
+        assert sorted(results["cached_engines"]) == sorted(ENGINES)
+
+
+def test_async_quorum_returns_early(quorum_server):
+    async def main():
+        async with MOAClient() as client:
+            quorum_server.attach(client)
+            started = time.monotonic()
+            response = await client.search_async(q="privacy", engines=ENGINES, quorum=2)
+            return response, time.monotonic() - started
+
+    response, elapsed = asyncio.run(main())
+    assert elapsed < 0.6
+    assert_quorum(response["results"])
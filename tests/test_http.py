@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from pyMOA.core.client import MOAClient
+from pyMOA.core.http import AsyncSessionPool, SessionPool
+from tests.benchmarks.server import ReplayServer
+
+
+class CountingServer(ReplayServer):
+    # Counts the connections opened to the server.
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+@pytest.fixture
+def server():
+    with CountingServer() as server:
+        yield server
+
+
+def test_sessions_are_kept_per_proxy():
+    pool = SessionPool(pool_connections=2, pool_maxsize=3)
+    session = pool.get()
+    assert pool.get(None) is session
+    assert pool.get({"http": "http://p:1", "https": "http://p:2"}) is pool.get({"https": "http://p:2", "http": "http://p:1"})
+    proxied = pool.get("http://p:1")
+    assert proxied is not session
+    assert proxied.proxies == {"http": "http://p:1", "https": "http://p:1"}
+    adapter = proxied.get_adapter("https://example.com")
+    assert (adapter._pool_connections, adapter._pool_maxsize) == (2, 3)
+    pool.close()
+    assert pool.get() is not session
+
+
+def test_idle_sessions_are_closed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("pyMOA.core.http.time.monotonic", lambda: now[0])
+    pool = SessionPool(idle_timeout=10)
+    first, proxied = pool.get(), pool.get("http://p:1")
+    closed = []
+    monkeypatch.setattr(proxied, "close", lambda: closed.append(proxied))
+    now[0] += 5
+    assert pool.get() is first
+    now[0] += 6
+    # The proxy's session was unused for 11 seconds, the request through no proxy sweeps it.
+    assert pool.get() is first
+    assert closed == [proxied]
+    now[0] += 11
+    pool.close_idle()
+    assert pool.get() is not first
+
+
+def test_connections_are_kept_alive(server):
+    pool = SessionPool()
+    for _ in range(5):
+        response = pool.request("GET", f"{server.base_url}/google/search")
+        assert response.status_code == 200 and response.content
+    pool.close()
+    assert server.connections == 1
+
+
+def test_engines_reuse_connections_across_searches(server):
+    with MOAClient() as client:
+        server.attach(client)
+        for _ in range(3):
+            assert client.search(q="privacy", engines=["google", "bing"])["results"]["google"]["results"]
+    assert server.connections == 2
+
+
+def test_async_clients_are_kept_per_loop_and_proxy(server):
+    pool = AsyncSessionPool(pool_connections=2, pool_maxsize=3)
+
+    async def main():
+        client = pool.get()
+        assert pool.get() is client
+        assert pool.get("http://p:1") is not client
+        for _ in range(5):
+            response = await pool.request("GET", f"{server.base_url}/google/search", cookies={"a": "1", "b": "2"})
+            assert response.status_code == 200 and response.content
+        await pool.aclose()
+        assert client.is_closed
+        assert pool.get() is not client
+        await pool.aclose()
+        return client
+
+    first = asyncio.run(main())
+    assert server.connections == 1
+    assert not pool._clients
+    assert asyncio.run(main()) is not first
+
+
+def test_async_pool_limits():
+    limits = AsyncSessionPool(pool_connections=2, pool_maxsize=3, idle_timeout=7)._limits()
+    assert (limits.max_connections, limits.max_keepalive_connections, limits.keepalive_expiry) == (6, 6, 7)
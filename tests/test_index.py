@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from pyMOA.core.client import MOAClient
+from pyMOA.core.health import ERROR
+from pyMOA.core.index import LocalIndex, match_expression
+from tests.benchmarks.server import ReplayServer
+
+ENGINES = ["google", "bing", "brave", "duckduckgo"]
+
+
+def result(i: int, title: str = "", content: str = "") -> dict:
+    return {"title": title or f"Result {i}", "url": f"https://example.com/{i}", "content": content}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalIndex(tmp_path / "index.db", flush_interval=0.05, compact_interval=3600)
+    yield index
+    index.close()
+
+
+def test_match_expression_quotes_words():
+    assert match_expression('Privacy "search" AND privacy*') == '"privacy" "search" "and"'
+    assert match_expression("privacy search", " OR ") == '"privacy" OR "search"'
+    assert match_expression("?!") is None
+
+
+def test_writer_batches_and_search_ranks_titles_first(index):
+    index.add("google", "browsers", [result(1, content="a privacy browser"), result(2, title="Privacy tools")])
+    index.add("bing", "browsers", [{"title": "no url"}])
+    assert index.flush(5)
+    assert index.stats() == {"results": 2, "pending": 0, "dropped": 0}
+    assert [row["url"] for row in index.search("privacy")] == ["https://example.com/2", "https://example.com/1"]
+    assert [row["url"] for row in index.search("privacy tools")] == ["https://example.com/2"]
+    # No result has every word, the results with any of them are returned.
+    assert len(index.search("privacy nowhere")) == 2
+    assert index.search("nowhere") == []
+    assert index.search("") == []
+
+
+def test_same_url_is_updated(index):
+    index.add("google", "q", [result(1, title="Old title")])
+    index.add("bing", "q", [result(1, title="New title")])
+    assert index.flush(5)
+    rows = index.search("title")
+    assert [(row["title"], row["engine"]) for row in rows] == [("New title", "bing")]
+
+
+def test_pending_results_are_bounded(tmp_path):
+    index = LocalIndex(tmp_path / "index.db", batch_size=1000, flush_interval=60, max_pending=3)
+    try:
+        index.add("google", "q", [result(i) for i in range(5)])
+        assert index.dropped == 2
+        assert index.flush(5)
+        assert sorted(row["url"] for row in index.search("result", limit=10)) == [
+            f"https://example.com/{i}" for i in range(2, 5)
+        ]
+    finally:
+        index.close()
+
+
+def test_compaction_drops_old_and_extra_rows(tmp_path, monkeypatch):
+    index = LocalIndex(tmp_path / "index.db", max_rows=3, max_age=100, flush_interval=0.05, compact_interval=3600)
+    try:
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now - 200)
+        index.add("google", "q", [result(0)])
+        assert index.flush(5)
+        monkeypatch.setattr(time, "time", lambda: now)
+        for i in range(1, 6):
+            index.add("google", "q", [result(i)])
+            assert index.flush(5)
+        assert index.compact() == 3  # The expired result and the two oldest above max_rows
+        assert sorted(row["url"] for row in index.search("result", limit=10)) == [
+            f"https://example.com/{i}" for i in range(3, 6)
+        ]
+        assert index.compact() == 0
+    finally:
+        index.close()
+
+
+def test_close_writes_what_is_queued(tmp_path):
+    path = tmp_path / "index.db"
+    index = LocalIndex(path, flush_interval=60)
+    index.add("google", "q", [result(1)])
+    index.close()
+    reopened = LocalIndex(path)
+    try:
+        assert reopened.stats()["results"] == 1
+    finally:
+        reopened.close()
+
+
+def test_local_engine_and_degraded_fallback(tmp_path):
+    index = LocalIndex(tmp_path / "index.db", flush_interval=0.05)
+    with ReplayServer() as server, MOAClient(local_index=index) as client:
+        server.attach(client)
+        assert client.search(q="privacy", engines=["local"])["results"]["local"]["results"] == []
+        fetched = client.search(q="privacy", engines=ENGINES)["results"]
+        assert "fallback_engines" not in fetched
+        assert index.flush(5)
+
+        local = client.search(q="privacy", engines=["local"], limit=5)["results"]["local"]["results"]
+        assert len(local) == 5
+        assert all(row["engine"] in ENGINES for row in local)
+
+        for engine in ENGINES:
+            for _ in range(3):
+                client.health.record(engine, ERROR)
+        results = client.search(q="privacy", engines=ENGINES)["results"]
+        assert sorted(results["degraded_engines"]) == sorted(ENGINES)
+        assert results["fallback_engines"] == ["local"]
+        assert results["local"]["results"]
+
+
+def test_local_engine_without_index():
+    with MOAClient() as client:
+        output = client.search(q="privacy", engines=["local"])["results"]["local"]
+    assert "No local index" in output["error"]
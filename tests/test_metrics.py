@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from pyMOA.core.client import MOAClient
+from pyMOA.core.metrics import MetricsSink, emit
+from tests.benchmarks.server import ReplayServer
+
+ENGINES = ["bing", "google"]
+
+
+class ListSink(MetricsSink):
+    def __init__(self):
+        self.calls = []
+
+    def record(self, engine: str, timings: dict):
+        self.calls.append((engine, timings))
+
+
+class BrokenSink(MetricsSink):
+    def record(self, engine: str, timings: dict):
+        raise RuntimeError("sink down")
+
+
+def test_timings_reach_the_response_and_sinks():
+    sink = ListSink()
+    with ReplayServer() as server, MOAClient(metrics=[BrokenSink(), sink]) as client:
+        server.attach(client)
+        response = client.search(q="privacy", engines=ENGINES)
+    assert sorted(engine for engine, _ in sink.calls) == ENGINES
+    for engine, timings in sink.calls:
+        assert response["timings"][engine] is timings
+        assert {"queue_wait", "ttfb", "download", "parse", "total", "bytes"} <= set(timings)
+        assert timings["results"] == len(response["results"][engine]["results"])
+        assert "error" not in timings
+
+
+def test_metrics_are_off_by_default():
+    with ReplayServer() as server, MOAClient() as client:
+        server.attach(client)
+        assert "timings" not in client.search(q="privacy", engines=ENGINES)
+
+
+def test_emit_survives_failing_sinks():
+    sink = ListSink()
+    emit([BrokenSink(), sink], "google", {"total": 1.0})
+    assert sink.calls == [("google", {"total": 1.0})]
+
+
+def test_prometheus_sink():
+    prometheus_client = pytest.importorskip("prometheus_client")
+    from pyMOA.core.metrics import PrometheusSink
+
+    registry = prometheus_client.CollectorRegistry()
+    sink = PrometheusSink(registry=registry)
+    with ReplayServer() as server, MOAClient(metrics=sink) as client:
+        server.attach(client)
+        response = asyncio.run(client.search_async(q="privacy", engines=["google"]))
+    count = len(response["results"]["google"]["results"])
+    sink.record("bing", {"total": 0.5, "error": "CAPTCHA"})
+
+    def value(name, **labels):
+        return registry.get_sample_value(f"pymoa_{name}", labels)
+
+    assert value("engine_stage_seconds_count", engine="google", stage="total") == 1
+    assert value("engine_stage_seconds_count", engine="google", stage="connect") in (None, 1)
+    assert value("engine_response_bytes_count", engine="google") == 1
+    assert value("engine_results_total", engine="google") == count
+    assert value("engine_errors_total", engine="google", error="CAPTCHA") is None
+    assert value("engine_errors_total", engine="bing", error="CAPTCHA") == 1
+    assert value("engine_stage_seconds_sum", engine="bing", stage="total") == 0.5
+
+
+def test_opentelemetry_sink():
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from opentelemetry.trace import StatusCode
+
+    from pyMOA.core.metrics import OpenTelemetrySink
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    sink = OpenTelemetrySink(provider.get_tracer("test"))
+    sink.record("google", {"queue_wait": 0.25, "total": 0.75, "results": 10})
+    sink.record("bing", {"total": 0.1, "error": "TimeoutError"})
+
+    google, bing = exporter.get_finished_spans()
+    assert google.name == "pyMOA.search google"
+    assert google.attributes["pyMOA.engine"] == "google"
+    assert google.attributes["pyMOA.results"] == 10
+    assert google.end_time - google.start_time == pytest.approx(1e9)
+    assert google.status.status_code == StatusCode.UNSET
+    assert bing.attributes["error.type"] == "TimeoutError"
+    assert "pyMOA.error" not in bing.attributes
+    assert bing.status.status_code == StatusCode.ERROR
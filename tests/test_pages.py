@@ -0,0 +1,64 @@
+from types import SimpleNamespace
+
+from pyMOA.core.pages import PageCollector, merge_pages
+
+
+def output(*urls):
+    return {"results": [{"url": url} for url in urls]}
+
+
+def test_without_max_results_all_pages_are_one_wave():
+    collector = PageCollector()
+    assert collector.next_wave([1, 2, 3]) == [1, 2, 3]
+    assert collector.next_wave([1, 2, 3]) == []
+
+
+def test_waves_are_sized_by_the_results_still_needed():
+    collector = PageCollector(max_results=25)
+    pages = list(range(1, 11))
+    assert collector.next_wave(pages) == [1]
+    collector.add("a", output(*(f"https://a.example/{i}" for i in range(4))))
+    collector.add("b", output(*(f"https://b.example/{i}" for i in range(4))))
+    # 8 new results per page, 17 to go.
+    assert collector.next_wave(pages) == [2, 3, 4]
+    for page in (2, 3, 4):
+        collector.add("a", output(f"https://a.example/{page}0"))
+        collector.add("b", output(f"https://b.example/{page}0"))
+    # 2 new results per page, 11 to go, capped by the pages left.
+    assert collector.next_wave(pages) == [5, 6, 7, 8, 9, 10]
+    assert collector.next_wave(pages) == []
+
+
+def test_a_wave_without_new_results_falls_back_to_one_page():
+    collector = PageCollector(max_results=5)
+    assert collector.next_wave([1, 2, 3]) == [1]
+    collector.add("a", output())
+    assert collector.exhausted == {"a"}
+    assert collector.next_wave([1, 2, 3]) == [2]
+
+
+def test_done_once_max_results_were_seen():
+    collector = PageCollector(max_results=2)
+    collector.add("a", output("https://a.example/1", "https://a.example/1/"))
+    assert not collector.done
+    collector.add("b", output("https://b.example/1"))
+    assert collector.done
+
+
+def page_plan(page, **results):
+    return SimpleNamespace(params={"page": page}, selected=dict.fromkeys(results), results=results)
+
+
+def test_merge_pages_concatenates_unique_results_up_to_limit():
+    def plans():
+        return [
+            page_plan(1, a=output("https://a.example/1", "https://a.example/2")),
+            page_plan(2, a=output("https://a.example/2/", "https://a.example/3")),
+            page_plan(3, a={"error": "blocked"}),
+        ]
+
+    merged = merge_pages(plans())["a"]
+    assert [result["url"] for result in merged["results"]] == [f"https://a.example/{i}" for i in (1, 2, 3)]
+    assert merged["pages"] == [1, 2]
+    assert merged["page_errors"] == {3: "blocked"}
+    assert len(merge_pages(plans(), limit=2)["a"]["results"]) == 2
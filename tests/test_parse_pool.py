@@ -0,0 +1,58 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+from pyMOA.core.client import MOAClient
+from pyMOA.core.parse_pool import ParsePool
+from pyMOA.engines.google import GoogleEngine
+from tests.benchmarks.server import ReplayServer
+
+GOOGLE = (Path(__file__).parent / "benchmarks" / "fixtures" / "google.html").read_bytes()
+ENGINES = ["bing", "brave", "duckduckgo", "google"]
+
+
+class PidEngine:
+    @classmethod
+    def parse_results(cls, content: bytes, encoding: str = None) -> list:
+        return [os.getpid(), len(content), encoding]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ParsePool(max_workers=1, min_bytes=100)
+    yield pool
+    pool.close()
+
+
+def test_small_bodies_are_parsed_in_the_calling_process(pool):
+    assert pool.parse(PidEngine, b"x" * 99) == [os.getpid(), 99, None]
+
+
+def test_large_bodies_are_parsed_in_a_worker(pool):
+    pid, size, encoding = pool.parse(PidEngine, memoryview(b"x" * 100), encoding="latin-1")
+    assert pid != os.getpid()
+    assert (size, encoding) == (100, "latin-1")
+
+
+def test_worker_parses_like_the_engine(pool):
+    expected = GoogleEngine.parse_results(GOOGLE)
+    assert expected
+    assert pool.parse(GoogleEngine, GOOGLE) == expected
+
+
+def test_client_with_parse_processes_returns_the_same_results():
+    with ReplayServer() as server:
+        with MOAClient() as client:
+            server.attach(client)
+            expected = client.search(q="privacy", engines=ENGINES)["results"]
+        with MOAClient(parse_processes=1, parse_offload_bytes=0) as client:
+            server.attach(client)
+            assert client.parse_pool is not None
+            results = client.search(q="privacy", engines=ENGINES)["results"]
+            async_results = asyncio.run(client.search_async(q="privacy", engines=ENGINES))["results"]
+    for engine in ENGINES:
+        assert expected[engine]["results"]
+        assert results[engine] == expected[engine]
+        assert async_results[engine] == expected[engine]
@@ -0,0 +1,124 @@
+import pytest
+from lxml import html
+from pyMOA.core.parsing import StreamParser, header_charset, parse_html
+from pyMOA.engines.google import GoogleEngine
+
+RESULT = b'<div class="result">'
+STOP = b'<div id="footer">'
+DOCUMENT = (
+    b"<html><body>"
+    + b"".join(b'<div class="result"><a href="/%d">Result %d</a></div>' % (i, i) for i in range(10))
+    + b'<div id="footer">Footer</div></body></html>'
+)
+
+
+def stream(document, chunks, **kwargs):
+    parser = StreamParser(**kwargs)
+    for chunk in chunks:
+        if not parser.feed(chunk):
+            break
+    return parser
+
+
+def split(document, at):
+    return [document[:at], document[at:]]
+
+
+def fixed(document, size):
+    return [document[i:i + size] for i in range(0, len(document), size)]
+
+
+@pytest.mark.parametrize("at", range(DOCUMENT.find(STOP) - len(STOP), DOCUMENT.find(STOP) + len(STOP) + 1))
+def test_stop_marker_split_between_chunks_cuts_like_parse_html(at):
+    expected = DOCUMENT[:DOCUMENT.find(STOP)]
+
+    collected = stream(DOCUMENT, split(DOCUMENT, at), stop_marker=STOP, parse=False)
+    assert collected.stopped
+    assert collected.content == expected
+    assert collected.size == len(expected)
+
+    parsed = stream(DOCUMENT, split(DOCUMENT, at), stop_marker=STOP)
+    assert html.tostring(parsed.close()) == html.tostring(parse_html(DOCUMENT, stop_marker=STOP))
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 17, 64])
+def test_result_limit_counts_split_markers_once(size):
+    parser = stream(DOCUMENT, fixed(DOCUMENT, size), result_marker=RESULT, limit=3, parse=False)
+    fourth = DOCUMENT.find(RESULT)
+    for _ in range(3):
+        fourth = DOCUMENT.find(RESULT, fourth + 1)
+
+    assert parser.results == 4
+    assert parser.content == DOCUMENT[:fourth]
+    assert len(parser.close().xpath('//div[@class="result"]')) == 0  # Not parsed, only collected
+    parsed = stream(DOCUMENT, fixed(DOCUMENT, size), result_marker=RESULT, limit=3)
+    assert len(parsed.close().xpath('//div[@class="result"]')) == 3
+
+
+def test_body_without_markers_is_kept_whole():
+    parser = stream(DOCUMENT, fixed(DOCUMENT, 7), stop_marker=b"<nowhere>", parse=False)
+    assert not parser.stopped
+    assert parser.content == DOCUMENT
+
+    parsed = stream(DOCUMENT, fixed(DOCUMENT, 7), stop_marker=b"<nowhere>")
+    assert html.tostring(parsed.close()) == html.tostring(parse_html(DOCUMENT))
+
+
+def test_max_bytes_truncates():
+    parser = stream(DOCUMENT, fixed(DOCUMENT, 10), stop_marker=STOP, max_bytes=25, parse=False)
+    assert parser.truncated
+    assert parser.content == DOCUMENT[:25]
+
+
+def test_empty_body_gives_empty_root():
+    assert stream(b"", [b"  ", b"\n"]).close().tag == "html"
+
+
+def test_header_charset():
+    assert header_charset("text/html; charset=UTF-8") == "utf-8"
+    assert header_charset('text/html;charset="euc-kr"') == "euc-kr"
+    assert header_charset("text/html; charset=x-unknown") is None
+    assert header_charset("text/html") is None
+    assert header_charset(None) is None
+
+
+def google_block(i: int, snippet: bool = True) -> bytes:
+    return (
+        b'<div jscontroller="SC7lYd"><a href="https://example.com/%d"><h3>Result %d</h3></a>' % (i, i)
+        + (b'<div data-sncf="1">Snippet %d</div>' % i if snippet else b"")
+        + b"</div>"
+    )
+
+
+# The first result has no snippet, the engine drops it.
+GOOGLE = b"<html><body>" + google_block(0, snippet=False) + b"".join(google_block(i) for i in range(1, 6)) + b"</body></html>"
+
+
+class Response:
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+
+    def __init__(self, body: bytes, size: int):
+        self.body, self.size, self.closed = body, size, False
+
+    def iter_content(self, size):
+        return iter(fixed(self.body, self.size))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("size", [7, 64, 4096])
+@pytest.mark.parametrize("limit", [1, 2, 3, 5])
+def test_result_limit_counts_parsed_results(limit, size):
+    parser = stream(GOOGLE, fixed(GOOGLE, size), result_marker=GoogleEngine.RESULT_MARKER, limit=limit,
+                    count=lambda root: len(GoogleEngine.parse_dom(root)))
+    results = GoogleEngine.parse_dom(parser.close())
+    assert [result.url for result in results] == [f"https://example.com/{i}" for i in range(1, limit + 1)]
+    assert parser.stopped == (limit < 5)
+
+
+def test_engine_read_limit_skips_incomplete_blocks():
+    engine = GoogleEngine()
+    assert len(GoogleEngine.parse_results(GOOGLE)) == 5
+    for limit in (2, 3):
+        assert len(engine.parse(engine.read(Response(GOOGLE, 50), limit))) == limit
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from pyMOA.core.base_plugin import BasePlugin, DEFAULT_BUDGET
+from pyMOA.core.client import MOAClient
+from pyMOA.core.pipeline import PLUGIN_TIMED_OUT, PluginTimings, call_plugin, run_post_plugins
+from pyMOA.core.plugin_loader import PluginLoader
+
+
+class LegacyPrePlugin(BasePlugin):
+    # Written against the old call, run(q).
+    def run(self, query):
+        return {"seen": query}
+
+    def get_type(self):
+        return "pre"
+
+
+class SlowPrePlugin(BasePlugin):
+    def run(self, query, results):
+        time.sleep(0.3)
+        return {"query": "too late"}
+
+    def get_type(self):
+        return "pre"
+
+    def get_budget(self):
+        return 0.05
+
+
+class SlowPostPlugin(BasePlugin):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def run(self, query, results):
+        self.calls += 1
+        time.sleep(0.06)
+        return {**results, "slow": True}
+
+    def get_budget(self):
+        return 0.05
+
+
+class TagPostPlugin(BasePlugin):
+    def run(self, query, results):
+        return {**results, "tags": results.get("tags", 0) + 1}
+
+
+def add_plugin(client, plugin_id, plugin):
+    client.ploader.plugins[plugin_id] = plugin
+    return plugin
+
+
+def test_plugin_ids_keep_the_suffix_and_accept_the_short_name():
+    loader = PluginLoader()
+    assert "querycleanupplugin" in loader.list_plugins()["active"]
+    plugin = loader.get_plugin("QueryCleanupPlugin")
+    assert plugin is not None
+    assert loader.get_plugin("querycleanup") is plugin
+    assert loader.get_plugin("missing") is None
+
+
+def test_disabled_plugins_only_run_when_named():
+    loader = PluginLoader()
+    assert not any(type(plugin).__name__ == "QueryCleanupPlugin" for plugin in loader.pre_plugins)
+    with MOAClient() as client:
+        assert "rewritten_query" not in client._plan(q="  privacy   search ").results
+        plan = client._plan(q="  privacy   search ", enabled_plugins=["querycleanup"])
+    assert plan.params["query"] == "privacy search"
+    assert plan.results["rewritten_query"] == "privacy search"
+    assert plan.timings.to_dict()["QueryCleanupPlugin"]["calls"] == 1
+
+
+def test_legacy_pre_plugins_get_the_query_only():
+    timings = PluginTimings()
+    assert call_plugin(LegacyPrePlugin(), timings, "pre", "privacy", {"query": "privacy"}) == {"seen": "privacy"}
+    assert timings.to_dict()["LegacyPrePlugin"]["budget"] == DEFAULT_BUDGET
+
+
+def test_pre_plugin_over_budget_is_not_waited_for():
+    with MOAClient() as client:
+        add_plugin(client, "slowpreplugin", SlowPrePlugin())
+        started = time.monotonic()
+        plan = client._plan(q="privacy", enabled_plugins=["slowpreplugin"])
+        assert time.monotonic() - started < 0.25
+    assert plan.params["query"] == "privacy"
+    assert plan.pre_outputs["SlowPrePlugin"] == {"error": PLUGIN_TIMED_OUT, "timed_out": True}
+    assert plan.timings.to_dict()["SlowPrePlugin"]["over_budget"]
+
+
+def test_async_pre_plugin_over_budget_is_not_waited_for():
+    async def main():
+        async with MOAClient() as client:
+            add_plugin(client, "slowpreplugin", SlowPrePlugin())
+            return await client._aplan(q="privacy", enabled_plugins=["slowpreplugin"])
+
+    plan = asyncio.run(main())
+    assert plan.pre_outputs["SlowPrePlugin"] == {"error": PLUGIN_TIMED_OUT, "timed_out": True}
+
+
+def test_post_plugins_chain_and_skip_slow_ones():
+    slow_plugin, tag = SlowPostPlugin(), TagPostPlugin()
+    timings, slow = PluginTimings(), set()
+    first = run_post_plugins([slow_plugin, tag], "privacy", {"results": []}, timings, slow)
+    second = run_post_plugins([slow_plugin, tag], "privacy", {"results": []}, timings, slow)
+    assert first == {"results": [], "slow": True, "tags": 1}
+    assert second == {"results": [], "tags": 1}
+    assert slow == {"SlowPostPlugin"}
+    assert slow_plugin.calls == 1
+    recorded = timings.to_dict()
+    assert recorded["SlowPostPlugin"]["over_budget"]
+    assert recorded["TagPostPlugin"]["calls"] == 2
+    assert not recorded["TagPostPlugin"]["over_budget"]
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from pyMOA.core.client import MOAClient
+from pyMOA.core.rerank import bm25, rerank
+from tests.benchmarks.server import ReplayServer
+
+
+def test_bm25_matches_hand_computed_score():
+    scores = bm25("Apple", ["apple banana", "Apple, apple cherry", "cherry"])
+    # Two of the three documents have the term, the mean length is 2 words.
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    assert scores[0] == pytest.approx(idf * 1 * 2.2 / (1 + 1.2 * (0.25 + 0.75 * 2 / 2)))
+    assert scores[1] == pytest.approx(idf * 2 * 2.2 / (2 + 1.2 * (0.25 + 0.75 * 3 / 2)))
+    assert scores[2] == 0
+
+
+def test_bm25_splits_words_like_the_regex():
+    documents = ["naïve café", "cafe_au_lait café", "", "x\0café"]
+    scores = bm25("café cafe_au_lait", documents)
+    assert scores[0] > 0 and scores[1] > scores[0] and scores[3] > 0
+    assert scores[2] == 0
+    assert not bm25("!!", documents).any()
+    assert bm25("café", []).size == 0
+
+
+def test_rerank_orders_by_relevance_and_agreement():
+    records = [
+        {"url": "https://a", "title": "banana", "content": "", "positions": {"google": 1}},
+        {"url": "https://b", "title": "apple pie", "content": "", "positions": {"google": 2, "bing": 1}},
+        {"url": "https://c", "title": "apple", "content": "", "positions": {"bing": 2}},
+    ]
+    ranked = rerank("apple", records)
+    assert [record["url"] for record in ranked] == ["https://b", "https://c", "https://a"]
+    assert ranked[0]["score"] > ranked[1]["score"] > ranked[2]["score"]
+    # Without the bm25 feature the first position of a single engine wins over nothing.
+    ranked = rerank("apple", records, weights={"bm25": 0, "agreement": 0}, limit=1)
+    assert [record["url"] for record in ranked] == ["https://a"]
+    assert rerank("apple", []) == []
+
+
+def test_rerank_engine_shapes_merged_results():
+    with ReplayServer() as server, MOAClient() as client:
+        server.attach(client)
+        merged = client.search(q="privacy", engines=["google", "bing"], merge="rerank")["merged"]
+        rrf = client.search(q="privacy", engines=["google", "bing"], merge="rrf")["merged"]
+    # Rerank scores are weighted sums of features in 0-1, far above the rrf scores.
+    assert merged[0]["score"] > 0.25 > rrf[0]["score"]
+    assert sorted(record["url"] for record in merged) == sorted(record["url"] for record in rrf)
+    assert [record["score"] for record in merged] == sorted((record["score"] for record in merged), reverse=True)
+
+
+
+def test_unknown_merge_method_is_rejected():
+    with MOAClient() as client, pytest.raises(ValueError):
+        client.search(q="privacy", merge="nothing")
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from pyMOA.core.client import MOAClient
+from pyMOA.core.results import ResultTable, SearchResponse, SearchResult, StringColumn
+from tests.benchmarks.server import ReplayServer
+
+ITEMS = [
+    {"title": "Première", "url": "https://a.example/", "content": "a"},
+    {"title": "Second", "url": "https://b.example/", "content": "", "thumbnail": "https://b.example/t.png"},
+]
+
+
+def table() -> ResultTable:
+    results = ResultTable()
+    results.append("privacy", "google", ITEMS)
+    results.append("privacy", "bing", [SearchResult("Third", "https://c.example/")])
+    return results
+
+
+def test_search_result_round_trip():
+    for item in ITEMS:
+        assert SearchResult.from_dict(item).to_dict() == item
+    assert not hasattr(SearchResult("t", "u"), "__dict__")  # Slotted
+
+
+def test_search_response_round_trip():
+    output = {"results": ITEMS, "metadata": {"page": 1}, "timed_out": False}
+    response = SearchResponse.from_dict("brave", output)
+    assert response.ok and response.results[0].title == "Première"
+    assert response.to_dict() == output
+    failed = SearchResponse.from_dict("brave", {"error": "boom", "status": 500})
+    assert not failed.ok
+    assert failed.to_dict() == {"error": "boom", "status": 500}
+
+
+def test_string_column_keeps_nulls_and_unicode():
+    column = StringColumn()
+    for value in ["é", None, "", "x" * 9, None, "日本", "a", "b", "c"]:
+        column.append(value)
+    assert list(column) == ["é", None, "", "x" * 9, None, "日本", "a", "b", "c"]
+    assert column.null_count == 2
+
+
+def test_result_table_rows():
+    results = table()
+    assert len(results) == 3
+    assert list(results.columns["position"]) == [1, 2, 1]
+    assert list(results.columns["engine"]) == ["google", "google", "bing"]
+    assert [result.to_dict() for result in results] == [*ITEMS, {"title": "Third", "url": "https://c.example/", "content": ""}]
+
+    results.add_response("other", {"results": {
+        "brave": SearchResponse("brave", [SearchResult("Fourth", "https://d.example/")]),
+        "duckduckgo": {"error": "timed out"},
+    }})
+    assert len(results) == 4
+    assert results.columns["query"][3] == "other"
+
+
+def test_result_table_to_arrow_and_parquet(tmp_path):
+    pyarrow = pytest.importorskip("pyarrow")
+    pytest.importorskip("pyarrow.parquet")
+    results = table()
+    exported = results.to_arrow()
+    assert exported.column_names == list(ResultTable.COLUMNS)
+    assert exported.schema.field("position").type == pyarrow.int64()
+    assert exported.to_pylist()[1] == {
+        "query": "privacy", "engine": "google", "position": 2, "title": "Second", "url": "https://b.example/",
+        "content": "", "thumbnail": "https://b.example/t.png",
+    }
+    assert exported.column("thumbnail").null_count == 2
+
+    results.append("privacy", "brave", ITEMS)  # The exported table is not affected
+    assert exported.num_rows == 3
+    results.to_parquet(tmp_path / "results.parquet")
+    import pyarrow.parquet
+    assert pyarrow.parquet.read_table(tmp_path / "results.parquet").num_rows == 5
+
+
+def test_typed_search_returns_search_responses():
+    with ReplayServer() as server, MOAClient() as client:
+        server.attach(client)
+        response = client.search(q="privacy", engines=["google", "bing"], typed=True)
+        typed_async = asyncio.run(client.search_async(q="privacy", engines=["google"], typed=True))
+    for engine in ("google", "bing"):
+        output = response["results"][engine]
+        assert isinstance(output, SearchResponse) and output.ok
+        assert all(isinstance(result, SearchResult) for result in output.results)
+        assert output.results
+    assert isinstance(typed_async["results"]["google"], SearchResponse)
+    results = ResultTable()
+    results.add_response("privacy", response)
+    assert len(results) == sum(len(response["results"][engine].results) for engine in ("google", "bing"))
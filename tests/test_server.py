@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from pyMOA.core.server import HTTPError, SearchServer, make_client, search_arguments
+
+
+class BrokenClient:
+    # Streams one engine output, then fails. Plain searches echo their arguments.
+    async def search_async(self, **arguments):
+        return {"arguments": arguments}
+
+    async def aiter_search(self, **arguments):
+        yield "engine", "google", {"results": []}
+        raise RuntimeError("engine exploded")
+
+
+async def request(server: SearchServer, target: str) -> bytes:
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)  # Until the server closes the connection
+        writer.close()
+    return response
+
+
+def test_stream_failure_ends_the_chunked_body():
+    response = asyncio.run(request(SearchServer(BrokenClient()), "/search?q=privacy&stream=ndjson"))
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 200 OK")
+    assert b"HTTP/1.1 500" not in body
+    assert b'"name": "google"' in body
+    assert b'{"type": "error", "error": "engine exploded"}' in body
+    assert body.endswith(b"0\r\n\r\n")
+
+
+def test_stream_failure_is_an_sse_error_event():
+    response = asyncio.run(request(SearchServer(BrokenClient()), "/search?q=privacy&stream=sse"))
+    assert b"event: error\ndata: " in response
+    assert response.endswith(b"0\r\n\r\n")
+
+
+def test_clients_keep_their_own_metrics_registry():
+    first, second = make_client(), make_client()
+    try:
+        assert first.metrics_sinks[0].registry is not second.metrics_sinks[0].registry
+    finally:
+        first.close()
+        second.close()
+
+
+def test_search_arguments_read_booleans():
+    assert search_arguments({"q": "privacy", "hedge": 1})["hedge"] is True
+    assert search_arguments({"q": "privacy", "hedge": False})["hedge"] is False
+    assert search_arguments({"q": "privacy", "hedge": "yes"})["hedge"] is True
+    with pytest.raises(HTTPError) as error:
+        search_arguments({"q": "privacy", "hedge": [1]})
+    assert error.value.status == 400
+
+
+async def post(server: SearchServer, body: bytes) -> bytes:
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    async with listener:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            b"POST /search HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\nContent-Length: %d\r\n\r\n%s"
+            % (len(body), body)
+        )
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+def test_json_number_boolean():
+    response = asyncio.run(post(SearchServer(BrokenClient()), b'{"q": "privacy", "hedge": 1}'))
+    assert response.startswith(b"HTTP/1.1 200 OK")
+    assert b'"hedge": true' in response
+
+
+def test_invalid_json_boolean_is_a_bad_request():
+    response = asyncio.run(post(SearchServer(BrokenClient()), b'{"q": "privacy", "hedge": {"on": true}}'))
+    assert response.startswith(b"HTTP/1.1 400 Bad Request")
+    assert b"Invalid value of 'hedge'" in response
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import pytest
+from pyMOA.core.singleflight import FileLockFlight, SingleFlight, fcntl
+
+
+class InlineExecutor:
+    # Runs the call in submit(), so its future is already done when SingleFlight gets it.
+    def submit(self, fn):
+        future = Future()
+        future.set_result(fn())
+        return future
+
+
+def test_submit_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return {"results": [1]}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = flight.submit("key", executor, call)
+        second = flight.submit("key", executor, call)
+        release.set()
+        assert first.result(5) == second.result(5) == {"results": [1]}
+    assert len(calls) == 1
+    assert first.result() is not second.result()  # Followers get a copy
+    assert len(flight) == 0
+
+
+def test_submit_of_a_call_that_already_finished_does_not_deadlock():
+    # The cleanup callback used to be added while holding the lock it takes itself.
+    flight = SingleFlight()
+    done = []
+    thread = threading.Thread(target=lambda: done.append(flight.submit("key", InlineExecutor(), lambda: 1).result()))
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert done == [1]
+    assert len(flight) == 0
+
+
+def test_cancelling_one_caller_keeps_the_others():
+    flight = SingleFlight()
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = flight.submit("key", executor, lambda: release.wait(5) and "done")
+        second = flight.submit("key", executor, lambda: "other")
+        assert second.cancel()
+        release.set()
+        assert first.result(5) == "done"
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("engine failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [flight.submit("key", executor, fail) for _ in range(2)]
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result(5)
+
+
+def test_ado_coalesces_tasks():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"results": [1]}
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", call) for _ in range(3)))
+
+    results = asyncio.run(main())
+    assert results == [{"results": [1]}] * 3
+    assert len(calls) == 1
+
+
+def test_ado_follower_takes_over_a_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == 2
+    assert len(flight) == 0
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_file_lock_flight_waits_for_the_holder(tmp_path):
+    flight = FileLockFlight(tmp_path, timeout=5, poll_interval=0.001)
+    other = FileLockFlight(tmp_path, timeout=0.05, poll_interval=0.001)
+    order = []
+
+    def wait():
+        with flight.hold("key") as acquired:
+            order.append(acquired)
+
+    with flight.hold("key") as locked:
+        assert locked
+        # Another holder of the same key gives up after its timeout while the lock is held.
+        with other.hold("key") as locked_too:
+            assert not locked_too
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        waiter.join(0.05)
+        assert waiter.is_alive()
+        order.append("released")
+    waiter.join(5)
+    assert order == ["released", True]
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl")
+def test_file_lock_flight_async(tmp_path):
+    flight = FileLockFlight(tmp_path, timeout=5, poll_interval=0.001)
+
+    async def main():
+        async with flight.ahold("key") as locked:
+            return locked
+
+    assert asyncio.run(main())